@@ -23,7 +23,7 @@ ext_modules = [
             # Path to pybind11 headers
             get_pybind_include(),
         extra_compile_args=['--std=c++17', '-DPY_BINDINGS'],
-        libraries=['gmp', 'gmpxx'],
+        libraries=['gmp', 'gmpxx', 'z', 'lzma', 'bz2', 'zstd'],
         language='c++'
     ),
 
@@ -62,6 +62,7 @@ setup(
     entry_points={
         'console_scripts': [
             'veripb=veripb:run_cmd_main',
+            'veripb-convert=veripb.binary_proof:run_cmd_main',
         ]
     },
     ext_modules = ext_modules
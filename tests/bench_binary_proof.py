@@ -0,0 +1,82 @@
+"""
+Benchmark comparing the text and the binary proof format.
+
+The proofs in integration_tests/correct are concatenated and repeated
+to get a larger proof, which is then read once in text and once in
+binary format. Reading consists of splitting the proof into lines
+and words, i.e., what every rule parser has to do.
+
+usage: python3 bench_binary_proof.py [scale]
+"""
+
+import os
+import sys
+import tempfile
+
+from pathlib import Path
+from time import perf_counter
+
+from env import veripb
+from veripb.binary_proof import toBinary
+from veripb.parser import LineParser
+
+def createProof(path, scale):
+    current = Path(__file__).parent
+    body = list()
+    for proof in sorted(current.glob("integration_tests/correct/**/*.pbp")):
+        with proof.open() as file:
+            # skip header
+            body.extend(file.readlines()[1:])
+
+    body = "".join(line if line.endswith("\n") else line + "\n" for line in body)
+    with open(path, "w") as file:
+        file.write("pseudo-Boolean proof version 1.1\n")
+        for i in range(scale):
+            file.write(body)
+
+def readProof(path, splitWords = True):
+    start = perf_counter()
+    numWords = 0
+    with open(path) as file:
+        with LineParser(file) as lines:
+            for words in lines:
+                if splitWords:
+                    for word in words:
+                        numWords += 1
+    return perf_counter() - start, numWords
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        textPath = os.path.join(tmpDir, "proof.pbp")
+        binaryPath = os.path.join(tmpDir, "proof.pbpb")
+
+        createProof(textPath, scale)
+        start = perf_counter()
+        toBinary(textPath, binaryPath)
+        convertTime = perf_counter() - start
+
+        textLineTime, _ = readProof(textPath, splitWords = False)
+        binaryLineTime, _ = readProof(binaryPath, splitWords = False)
+        textTime, textWords = readProof(textPath)
+        binaryTime, binaryWords = readProof(binaryPath)
+        assert(textWords == binaryWords)
+
+        textSize = os.path.getsize(textPath)
+        binarySize = os.path.getsize(binaryPath)
+
+        print("words:               %i" % textWords)
+        print("conversion:          %.2fs" % convertTime)
+        print("size text:           %i bytes" % textSize)
+        print("size binary:         %i bytes" % binarySize)
+        print("size ratio:          %.2f" % (binarySize / textSize))
+        print("lines text:          %.2fs" % textLineTime)
+        print("lines binary:        %.2fs" % binaryLineTime)
+        print("lines time ratio:    %.2f" % (binaryLineTime / textLineTime))
+        print("words text:          %.2fs" % textTime)
+        print("words binary:        %.2fs" % binaryTime)
+        print("words time ratio:    %.2f" % (binaryTime / textTime))
+
+if __name__ == '__main__':
+    main()
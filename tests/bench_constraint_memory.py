@@ -0,0 +1,102 @@
+"""
+Benchmark measuring the memory used per constraint of the database.
+
+The formula is a chain of implications x1 -> x2 -> ... -> xn. The
+proof derives a shortcut x_i -> x_(i+2) for every variable by
+reverse unit propagation and keeps all of them, so that the database
+contains about 2 * numVars constraints at the end. Every check runs
+in a separate process and the memory per constraint is the
+difference of the used memory to a check of a proof with only a few
+constraints. The used memory is the maximal resident set size or,
+if it is larger, the resident and swapped memory at the end of the
+check, so that checks that do not fit into memory can be measured
+with swap.
+
+usage: python3 bench_constraint_memory.py [numConstraints]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from time import perf_counter
+
+from env import veripb
+from veripb import run
+from veripb.utils import Settings as MiscSettings
+from veripb.verifier import Verifier
+
+def createInstance(formulaPath, proofPath, numVars):
+    with open(formulaPath, "w") as file:
+        file.write("* #variable= %i #constraint= %i\n" % (numVars, numVars - 1))
+        for i in range(1, numVars):
+            file.write("1 ~x%i 1 x%i >= 1 ;\n" % (i, i + 1))
+
+    with open(proofPath, "w") as file:
+        file.write("pseudo-Boolean proof version 1.1\n")
+        file.write("f %i\n" % (numVars - 1))
+        for i in range(1, numVars - 1):
+            file.write("u 1 ~x%i 1 x%i >= 1 ;\n" % (i, i + 2))
+    return 2 * numVars - 3
+
+def usedMemory():
+    """
+    Return the memory used by this process in KiB.
+    """
+    result = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open("/proc/self/status") as status:
+            fields = dict(line.split(":", 1) for line in status)
+        current = sum(int(fields[key].split()[0]) for key in ["VmRSS", "VmSwap"])
+        result = max(result, current)
+    except (OSError, KeyError):
+        pass
+    return result
+
+def check(formulaPath, proofPath):
+    miscSettings = MiscSettings({"arbitraryPrecision": True})
+    verifierSettings = Verifier.Settings({
+        "useNativeBatch": True,
+        "requireUnsat": False})
+
+    start = perf_counter()
+    with open(formulaPath) as formula:
+        with open(proofPath) as proof:
+            run(formula, proof, verifierSettings, miscSettings)
+    print(perf_counter() - start, usedMemory())
+
+def measure(numConstraints):
+    """
+    Return the time and the used memory in KiB of checking a proof
+    with numConstraints constraints.
+    """
+    with tempfile.TemporaryDirectory() as tmpDir:
+        formulaPath = os.path.join(tmpDir, "formula.opb")
+        proofPath = os.path.join(tmpDir, "proof.pbp")
+
+        numConstraints = createInstance(formulaPath, proofPath, numConstraints // 2 + 2)
+        output = subprocess.run(
+            [sys.executable, __file__, "--check", formulaPath, proofPath],
+            check = True, capture_output = True, text = True).stdout
+        time, memory = output.split()
+        return numConstraints, float(time), int(memory)
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--check":
+        check(sys.argv[2], sys.argv[3])
+        return
+
+    numConstraints = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+
+    _, _, baseMemory = measure(100)
+    numConstraints, time, memory = measure(numConstraints)
+
+    print("constraints:         %i" % numConstraints)
+    print("time:                %.2fs" % time)
+    print("memory:              %.0f MB" % (memory / 1024))
+    print("memory / constraint: %.0f bytes" % ((memory - baseMemory) * 1024 / numConstraints))
+
+if __name__ == '__main__':
+    main()
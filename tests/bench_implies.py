@@ -0,0 +1,68 @@
+"""
+Benchmark comparing implication checks of one constraint against many
+targets, checked one at a time with the old map based impliesByMap
+and with implies, and all at once with impliesMany, which loads the
+implying constraint only once.
+
+The implying constraint has numTerms terms and every target shares
+about half of its literals with it, so that the targets are partly
+implied, as for the subgoals of a redundance rule.
+
+usage: python3 bench_implies.py [numTargets] [numTerms]
+"""
+
+import random
+import sys
+
+from time import perf_counter
+
+from env import veripb
+from veripb.optimized.constraints import CppInequality as Inequality
+
+def createConstraints(numTargets, numTerms, coeffScale):
+    rng = random.Random(1)
+    numVars = 4 * numTerms
+    lits = [var * rng.choice([1, -1]) for var in rng.sample(range(1, numVars + 1), numTerms)]
+    coeffs = [rng.randint(1, 10) * coeffScale for lit in lits]
+    implying = Inequality(coeffs, lits, sum(coeffs) // 2)
+
+    targets = []
+    for i in range(numTargets):
+        terms = [(coeff, lit) for coeff, lit in zip(coeffs, lits) if rng.random() < 0.5]
+        terms += [(rng.randint(1, 10) * coeffScale, var * rng.choice([1, -1]))
+            for var in rng.sample(range(1, numVars + 1), 4) if var not in lits and -var not in lits]
+        degree = max(1, sum(coeff for coeff, lit in terms) // rng.randint(2, 8))
+        targets.append(Inequality([c for c, l in terms], [l for c, l in terms], degree))
+    return implying, targets
+
+def measure(numTargets, numTerms, coeffScale):
+    implying, targets = createConstraints(numTargets, numTerms, coeffScale)
+
+    start = perf_counter()
+    byMap = [implying.impliesByMap(target) for target in targets]
+    timeByMap = perf_counter() - start
+
+    start = perf_counter()
+    single = [implying.implies(target) for target in targets]
+    timeSingle = perf_counter() - start
+
+    start = perf_counter()
+    many = implying.impliesMany(targets)
+    timeMany = perf_counter() - start
+
+    assert byMap == single == many
+    return timeByMap, timeSingle, timeMany, sum(many)
+
+def main():
+    numTargets = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    numTerms = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    for name, coeffScale in [("64 bit", 1), ("arbitrary precision", 2**64)]:
+        timeByMap, timeSingle, timeMany, numImplied = measure(numTargets, numTerms, coeffScale)
+        print("%s coefficients, %i of %i targets implied:" % (name, numImplied, numTargets))
+        print("  impliesByMap: %.3fs" % timeByMap)
+        print("  implies:      %.3fs (%.1fx)" % (timeSingle, timeByMap / timeSingle))
+        print("  impliesMany:  %.3fs (%.1fx)" % (timeMany, timeByMap / timeMany))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark comparing checking frequent rules (u, p, del id) natively
+in batches to checking every rule in Python.
+
+The formula is a chain of implications x1 -> x2 -> ... -> xn. The
+proofs derive shortcuts in the chain only by reverse unit propagation
+(rup), only by adding constraints in polish notation (pol) or by both
+and delete most derived constraints again (mixed). The time for
+loading the formula, measured with a proof that only loads it, is
+subtracted, so that the throughput is the one of checking the rules.
+
+usage: python3 bench_native_batch.py [numVars]
+"""
+
+import os
+import sys
+import tempfile
+
+from time import perf_counter
+
+from env import veripb
+from veripb import run
+from veripb.utils import Settings as MiscSettings
+from veripb.verifier import Verifier
+
+def createFormula(formulaPath, numVars):
+    with open(formulaPath, "w") as file:
+        file.write("* #variable= %i #constraint= %i\n" % (numVars, numVars - 1))
+        for i in range(1, numVars):
+            file.write("1 ~x%i 1 x%i >= 1 ;\n" % (i, i + 1))
+
+def createProof(proofPath, numVars, kind):
+    numRules = 0
+    with open(proofPath, "w") as file:
+        file.write("pseudo-Boolean proof version 1.1\n")
+        file.write("f %i\n" % (numVars - 1))
+        nextId = numVars
+        for i in range(1, numVars - 1):
+            if kind == "rup":
+                file.write("u 1 ~x%i 1 x%i >= 1 ;\n" % (i, i + 2))
+                numRules += 1
+            elif kind == "pol":
+                file.write("p %i %i +\n" % (i, i + 1))
+                numRules += 1
+            elif kind == "mixed":
+                file.write("u 1 ~x%i 1 x%i >= 1 ;\n" % (i, i + 2))
+                file.write("p %i %i + %i +\n" % (i, i + 1, nextId))
+                file.write("del id %i\n" % (nextId + 1))
+                numRules += 3
+                nextId += 2
+    return numRules
+
+def check(formulaPath, proofPath, useNativeBatch):
+    miscSettings = MiscSettings({"arbitraryPrecision": True})
+    verifierSettings = Verifier.Settings({
+        "useNativeBatch": useNativeBatch,
+        "requireUnsat": False})
+
+    start = perf_counter()
+    with open(formulaPath) as formula:
+        with open(proofPath) as proof:
+            run(formula, proof, verifierSettings, miscSettings)
+    return perf_counter() - start
+
+def main():
+    numVars = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        formulaPath = os.path.join(tmpDir, "formula.opb")
+        proofPath = os.path.join(tmpDir, "proof.pbp")
+        createFormula(formulaPath, numVars)
+
+        createProof(proofPath, numVars, "load")
+        loadTime = min(check(formulaPath, proofPath, False) for i in range(3))
+        print("loading the formula: %.2fs" % loadTime)
+
+        for kind in ["rup", "pol", "mixed"]:
+            numRules = createProof(proofPath, numVars, kind)
+            pythonTime = check(formulaPath, proofPath, False) - loadTime
+            nativeTime = check(formulaPath, proofPath, True) - loadTime
+
+            print("%s, %i rules:" % (kind, numRules))
+            print("  python:            %.2fs (%.0f rules/s)" % (pythonTime, numRules / pythonTime))
+            print("  native:            %.2fs (%.0f rules/s)" % (nativeTime, numRules / nativeTime))
+            print("  speedup:           %.1f" % (pythonTime / nativeTime))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Helpers for tests that check complete proofs.
+"""
+
+import unittest
+import tempfile
+import os
+
+from contextlib import nullcontext
+from pathlib import Path
+
+from env import veripb
+from veripb import run, InvalidProof, ParseError
+
+from veripb.utils import Settings as MiscSettings
+from veripb.verifier import Verifier
+
+header = "pseudo-Boolean proof version 1.1\n"
+
+def openFile(file):
+    if isinstance(file, (str, os.PathLike)):
+        return open(file)
+    else:
+        return nullcontext(file)
+
+def message(e, proofFile):
+    name = getattr(proofFile, "name", None)
+    if isinstance(name, str):
+        return str(e).replace(name, "proof")
+    return str(e)
+
+def runProof(formula, proof, verifierSettings = dict(), miscSettings = dict()):
+    """
+    Check the proof of the formula, both are paths or open files. The
+    given settings are applied on top of checking deletions with
+    arbitrary precision.
+
+    Returns None if the proof is correct and a tuple describing the
+    error otherwise. The name of the proof file is replaced by
+    "proof" in error messages so that results for different files
+    can be compared.
+    """
+    misc = MiscSettings({"arbitraryPrecision": True})
+    misc.setPreset(miscSettings)
+    verifier = Verifier.Settings({"isCheckDeletionOn": True})
+    verifier.setPreset(verifierSettings)
+
+    with openFile(formula) as formulaFile:
+        with openFile(proof) as proofFile:
+            try:
+                run(formulaFile, proofFile, verifier, misc)
+            except InvalidProof as e:
+                return (type(e), message(e, proofFile), e.lineInFile)
+            except ParseError as e:
+                return (type(e), message(e, proofFile), e.line, e.column)
+            except Exception as e:
+                return (type(e), message(e, proofFile))
+            else:
+                return None
+
+def integrationProofs(pattern, formulaSuffixes = (".opb",)):
+    """
+    Yield the pairs of formula and proof path of the integration
+    tests with proofs matching the pattern. The formula is the file
+    with the same name and the first of the suffixes that exists,
+    proofs without formula are skipped.
+    """
+    current = Path(__file__).parent
+    for proofPath in sorted(current.glob("integration_tests/" + pattern)):
+        for suffix in formulaSuffixes:
+            formulaPath = proofPath.with_suffix(suffix)
+            if formulaPath.exists():
+                yield formulaPath, proofPath
+                break
+
+class ProofTestCase(unittest.TestCase):
+    """
+    Test case with a temporary directory. The formula of the test
+    case, if any, is written to formulaPath.
+    """
+
+    formula = None
+
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.proofPath = self.path("proof.pbp")
+        if self.formula is not None:
+            self.formulaPath = self.write("formula.opb", self.formula)
+
+    def tearDown(self):
+        self.tmpDir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpDir.name, name)
+
+    def write(self, name, content):
+        """
+        Write the content, text or bytes, to the file with the given
+        name in the temporary directory and return its path.
+        """
+        path = self.path(name)
+        with open(path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        return path
+
+    def writeProof(self, proof):
+        """
+        Write the proof, which is prefixed with the header, to
+        proofPath.
+        """
+        self.write("proof.pbp", header + proof)
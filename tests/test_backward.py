@@ -0,0 +1,118 @@
+import unittest
+
+from env import veripb
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+class TestBackward(ProofTestCase):
+    formula = "* #variable= 4 #constraint= 4\n" \
+        "1 x1 1 x2 >= 1 ;\n" \
+        "1 ~x1 1 x2 >= 1 ;\n" \
+        "1 x1 1 ~x2 >= 1 ;\n" \
+        "1 ~x1 1 ~x2 >= 1 ;\n"
+
+    def check(self, proof, backward = True, checkDeletion = True):
+        self.writeProof("f 4\n" + proof)
+        return runProof(self.formulaPath, self.proofPath, {
+            "isCheckDeletionOn": checkDeletion,
+            "backward": backward})
+
+    def test_success(self):
+        proof = "u 1 x2 >= 1 ;\n" \
+            "p 3 5 +\n" \
+            "u 1 x3 1 x4 >= 1 ;\n" \
+            "del id 7\n" \
+            "u >= 1 ;\n" \
+            "c 8\n"
+        assert(self.check(proof, False) is None)
+        assert(self.check(proof) is None)
+
+    def test_skip_unneeded(self):
+        # the step deriving 5 is wrong but not needed
+        proof = "u 1 x3 1 x4 >= 1 ;\n" \
+            "u 1 x2 >= 1 ;\n" \
+            "u 1 ~x2 >= 1 ;\n" \
+            "u >= 1 ;\n" \
+            "c 8\n"
+        assert(self.check(proof, False)[2] == 3)
+        assert(self.check(proof) is None)
+
+    def test_skip_propagating(self):
+        # the wrong step deriving 5 propagates, but does not
+        # participate in any conflict
+        proof = "u 1 x3 >= 1 ;\n" \
+            "u 1 x2 >= 1 ;\n" \
+            "u 1 ~x2 >= 1 ;\n" \
+            "u >= 1 ;\n" \
+            "c 8\n"
+        assert(self.check(proof, False)[2] == 3)
+        assert(self.check(proof) is None)
+
+    def test_fail_needed(self):
+        proof = "u 1 x3 >= 1 ;\n" \
+            "u 1 x2 >= 1 ;\n" \
+            "u 1 ~x2 >= 1 ;\n" \
+            "p 6 7 + 5 +\n" \
+            "c 8\n"
+        expected = self.check(proof, False)
+        assert(expected is not None and expected[2] == 3)
+        assert(self.check(proof) == expected)
+
+    def test_hints(self):
+        proof = "u 1 x3 >= 1 ;\n" \
+            "u 1 x2 >= 1 ; 1 2\n" \
+            "u >= 1 ; 6 3 4\n" \
+            "c 7\n"
+        assert(self.check(proof, False)[2] == 3)
+        assert(self.check(proof) is None)
+
+        proof = "u 1 x2 >= 1 ; 1\n" \
+            "u >= 1 ; 5 3 4\n" \
+            "c 6\n"
+        assert(self.check(proof)[2] == 3)
+
+    def test_rederive_deleted(self):
+        # the constraint needed for the contradiction was deleted and
+        # derived again in between
+        proof = "u 1 x2 >= 1 ;\n" \
+            "del id 5\n" \
+            "u 1 x2 >= 1 ;\n" \
+            "u 1 x2 >= 1 ;\n" \
+            "del id 6\n" \
+            "l 1\n" \
+            "u >= 1 ;\n" \
+            "c 9\n"
+        assert(self.check(proof, False) is None)
+        assert(self.check(proof) is None)
+
+        # a deleted constraint of the formula is loaded again
+        proof = "del id 1\n" \
+            "l 1\n" \
+            "u 1 x2 >= 1 ;\n" \
+            "u >= 1 ;\n" \
+            "c 7\n"
+        assert(self.check(proof, False, False) is None)
+        assert(self.check(proof, True, False) is None)
+
+    def test_deletion_check(self):
+        # deletions of the formula are checked even if nothing
+        # depends on them
+        proof = "del id 1\n" \
+            "u 1 x1 >= 1 ;\n"
+        result = self.check(proof)
+        assert(result is not None and result[2] == 3)
+        assert(result == self.check(proof, False))
+        assert(self.check(proof, checkDeletion = False) is None)
+
+    def test_unsupported(self):
+        proof = "core id 1\n"
+        result = self.check(proof)
+        assert(result[0] == NotImplementedError)
+
+    def test_integration_proofs(self):
+        for formulaPath, proofPath in integrationProofs("correct/*.pbp"):
+            result = runProof(formulaPath, proofPath, {"backward": True})
+            assert(result is None or result[0] == NotImplementedError), proofPath
+
+if __name__=="__main__":
+    unittest.main()
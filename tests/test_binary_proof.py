@@ -0,0 +1,55 @@
+import unittest
+
+from env import veripb
+
+from veripb.binary_proof import toBinary, toText, isBinary
+from veripb.parser import LineParser
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+def readLines(path):
+    with open(path) as file:
+        with LineParser(file) as lines:
+            return [(lines.iter.getLine(), lines.iter.getLineText()) for line in lines]
+
+class TestBinaryProof(ProofTestCase):
+    def setUp(self):
+        super().setUp()
+        self.binaryPath = self.path("proof.pbpb")
+        self.textPath = self.path("proof.pbp")
+
+    def writeText(self, content):
+        self.write("proof.pbp", content)
+
+    def roundTrip(self, textPath):
+        toBinary(textPath, self.binaryPath)
+        assert(isBinary(self.binaryPath))
+        assert(not isBinary(textPath))
+        expected = readLines(textPath)
+        assert(readLines(self.binaryPath) == expected)
+
+        toText(self.binaryPath, self.textPath)
+        assert(readLines(self.textPath) == expected)
+
+    def test_spacing(self):
+        self.writeText(b"u  1 x1\t1 ~x2 >= 1 ; \n\n   \n  * x01 -0 -12 007 a\r\nx")
+        self.roundTrip(self.textPath)
+
+    def test_large_numbers(self):
+        big = str(2**70)
+        self.writeText(("p 1 2 + %s * -%s d\nu %s x1 >= 1;\nx%s" % (big, big, big, big)).encode())
+        self.roundTrip(self.textPath)
+
+    def test_empty(self):
+        self.writeText(b"")
+        self.roundTrip(self.textPath)
+
+    def test_integration_proofs(self):
+        for formulaPath, textPath in integrationProofs("**/*.pbp", (".opb", ".cnf")):
+            self.roundTrip(str(textPath))
+            expected = runProof(formulaPath, textPath)
+            result = runProof(formulaPath, self.binaryPath)
+            assert(result == expected), textPath
+
+if __name__=="__main__":
+    unittest.main()
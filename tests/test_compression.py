@@ -0,0 +1,97 @@
+import unittest
+import gzip
+import lzma
+import bz2
+import shutil
+import subprocess
+
+from env import veripb
+from veripb import ParseError
+
+from veripb.parser import LineParser
+from veripb.optimized.parsing import DecompressedFile, compression
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+def zstdCompress(data):
+    return subprocess.run(["zstd", "-q", "-c"], input = data,
+        check = True, capture_output = True).stdout
+
+compressors = {
+    "gzip": gzip.compress,
+    "xz": lzma.compress,
+    "bzip2": bz2.compress
+}
+
+# there is no zstd module in the standard library
+if shutil.which("zstd") is not None:
+    compressors["zstd"] = zstdCompress
+
+def readLines(path, native = LineParser.openNative):
+    with open(path) as pyFile:
+        file = LineParser(pyFile)
+    file.file.close()
+    file.file = native(path)
+    file.nextLine = file.file.nextLine
+    with file as lines:
+        return [(lines.iter.getLine(), lines.iter.getLineText()) for line in lines]
+
+class TestCompression(ProofTestCase):
+    def compressed(self, content, name = "file"):
+        result = dict()
+        for format, compress in compressors.items():
+            path = self.write(name + "." + format, compress(content))
+            assert(compression(path) == format)
+            result[format] = path
+        return result
+
+    def test_lines(self):
+        content = b"u 1 x1 >= 1 ;\n\n* comment\r\n  del id 3\nlast"
+        expected = readLines(self.write("plain", content))
+        assert(compression(self.path("plain")) == "")
+        for path in self.compressed(content).values():
+            assert(readLines(path) == expected)
+
+    def test_buffer_boundaries(self):
+        # lines are split across many writes to a tiny ring buffer
+        content = b"".join(b"%i %s\n" % (i, b"x" * (i % 100)) for i in range(2000))
+        expected = readLines(self.write("plain", content))
+        for path in self.compressed(content).values():
+            assert(readLines(path, lambda name: DecompressedFile(name, 7)) == expected)
+
+    def test_concatenated(self):
+        for format, compress in compressors.items():
+            content = compress(b"a 1\nb ") + compress(b"2\nc 3\n")
+            path = self.write("concatenated." + format, content)
+            assert([text for line, text in readLines(path)] == ["a 1", "b 2", "c 3"]), format
+
+    def test_empty(self):
+        for path in self.compressed(b"").values():
+            assert(readLines(path) == [])
+
+    def test_corrupted(self):
+        content = b"".join(b"u 1 x%i >= 1 ;\n" % i for i in range(1000))
+        for format, compress in compressors.items():
+            data = compress(content)
+            path = self.write("truncated." + format, data[:len(data) // 2])
+            with self.assertRaises(ParseError):
+                readLines(path)
+
+    def test_early_close(self):
+        content = b"".join(b"u 1 x%i >= 1 ;\n" % i for i in range(100000))
+        for path in self.compressed(content).values():
+            with open(path) as pyFile:
+                with LineParser(pyFile) as lines:
+                    next(lines)
+
+    def test_integration_proofs(self):
+        for formulaPath, proofPath in integrationProofs("correct/*.pbp", (".opb", ".cnf")):
+            expected = runProof(formulaPath, proofPath)
+            compressedFormulas = self.compressed(formulaPath.read_bytes(), "formula")
+            compressedProofs = self.compressed(proofPath.read_bytes(), "proof")
+            for format in compressors:
+                result = runProof(compressedFormulas[format], compressedProofs[format])
+                assert(result == expected), proofPath
+
+if __name__=="__main__":
+    unittest.main()
@@ -2,6 +2,8 @@ import unittest
 from env import veripb
 
 from veripb.optimized.constraints import CppInequality as Inequality
+from veripb.optimized.constraints import PropEngine
+from veripb.optimized.constraints import Substitution
 
 def getParser():
     return True
@@ -22,6 +24,267 @@ class TestCpp(unittest.TestCase):
         a = Inequality([1,2], [1,2], 4)
         assert a.isContradiction()
 
+    def test_rup_ids(self):
+        engine = PropEngine(10)
+        db = [
+            geq([(1, 1), (1, 2)], 1),
+            geq([(1, -1), (1, 2)], 1),
+            geq([(1, 3)], 1),
+            geq([(2, 5), (1, 6), (1, 7)], 2),
+            geq([(1, -6)], 1),
+            geq([(1, 8), (1, 9)], 1)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+
+        assert geq([(1, 2)], 1).rupCheck(engine, False) == True
+        # constraint 3 propagates, but does not participate in the
+        # conflict, the ids are in the order of propagation
+        for i in range(20):
+            assert geq([(1, 2)], 1).rupCheck(engine, False, True) == [2, 1]
+        assert geq([(1, 5)], 1).rupCheck(engine, returnIds = True) == [5, 4]
+        assert geq([(1, 8)], 1).rupCheck(engine, False) == False
+        assert geq([(1, 8)], 1).rupCheck(engine, False, True) is None
+        assert geq([(1, 3)], 1).rupCheck(engine, False, True) == [3]
+
+    def test_coefficient_types(self):
+        # the sums of the coefficients fit into 32 bit, 64 bit and
+        # neither of them
+        for big in [2**20, 2**40, 2**62]:
+            engine = PropEngine(10)
+            db = [
+                geq([(big, 1), (big, 2), (1, 3)], big + 1),
+                geq([(big, -1), (big, 4), (big, 5)], 2 * big),
+                geq([(big, -4), (1, -5)], big)]
+            for i, ineq in enumerate(db):
+                engine.attach(ineq, i + 1)
+
+            assert geq([(1, 3)], 1).rupCheck(engine) == True
+            assert geq([(1, 1)], 1).rupCheck(engine) == False
+            assert geq([(1, 2)], 1).rupCheck(engine) == True
+            assert geq([(1, -2)], 1).rupCheck(engine) == False
+            ids = geq([(1, 3), (1, -1)], 1).rupCheck(engine, returnIds = True)
+            assert geq([(1, 3), (1, -1)], 1).rupCheckHinted(engine, [db[i - 1] for i in ids])
+            assert engine.find(geq([(big, 1), (big, 2), (1, 3)], big + 1)) is not None
+
+    def test_cardinality(self):
+        engine = PropEngine(10)
+        # at most two of x1, ..., x4 and at least three of x4, ..., x7
+        db = [
+            geq([(1, -1), (1, -2), (1, -3), (1, -4)], 2),
+            geq([(1, 4), (1, 5), (1, 6), (1, 7)], 3)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+
+        assert geq([(1, -1), (1, -2), (1, -3)], 1).rupCheck(engine) == True
+        assert geq([(1, -1), (1, -2)], 1).rupCheck(engine) == False
+        assert geq([(1, 4), (1, 5), (1, 6)], 1).rupCheck(engine) == True
+        assert geq([(1, 4)], 1).rupCheck(engine) == False
+        ids = geq([(1, -1), (1, -2), (1, 5)], 1).rupCheck(engine, returnIds = True)
+        assert ids == [1, 2]
+        assert geq([(1, -1), (1, -2), (1, 5)], 1).rupCheckHinted(engine, [db[i - 1] for i in ids])
+
+    def test_binary_clauses(self):
+        engine = PropEngine(10)
+        # x1 implies x2 implies x3 and x3 implies x4 or x5
+        db = [
+            geq([(1, -1), (1, 2)], 1),
+            geq([(1, -2), (1, 3)], 1),
+            geq([(1, -3), (1, 4), (1, 5)], 1),
+            geq([(1, -4)], 1)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+
+        assert sorted(geq([(1, -1), (1, 5)], 1).rupCheck(engine, returnIds = True)) == [1, 2, 3, 4]
+        assert sorted(geq([(1, -1), (1, 3)], 1).rupCheck(engine, returnIds = True)) == [1, 2]
+        assert geq([(1, -1), (1, 3)], 1).rupCheckHinted(engine, [db[0], db[1]])
+        assert engine.detach(db[1], 2)
+        assert geq([(1, -1), (1, 3)], 1).rupCheck(engine) == False
+        assert geq([(1, -2), (1, 5)], 1).rupCheck(engine) == False
+        assert geq([(1, -3), (1, 5)], 1).rupCheck(engine) == True
+
+    def test_propagation_after_deletion(self):
+        # the constraints are initialized while the database is
+        # conflicting, after the deletion they need to propagate again
+        for scale in [1, 2]:
+            engine = PropEngine(20)
+            db = [
+                geq([(scale, -7), (scale, -6)], scale),
+                geq([(scale, 14), (scale, -6), (scale, 7), (scale, -8)], 3 * scale),
+                geq([(scale, 12), (scale, 6), (scale, -18), (scale, 17)], 4 * scale),
+                geq([(scale, -9), (scale, -19), (scale, 18), (scale, 4), (scale, -6)], 4 * scale)]
+            for i, ineq in enumerate(db):
+                engine.attach(ineq, i + 1)
+
+            assert geq([(1, 2)], 1).rupCheck(engine) == True
+            engine.detach(db[1], 2)
+            engine.detach(db[3], 4)
+            assert geq([(1, -2), (1, -7)], 1).rupCheck(engine) == True
+            assert geq([(1, -2), (1, 7)], 1).rupCheck(engine) == False
+
+    def test_propagation_schedule(self):
+        engine = PropEngine(30)
+        db = [geq([(1, 1)], 1)] + [geq([(2**70, -i), (2**70, i + 1), (1, 20)], 2**70) for i in range(1, 10)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+        engine.moveAllToCore()
+        db.append(geq([(1, -10), (1, 11)], 1))
+        engine.attach(db[-1], 11)
+
+        for i in range(20):
+            assert geq([(1, 10)], 1).rupCheck(engine, i % 4 < 2) == True
+            assert geq([(1, 11)], 1).rupCheck(engine, i % 4 < 2) == (i % 4 >= 2)
+            assert geq([(1, 12)], 1).rupCheck(engine, i % 4 < 2) == False
+
+        stats = engine.schedulerStats()
+        assert stats["full_propagations"] >= 1
+        assert stats["scheduled_propagations"] + stats["checks_up_to_date"] + stats["checks_outdated"] == 60
+
+    def test_compute_effected(self):
+        engine = PropEngine(10)
+        db = [
+            geq([(1, 1), (1, 2)], 1),
+            geq([(1, -1), (1, 3)], 1),
+            geq([(2, 1), (1, -2), (1, 4)], 2),
+            geq([(1, 4), (1, 5)], 1)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+
+        # x1 -> x5, every constraint containing x1 or ~x1 is affected once
+        effected = engine.computeEffected(Substitution([], [1], [5]), False)
+        assert sorted(map(repr, effected)) == sorted(map(repr, [
+            geq([(1, 5), (1, 2)], 1),
+            geq([(1, -5), (1, 3)], 1),
+            geq([(2, 5), (1, -2), (1, 4)], 2)]))
+
+        engine.detach(db[1], 2)
+        effected = engine.computeEffected(Substitution([], [1, 2], [5, 6]), False)
+        assert len(effected) == 2
+        # setting a literal to one only weakens the constraint
+        assert engine.computeEffected(Substitution([4], [], []), False) == []
+
+    def test_removal_keeps_order(self):
+        engine = PropEngine(10)
+        db = [geq([(1, 1), (1, i)], 1) for i in range(2, 7)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+        engine.detach(db[1], 2)
+
+        # newer constraints are registered first
+        sub = Substitution([], [1], [7])
+        goals, numImplied = engine.computeSubgoals(sub, None)
+        assert [goal.minId for goal in goals] == [5, 4, 3, 1]
+
+    def test_compute_subgoals(self):
+        engine = PropEngine(10)
+        db = [
+            geq([(1, 1), (1, 2)], 1),
+            geq([(1, -1), (1, 3)], 1),
+            geq([(2, 1), (1, -2), (1, 4)], 2),
+            geq([(1, 2), (1, 3)], 1)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+
+        # swap x1 and x2, the negated constraint x1 >= 1 implies the
+        # goal of constraint 4, the goal of constraint 1 is
+        # constraint 1 itself
+        sub = Substitution([], [1, 2], [2, 1])
+        goals, numImplied = engine.computeSubgoals(sub, geq([(1, 1)], 1))
+        assert numImplied == 1
+        assert sorted((goal.minId, repr(goal)) for goal in goals) == [
+            (2, repr(geq([(1, -2), (1, 3)], 1))),
+            (3, repr(geq([(2, 2), (1, -1), (1, 4)], 2)))]
+
+        goals, numImplied = engine.computeSubgoals(sub, None)
+        assert numImplied == 0
+        assert sorted(goal.minId for goal in goals) == [2, 3, 4]
+
+    def test_find_implier(self):
+        engine = PropEngine(10)
+        db = [
+            geq([(1, 1)], 1),
+            geq([(3, -1), (2, 2), (2, 3), (2, 9)], 4),
+            geq([(1, 4), (1, 5), (1, 6)], 2),
+            geq([(1, 7), (1, 8)], 1)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+
+        # x1 is propagated, hence constraint 2 becomes 2 x2 + 2 x3 + 2 x9 >= 4
+        assert engine.findImplier(geq([(2, 2), (2, 3), (2, 9)], 4)) == 2
+        assert engine.findImplier(geq([(1, 2), (1, 3), (1, 9)], 2)) is None
+        assert engine.findImplier(geq([(1, 4), (1, 5)], 1)) == 3
+        assert engine.findImplier(geq([(1, 4), (1, 10)], 1)) is None
+        assert engine.findImplier(geq([(1, -7), (1, 8)], 1)) is None
+
+        # constraints attached temporarily with id 0 are skipped, but
+        # not if they are also attached with another id
+        tmp = engine.attach(geq([(1, 4), (1, 10)], 1), 0)
+        assert engine.findImplier(geq([(1, 4), (1, 10)], 1)) is None
+        engine.attach(tmp, 5)
+        assert engine.findImplier(geq([(1, 4), (1, 10)], 1)) == 5
+        engine.detach(tmp, 5)
+        engine.detach(tmp, 0)
+
+        engine.detach(db[0], 1)
+        assert engine.findImplier(geq([(2, 2), (2, 3), (2, 9)], 4)) is None
+
+    def test_implies(self):
+        for big in [1, 2**40, 2**70]:
+            a = geq([(2 * big, 1), (big, -2), (3 * big, 3)], 3 * big)
+            targets = [
+                geq([(2 * big, 1), (big, -2), (3 * big, 3)], 3 * big),
+                geq([(2 * big, 1), (3 * big, 3)], 2 * big),
+                # saturated coefficients do not need to be weakened
+                geq([(big, 1), (big, 3)], big),
+                geq([(big, 1), (big, 3)], 2 * big),
+                geq([(2 * big, 1), (big, 2), (3 * big, 3)], 3 * big),
+                geq([(big, 4)], big)]
+            expected = [True, True, True, False, False, False]
+            assert [a.implies(b) for b in targets] == expected
+            assert [a.impliesByMap(b) for b in targets] == expected
+            assert a.impliesMany(targets) == expected
+            assert a.impliesMany([]) == []
+
+    def test_lookup(self):
+        engine = PropEngine(200)
+        db = [geq([(i % 3 + 1, i), (2, -(i + 1)), (1, i + 2)], i % 4 + 1) for i in range(1, 100)]
+        for i, ineq in enumerate(db):
+            engine.attach(ineq, i + 1)
+
+        # the order of the terms does not matter
+        assert engine.find(geq([(1, 7), (2, -6), (3, 5)], 2)) is not None
+        assert engine.find(geq([(1, 7), (2, -6), (3, 5)], 3)) is None
+        query = geq([(2, 7), (4, -6), (6, 5)], 4)
+        assert engine.find(query) is None
+        assert engine.find(query.divide(2)) is not None
+
+        for i in range(0, 99, 2):
+            assert engine.detach(db[i], i + 1)
+        for i, ineq in enumerate(db):
+            copy = geq([((i + 1) % 3 + 1, i + 1), (2, -(i + 2)), (1, i + 3)], (i + 1) % 4 + 1)
+            assert (engine.find(copy) is not None) == (i % 2 == 1)
+            assert (engine.find(ineq) is not None) == (i % 2 == 1)
+
+        stats = engine.lookupStats()
+        assert stats["lookup_requests"] == 99 + 4 + 50 + 2 * 99
+        assert stats["time_find"] >= stats["time_hash"]
+
+    def test_coefficient_overflow(self):
+        # coefficients leave and reenter the 64 bit range
+        a = geq([(2**62, 1), (2**62, 2), (3, 3)], 2**62 + 1)
+        b = a.copy().multiply(4)
+        assert b == geq([(2**64, 1), (2**64, 2), (12, 3)], 2**64 + 4)
+        assert b.copy().divide(4) == a
+
+        c = b.copy().add(geq([(-2**64, 1)], -2**64 + 5))
+        assert c == geq([(2**64, 2), (12, 3)], 9)
+
+        d = geq([(1, 1)], -2**63).negated()
+        assert d == geq([(1, -1)], 2**63 + 2)
+
+        engine = PropEngine(10)
+        engine.attach(a, 1)
+        assert engine.find(b.copy().divide(4)) is not None
+
 #     def testEQ(self):
 #         a = Inequality([1,1], [1,2], 4)
 #         b = Inequality([1,1], [2,1], 4)
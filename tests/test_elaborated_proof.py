@@ -0,0 +1,41 @@
+import unittest
+
+from env import veripb
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+class TestElaboratedProof(ProofTestCase):
+    formula = "* #variable= 4 #constraint= 4\n" \
+        "1 x1 1 x2 >= 1 ;\n" \
+        "1 ~x1 1 x2 >= 1 ;\n" \
+        "1 x1 1 ~x2 >= 1 ;\n" \
+        "1 ~x1 1 ~x2 >= 1 ;\n"
+
+    def test_elaborate(self):
+        self.writeProof("f 4\n"
+            "* comments are dropped\n"
+            "u 1 x2 >= 1 ;\n"
+            "u 1 x1 >= 1 ; 3 5\n"
+            "p 5 6 + 4 +\n"
+            "c -1\n")
+
+        elaboratedPath = self.path("elaborated.pbp")
+        assert(runProof(self.formulaPath, self.proofPath, {"elaboratedProof": elaboratedPath}) is None)
+        with open(elaboratedPath) as file:
+            assert(file.read().splitlines() == [
+                "pseudo-Boolean proof version 1.1",
+                "f 4",
+                "u 1 x2 >= 1 ; 2 1",
+                "u 1 x1 >= 1 ; 3 5",
+                "p 5 6 + 4 +",
+                "c -1"])
+        assert(runProof(self.formulaPath, elaboratedPath) is None)
+
+    def test_integration_proofs(self):
+        elaboratedPath = self.path("elaborated.pbp")
+        for formulaPath, proofPath in integrationProofs("correct/**/*.pbp"):
+            result = runProof(formulaPath, proofPath, {"elaboratedProof": elaboratedPath})
+            assert(runProof(formulaPath, elaboratedPath) == result), proofPath
+
+if __name__=="__main__":
+    unittest.main()
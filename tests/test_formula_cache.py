@@ -0,0 +1,141 @@
+import unittest
+import threading
+import os
+
+from pathlib import Path
+
+from env import veripb
+
+from veripb.formula_cache import FormulaCache
+from veripb.optimized.parsing import parseOpb, parseCnf, parseWcnf, VariableNameManager
+from veripb.utils import loadFormula
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+def describe(formula, varMgr):
+    return {
+        "numVariables": formula["numVariables"],
+        "names": [varMgr.getName(var) for var in range(1, varMgr.maxVar() + 1)],
+        "constraints": [repr(constraint) for constraint in formula["constraints"]],
+        "objective": formula["objective"],
+    }
+
+class TestFormulaCache(ProofTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cacheDir = self.path("cache")
+
+    def load(self, path, parser, freeNames = True, cache = None):
+        varMgr = VariableNameManager(freeNames)
+        with open(path) as file:
+            formula = loadFormula(file, parser, varMgr, cache = cache)
+        return describe(formula, varMgr), formula["constraints"]
+
+    def snapshots(self):
+        return sorted(name for name in os.listdir(self.cacheDir) if name.endswith(FormulaCache.suffix))
+
+    def check(self, path, parser, freeNames = True):
+        expected, expectedConstraints = self.load(path, parser, freeNames)
+        cache = FormulaCache(self.cacheDir, 1 << 30)
+        for i in range(2):
+            result, constraints = self.load(path, parser, freeNames, cache)
+            assert(result == expected)
+            assert(constraints == expectedConstraints)
+        assert(len(self.snapshots()) >= 1)
+
+    def test_opb(self):
+        path = self.write("formula.opb",
+            "* #variable= 4 #constraint= 4\n"
+            "min: 3 vb -2 x7 1208925819614629174706176 va ;\n"
+            "1 x7 -2 ~vb 3 va >= 1 ;\n"
+            "1208925819614629174706176 va 1 vb = 1208925819614629174706177 ;\n"
+            "1 va 1 vb >= 1 ;\n"
+            "2 x7 2 ~x7 >= 3 ;\n"
+            "-3 va -1 x12 >= -2 ;\n")
+        self.check(path, parseOpb)
+
+    def test_cnf(self):
+        path = self.write("formula.cnf", "p cnf 4 3\n1 -2 0\n2 2 3 0\n-4 1 -1 0\n")
+        self.check(path, parseCnf, False)
+        self.check(path, parseCnf, True)
+
+    def test_wcnf(self):
+        path = self.write("formula.wcnf", "p wcnf 3 3 10\n10 1 -2 0\n3 2 3 0\n1 -3 0\n")
+        self.check(path, parseWcnf)
+
+    def test_keys(self):
+        cache = FormulaCache(self.cacheDir, 1 << 30)
+        path = self.write("formula.opb", "1 x1 >= 1 ;\n")
+        key = cache.key(path, "parseOpb", True)
+        assert(cache.key(path, "parseOpb", False) != key)
+        assert(cache.key(path, "parseCnf", True) != key)
+        self.write("formula.opb", "1 x2 >= 1 ;\n")
+        assert(cache.key(path, "parseOpb", True) != key)
+
+        self.load(path, parseOpb, cache = cache)
+        result, constraints = self.load(path, parseOpb, cache = cache)
+        assert(result["names"] == ["x2"])
+
+    def test_corrupted(self):
+        path = self.write("formula.opb", "1 x1 2 x2 >= 1 ;\n")
+        expected, constraints = self.load(path, parseOpb)
+        cache = FormulaCache(self.cacheDir, 1 << 30)
+        self.load(path, parseOpb, cache = cache)
+        snapshot = os.path.join(self.cacheDir, self.snapshots()[0])
+        content = Path(snapshot).read_bytes()
+        for broken in [content[:len(content) // 2], content[:-1], b"", content[:-9] + b"\xff" + content[-8:]]:
+            Path(snapshot).write_bytes(broken)
+            result, constraints = self.load(path, parseOpb, cache = cache)
+            assert(result == expected)
+            assert(Path(snapshot).read_bytes() == content)
+
+    def test_eviction(self):
+        cache = FormulaCache(self.cacheDir, 1 << 30)
+        paths = list()
+        for i in range(5):
+            paths.append(self.write("formula%i.opb" % i, "1 x%i >= 1 ;\n" % i))
+            self.load(paths[-1], parseOpb, cache = cache)
+        assert(len(self.snapshots()) == 5)
+
+        size = os.path.getsize(os.path.join(self.cacheDir, self.snapshots()[0]))
+        # mark the first snapshot as recently used
+        oldest = [cache.path(cache.key(path, "parseOpb", True)) for path in paths]
+        for i, snapshot in enumerate(oldest):
+            os.utime(snapshot, (i + 1, i + 1))
+        self.load(paths[0], parseOpb, cache = cache)
+
+        cache.maxSize = 2 * size
+        cache.evict()
+        assert(sorted(os.listdir(self.cacheDir)) ==
+            sorted(["lock", os.path.basename(oldest[0]), os.path.basename(oldest[4])]))
+
+    def test_concurrent(self):
+        lines = ["* #variable= 300 #constraint= 2000"]
+        lines += ["1 x%i 2 ~x%i 3 x%i >= 2 ;" % (i % 300 + 1, (7 * i) % 300 + 1, (13 * i) % 300 + 1) for i in range(2000)]
+        path = self.write("formula.opb", "\n".join(lines) + "\n")
+        expected, constraints = self.load(path, parseOpb)
+
+        results = list()
+        def worker():
+            cache = FormulaCache(self.cacheDir, 1 << 30)
+            for i in range(5):
+                results.append(self.load(path, parseOpb, cache = cache)[0])
+
+        workers = [threading.Thread(target = worker) for i in range(4)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        assert(results == [expected] * 20)
+        assert(len(self.snapshots()) == 1)
+        assert([name for name in os.listdir(self.cacheDir) if name.endswith(FormulaCache.tmpSuffix)] == [])
+
+    def test_integration_proofs(self):
+        for formulaPath, proofPath in integrationProofs("correct/*.pbp"):
+            results = [runProof(formulaPath, proofPath, miscSettings = {"formulaCache": formulaCache})
+                for formulaCache in [None, self.cacheDir, self.cacheDir]]
+            assert(results[1] == results[0] and results[2] == results[0]), proofPath
+
+if __name__=="__main__":
+    unittest.main()
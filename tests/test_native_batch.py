@@ -0,0 +1,107 @@
+import unittest
+
+from env import veripb
+from veripb import InvalidProof
+
+from veripb.parser import RuleParser
+from veripb.rules_register import get_registered_rules
+from veripb.verifier import Verifier, Context
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+class TestNativeBatch(ProofTestCase):
+    formula = "* #variable= 3 #constraint= 2\n1 x1 1 x2 >= 1 ;\n1 ~x1 1 x2 >= 1 ;\n"
+
+    def compare(self, proof, checkDeletion = True):
+        self.writeProof("f 2\n" + proof)
+        expected = runProof(self.formulaPath, self.proofPath, {
+            "isCheckDeletionOn": checkDeletion,
+            "useNativeBatch": False})
+        result = runProof(self.formulaPath, self.proofPath, {
+            "isCheckDeletionOn": checkDeletion,
+            "useNativeBatch": True})
+        assert(result == expected)
+        return result
+
+    def test_success(self):
+        assert(self.compare(
+            "u 1 x2 >= 1 ;\n"
+            "* comment\n"
+            "\n"
+            "p 1 2 + 2 d 0\n"
+            "p 3 x3 + s x3 w\n"
+            "del id 4 0\n"
+            "d 3\n"
+            "u 1 x2 >= 1 ;\n") is None)
+
+    def test_rup_failure(self):
+        result = self.compare("u 1 x2 >= 1 ;\nu 1 x3 >= 1 ;\n")
+        assert(issubclass(result[0], InvalidProof) and result[2] == 4)
+
+    def test_rup_hints(self):
+        assert(self.compare(
+            "u 1 x2 >= 1 ; 1 2\n"
+            "u 1 x2 >= 1 ; 2 1\n"
+            "u 1 x2 >= 1 ; 1 -3 0\n"
+            "u 1 x2 >= 1 ; 0\n"
+            "u 1 x2 >= 1 ; c -1\n") is None)
+
+        for line in [
+                "u 1 x2 >= 1 ; 1\n",
+                "u 1 x2 >= 1 ; 1 4\n",
+                "u 1 x2 >= 1 ; 1 0 2\n",
+                "del id 1\nu 1 x2 >= 1 ; 1 2\n"]:
+            result = self.compare(line)
+            assert(result is not None)
+
+    def test_invalid_pol(self):
+        for line in [
+                "p 1 4 +\n",
+                "p 1 2 + -1 *\n",
+                "p 1 2 + 0 d\n",
+                "p 1 x1 *\n",
+                "p 1 2 + r\n",
+                "p 1 ~x1 w\n",
+                "p 1 2 foo +\n",
+                "p +\n",
+                "p 1 2\n"]:
+            self.compare("u 1 x2 >= 1 ;\n" + line)
+
+    def test_invalid_deletion(self):
+        for line in [
+                "del id 5\n",
+                "del id 0\n",
+                "del id\n",
+                "d 3 3\n",
+                "d -1\n",
+                "d 1\n",
+                "del id 3\nd 3\n"]:
+            self.compare("u 1 x2 >= 1 ;\n" + line)
+            self.compare("u 1 x2 >= 1 ;\n" + line, checkDeletion = False)
+
+    def test_parse_error(self):
+        for line in ["u 1 x2 >= ;\n", "u 1 >= 1 ;\n", "p 1 1 +\nfoo\n"]:
+            result = self.compare(line)
+            assert(result[0] is not None)
+
+    def test_batches(self):
+        context = Context()
+        context.verifierSettings = Verifier.Settings()
+        context.formula = [None, None]
+        self.writeProof("u 1 x2 >= 1 ;\nf 2\nu 1 x2 >= 1 ;\n")
+
+        with open(self.proofPath) as proof:
+            rules = list(RuleParser(context).parse(get_registered_rules(), proof))
+
+        # the batches are not run, i.e., do not consume any lines
+        assert([type(rule).__name__ for rule in rules] == \
+            ["NativeBatch", "LoadFormula", "NativeBatch"])
+
+    def test_integration_proofs(self):
+        for formulaPath, proofPath in integrationProofs("**/*.pbp", (".opb", ".cnf")):
+            expected = runProof(formulaPath, proofPath, {"useNativeBatch": False})
+            result = runProof(formulaPath, proofPath, {"useNativeBatch": True})
+            assert(result == expected), proofPath
+
+if __name__=="__main__":
+    unittest.main()
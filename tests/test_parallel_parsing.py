@@ -0,0 +1,131 @@
+import unittest
+import random
+
+from env import veripb
+from veripb import ParseError
+
+from veripb.parser import openFile
+from veripb.optimized.parsing import parseOpb, parseCnf, parseWcnf, VariableNameManager
+
+from proof_helper import ProofTestCase
+
+def parse(parser, path, freeNames, numThreads):
+    varMgr = VariableNameManager(freeNames)
+    reader = openFile(path)
+    try:
+        formula = parser(reader, path, varMgr, numThreads)
+    finally:
+        reader.close()
+
+    constraints = formula.getConstraints()
+    return {
+        "maxVar": (formula.maxVar, varMgr.maxVar()),
+        "names": [varMgr.getName(var) for var in range(1, varMgr.maxVar() + 1)],
+        "constraints": [repr(constraint) for constraint in constraints],
+        "objective": (formula.hasObjective, formula.objectiveVars, formula.objectiveCoeffs),
+        "claimedNumVar": formula.claimedNumVar if parser is parseWcnf else None,
+    }, constraints
+
+def parseError(parser, path, freeNames, numThreads):
+    try:
+        parse(parser, path, freeNames, numThreads)
+    except ParseError as e:
+        return str(e)
+    return None
+
+class TestParallelParsing(ProofTestCase):
+    # large enough to be split into several parts
+    numConstraints = 60000
+
+    def setUp(self):
+        super().setUp()
+        self.random = random.Random(42)
+
+    def writeLines(self, name, lines):
+        return self.write(name, "\n".join(lines) + "\n")
+
+    def opb(self, names):
+        rand = self.random
+        lines = ["* #variable= %i #constraint= %i" % (len(names), self.numConstraints)]
+        lines.append("min: " + " ".join("%i %s" % (rand.randint(-5, 5), rand.choice(names)) for i in range(5)) + " ;")
+        for i in range(self.numConstraints):
+            terms = " ".join("%i %s%s" % (
+                    rand.choice([1, 1, -1, 2, 3, 2**40]),
+                    rand.choice(["", "~"]),
+                    rand.choice(names))
+                for j in range(rand.randint(1, 6)))
+            kind = rand.random()
+            if kind < 0.1:
+                lines.append("%s = %i ;" % (terms, rand.randint(-2, 3)))
+            elif kind < 0.15:
+                lines.append("%s >= %i ==> %s ;" % (terms, rand.randint(1, 3), rand.choice(names)))
+            elif kind < 0.2:
+                lines.append("* comment %i" % i)
+            else:
+                lines.append("%s >= %i ;" % (terms, rand.randint(-1, 4)))
+        return lines
+
+    def cnf(self, numVars, weighted):
+        rand = self.random
+        if weighted:
+            lines = ["p wcnf %i %i 100" % (numVars, self.numConstraints)]
+        else:
+            lines = ["p cnf %i %i" % (numVars, self.numConstraints)]
+        for i in range(self.numConstraints):
+            clause = " ".join(str(rand.choice([-1, 1]) * rand.randint(1, numVars)) for j in range(rand.randint(1, 5)))
+            if weighted:
+                clause = "%i %s" % (rand.choice([100, 100, 1, 7]), clause)
+            lines.append("%s 0" % clause)
+            if i % 1000 == 0:
+                lines.append("c comment")
+        return lines
+
+    def compare(self, parser, path, freeNames):
+        expected, expectedConstraints = parse(parser, path, freeNames, 1)
+        for numThreads in [2, 3, 8]:
+            result, constraints = parse(parser, path, freeNames, numThreads)
+            assert(result == expected)
+            assert(constraints == expectedConstraints)
+
+    def test_opb(self):
+        names = ["x%i" % i for i in range(1, 3000)]
+        path = self.writeLines("formula.opb", self.opb(names))
+        self.compare(parseOpb, path, False)
+        self.compare(parseOpb, path, True)
+
+    def test_opb_names(self):
+        names = ["v%i_%s" % (i, self.random.choice("abc")) for i in range(1, 3000)]
+        path = self.writeLines("formula.opb", self.opb(names))
+        self.compare(parseOpb, path, True)
+
+    def test_cnf(self):
+        path = self.writeLines("formula.cnf", self.cnf(2000, False))
+        self.compare(parseCnf, path, False)
+        self.compare(parseCnf, path, True)
+
+    def test_wcnf(self):
+        # relaxation variables are numbered consecutively over all parts
+        path = self.writeLines("formula.wcnf", self.cnf(2000, True))
+        self.compare(parseWcnf, path, False)
+        self.compare(parseWcnf, path, True)
+
+    def test_error(self):
+        lines = self.opb(["x%i" % i for i in range(1, 100)])
+        for line in [len(lines) // 3, len(lines) - 1]:
+            broken = list(lines)
+            broken[line] = "1 x1 >= ;"
+            path = self.writeLines("broken.opb", broken)
+            expected = parseError(parseOpb, path, True, 1)
+            assert(expected is not None and ":%i:" % (line + 1) in expected)
+            assert(parseError(parseOpb, path, True, 4) == expected)
+
+    def test_objective_after_comments(self):
+        # the objective is only allowed on the first line that is not
+        # a comment, which is parsed before splitting the file
+        lines = self.opb(["x%i" % i for i in range(1, 100)])
+        lines = ["* padding %i" % i for i in range(200000)] + lines[1:]
+        path = self.writeLines("formula.opb", lines)
+        self.compare(parseOpb, path, True)
+
+if __name__=="__main__":
+    unittest.main()
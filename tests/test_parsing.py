@@ -201,3 +201,41 @@ class TestWordParser(unittest.TestCase):
             assert(e.column == 9)
         else:
             assert(False)
+
+class TestLineParser(unittest.TestCase):
+    def readLines(self, content, native):
+        import tempfile
+        with tempfile.NamedTemporaryFile("wb", suffix = ".pbp") as f:
+            f.write(content)
+            f.flush()
+            with open(f.name) as pyFile:
+                file = LineParser(pyFile)
+            file.file.close()
+            file.file = native(f.name)
+            file.nextLine = file.file.nextLine
+            result = list()
+            with file as lines:
+                for words in lines:
+                    result.append((lines.iter.getLine(), list(words)))
+            return result
+
+    def check(self, content):
+        expected = self.readLines(content, StreamFile)
+        assert(self.readLines(content, MappedFile) == expected)
+        assert(self.readLines(content, LineParser.openNative) == expected)
+        return expected
+
+    def test_lines(self):
+        lines = self.check(b"u 1 x1 >= 1 ;\n\n* comment\n  del id 3\n")
+        assert(lines == [
+            (1, ["u", "1", "x1", ">=", "1", ";"]),
+            (2, []),
+            (3, ["*", "comment"]),
+            (4, ["del", "id", "3"])])
+
+    def test_no_final_newline(self):
+        lines = self.check(b"c 1\r\nc 2")
+        assert(lines == [(1, ["c", "1"]), (2, ["c", "2"])])
+
+    def test_empty(self):
+        assert(self.check(b"") == [])
@@ -0,0 +1,171 @@
+import unittest
+import threading
+import time
+import os
+import io
+import gzip
+
+from contextlib import redirect_stderr
+from unittest import mock
+
+from env import veripb
+
+from veripb.parser import LineParser
+from veripb.optimized.parsing import StreamedFile
+from veripb.verifier import Progress
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+def writeSlowly(fd, content, pieceSize = 7, delay = 0.001):
+    try:
+        with os.fdopen(fd, "wb", buffering = 0) as file:
+            for i in range(0, len(content), pieceSize):
+                file.write(content[i:i + pieceSize])
+                if delay > 0:
+                    time.sleep(delay)
+    except BrokenPipeError:
+        pass
+
+def startWriter(fd, content, **kwargs):
+    writer = threading.Thread(target = writeSlowly, args = (fd, content), kwargs = kwargs)
+    writer.start()
+    return writer
+
+def collectLines(lines):
+    return [(lines.iter.getLine(), lines.iter.getLineText()) for line in lines]
+
+class TestStreaming(ProofTestCase):
+    def fifo(self, name, content, **kwargs):
+        path = self.path(name)
+        os.mkfifo(path)
+        def writeFifo():
+            writeSlowly(os.open(path, os.O_WRONLY), content, **kwargs)
+        writer = threading.Thread(target = writeFifo)
+        writer.start()
+        return path, writer
+
+    def readPipe(self, content, **kwargs):
+        readEnd, writeEnd = os.pipe()
+        writer = startWriter(writeEnd, content, **kwargs)
+        with os.fdopen(readEnd) as pyFile:
+            with LineParser(pyFile) as lines:
+                result = collectLines(lines)
+        writer.join()
+        return result
+
+    def test_partial_lines(self):
+        content = b"u 1 x1 >= 1 ;\n\n* comment\r\n  del id 3\nlast"
+        with open(self.write("plain", content)) as pyFile:
+            with LineParser(pyFile) as lines:
+                expected = collectLines(lines)
+
+        assert(self.readPipe(content) == expected)
+        assert(self.readPipe(content, pieceSize = 1) == expected)
+
+    def test_buffer_boundaries(self):
+        # the pipe is read through a tiny bounded buffer
+        content = b"".join(b"%i %s\n" % (i, b"x" * (i % 100)) for i in range(2000))
+        readEnd, writeEnd = os.pipe()
+        writer = startWriter(writeEnd, content, pieceSize = 1000, delay = 0)
+        file = StreamedFile(readEnd, 7)
+        with open(self.write("plain", b"")) as pyFile:
+            lines = LineParser(pyFile)
+        lines.file = file
+        lines.nextLine = file.nextLine
+        with lines:
+            result = [text for line, text in collectLines(lines)]
+        writer.join()
+        assert(result == content.decode().splitlines())
+
+    def test_compressed(self):
+        content = b"".join(b"u 1 x%i >= 1 ;\n" % i for i in range(1000))
+        expected = content.decode().splitlines()
+        result = [text for line, text in self.readPipe(gzip.compress(content), pieceSize = 100)]
+        assert(result == expected)
+
+    def test_early_close(self):
+        content = b"".join(b"u 1 x%i >= 1 ;\n" % i for i in range(100000))
+        readEnd, writeEnd = os.pipe()
+        writer = startWriter(writeEnd, content, pieceSize = 4096, delay = 0)
+        with os.fdopen(readEnd) as pyFile:
+            with LineParser(pyFile) as lines:
+                next(lines)
+        writer.join()
+
+    def test_close_while_waiting(self):
+        # the writer did not write or close anything yet
+        readEnd, writeEnd = os.pipe()
+        with os.fdopen(readEnd) as pyFile:
+            lines = LineParser(pyFile)
+        lines.file.close()
+        os.close(writeEnd)
+
+    def test_integration_proofs(self):
+        for formulaPath, proofPath in integrationProofs("**/*.pbp"):
+            expected = runProof(formulaPath, proofPath)
+
+            path, writer = self.fifo("proof", proofPath.read_bytes(), pieceSize = 4096, delay = 0)
+            result = runProof(formulaPath, path)
+            writer.join()
+            os.unlink(path)
+
+            assert(result == expected), proofPath
+
+    def test_formula_and_progress(self):
+        formula = b"* #variable= 2 #constraint= 3\n1 x1 1 x2 >= 1 ;\n1 ~x1 1 x2 >= 1 ;\n1 ~x2 >= 1 ;\n"
+        proof = b"pseudo-Boolean proof version 1.1\nf 3\nu 1 x2 >= 1 ;\nu >= 1 ;\nc 5\n"
+        formulaPath, formulaWriter = self.fifo("formula", formula)
+        proofPath, proofWriter = self.fifo("proof", proof)
+
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            result = runProof(formulaPath, proofPath, {"progressBar": True})
+        formulaWriter.join()
+        proofWriter.join()
+
+        assert(result is None)
+        assert("4 rules checked" in stderr.getvalue())
+
+    def test_progress(self):
+        # the progress of a regular file is measured by the position
+        # in the file and printed at a bounded rate
+        numVars = 2000
+        formula = "* #variable= %i #constraint= %i\n" % (numVars, numVars - 1)
+        formula += "".join("1 ~x%i 1 x%i >= 1 ;\n" % (i, i + 1) for i in range(1, numVars))
+        proof = "pseudo-Boolean proof version 1.1\nf %i\n" % (numVars - 1)
+        proof += "".join("u 1 ~x%i 1 x%i >= 1 ;\n" % (i, i + 2) for i in range(1, numVars - 1))
+        formulaPath = self.write("formula.opb", formula.encode())
+        proofPath = self.write("proof.pbp", proof.encode())
+
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            result = runProof(formulaPath, proofPath, {"progressBar": True})
+
+        assert(result is None)
+        output = stderr.getvalue()
+        assert("100.0%" in output and "rules/s" in output and "MB/s" in output)
+        assert(output.count("\r") < 100)
+
+    def test_progress_clock(self):
+        # the clock is only read every few rules, how many depends on
+        # the measured rate
+        clock = [0.0]
+        reads = [0]
+        def fakeTime():
+            reads[0] += 1
+            return clock[0]
+
+        stream = io.StringIO()
+        with mock.patch("veripb.verifier.time.time", fakeTime):
+            progress = Progress(None, stream = stream)
+            for i in range(100000):
+                clock[0] += 1e-5
+                progress.update(1)
+            progress.finish()
+
+        assert(reads[0] < 100)
+        assert(stream.getvalue().count("\r") > 2)
+        assert("100000 rules checked" in stream.getvalue())
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+from env import veripb
+
+from proof_helper import ProofTestCase, runProof, integrationProofs
+
+class TestTrimmedProof(ProofTestCase):
+    formula = "* #variable= 4 #constraint= 4\n" \
+        "1 x1 1 x2 >= 1 ;\n" \
+        "1 ~x1 1 x2 >= 1 ;\n" \
+        "1 x1 1 ~x2 >= 1 ;\n" \
+        "1 ~x1 1 ~x2 >= 1 ;\n"
+
+    def trim(self, proof, checkDeletion = True):
+        self.writeProof("f 4\n" + proof)
+        trimmedPath = self.path("trimmed.pbp")
+        settings = {"isCheckDeletionOn": checkDeletion}
+        assert(runProof(self.formulaPath, self.proofPath, dict(settings, trimmedProof = trimmedPath)) is None)
+        assert(runProof(self.formulaPath, trimmedPath, settings) is None)
+        with open(trimmedPath) as file:
+            return file.read().splitlines()[1:]
+
+    def test_trim(self):
+        proof = "u 1 x3 1 x4 >= 1 ;\n" \
+            "u 1 x2 >= 1 ;\n" \
+            "p 3 6 + 2 * 2 d\n" \
+            "u 1 x1 >= 1 ;\n" \
+            "del id 5\n" \
+            "u >= 1 ;\n" \
+            "c 9\n"
+        assert(self.trim(proof) == [
+            "f 4",
+            "u 1 x2 >= 1 ;",
+            "p 3 5 + 2 * 2 d",
+            "u 1 x1 >= 1 ;",
+            "del id 7",
+            "u >= 1 ;",
+            "del id 5 6",
+            "c 8"])
+
+    def test_hints(self):
+        proof = "u 1 x2 >= 1 ; 1 2\n" \
+            "u 1 x3 >= 1 ;\n" \
+            "u >= 1 ; -2 3 4\n" \
+            "j -1 >= 1 ;\n" \
+            "c 8\n"
+        assert(self.trim(proof) == [
+            "f 4",
+            "u 1 x2 >= 1 ; 1 2",
+            "u >= 1 ; 5 3 4",
+            "del id 5",
+            "j 6 >= 1 ;",
+            "del id 6",
+            "c 7"])
+
+    def test_formula_deletion(self):
+        # deletions of the formula stay in place
+        proof = "u 1 x2 >= 1 ;\n" \
+            "u 1 x1 >= 1 ;\n" \
+            "del id 1\n" \
+            "u 1 x3 >= 1 ;\n" \
+            "u >= 1 ;\n" \
+            "c 8\n"
+        assert(self.trim(proof, False) == [
+            "f 4",
+            "u 1 x2 >= 1 ;",
+            "u 1 x1 >= 1 ;",
+            "del id 1",
+            "u >= 1 ;",
+            "del id 5 6",
+            "c 7"])
+
+    def test_integration_proofs(self):
+        for formulaPath, proofPath in integrationProofs("correct/*.pbp"):
+            trimmedPath = self.path(proofPath.name)
+            result = runProof(formulaPath, proofPath, {"trimmedProof": trimmedPath})
+            if result is not None:
+                assert(result[0] == NotImplementedError), proofPath
+                continue
+
+            assert(runProof(formulaPath, trimmedPath) is None), proofPath
+            with open(proofPath) as proof, open(trimmedPath) as trimmed:
+                numSteps = lambda lines: len([line for line in lines
+                    if line.strip() and not line.startswith(("*", "del", "pseudo"))])
+                assert(numSteps(trimmed) <= numSteps(proof)), proofPath
+
+if __name__=="__main__":
+    unittest.main()
@@ -146,15 +146,22 @@ class TemporaryAttach():
         self.detachAll()
 
 class Autoprover():
+    """
+    Proves the subgoals automatically. The database db has to contain
+    all constraints of the proof, i.e., it has to be the antecedents
+    of a rule with antecedentIDs "all", see dbImplication.
+    """
+
     #@TimedFunction.time("Autoprover::setup")
     def __init__(self, context, db, subgoals):
+        assert isinstance(db, verifier.AllConstraints), \
+            "The autoprover can only use all constraints of the proof."
         self.context = context
         self.subgoals = subgoals
         self.verbose = context.verifierSettings.trace
         self.context.propEngine.increaseNumVarsTo(context.ineqFactory.numVars())
         self.propEngine = context.propEngine
         self.db = db
-        self.dbSubstituted = None
         self.dbSet = None
         self.assignment = None
         self.wasRUP = False
@@ -190,17 +197,13 @@ class Autoprover():
 
     #@TimedFunction.time("Autoprover::dbImplication")
     def dbImplication(self, nxtGoalId, nxtGoal):
-        success = False
-        if self.dbSubstituted is None:
-            asmnt = self.getPropagatedAssignment().get()
-            self.dbSubstituted = [(Id, ineq.copy().substitute(asmnt)) for Id, ineq in self.db]
-
-        for ineqId, ineq in self.dbSubstituted:
-            if ineq.implies(nxtGoal):
-                success = True
-                break
-
-        if success:
+        # findImplier searches all constraints that are attached with
+        # an id of the proof, not only self.db, which is the same as
+        # self.db contains all constraints of the proof. The propagated
+        # literals are substituted on the fly, the goal needs to be
+        # substituted already.
+        ineqId = self.propEngine.findImplier(nxtGoal)
+        if ineqId is not None:
             if self.verbose:
                 print("    automatically proved %s by implication from %i" % (str(nxtGoalId), ineqId))
             return True
@@ -0,0 +1,66 @@
+import argparse
+import sys
+
+from veripb.exceptions import ParseError
+from veripb.rules_register import get_registered_rules, dom_friendly_rules
+from veripb.optimized.parsing import BinaryProofReader, proofToBinary, proofToText
+
+# Frequent key words that are not rule identifiers, rule
+# identifiers are taken from the registered rules.
+keyWords = [">=", "=", ";", "id", "find", "spec", "range", "~", "+", "*",
+    "s", "w", "d", ":", "==>", "<==", "pseudo-Boolean", "proof", "version"]
+
+def opcodes():
+    """Initial string table of binary proofs, the most frequent rules
+    and key words come first to get the shortest encoding."""
+
+    result = ["u", "p", "del"] + keyWords
+    for rule in get_registered_rules() + dom_friendly_rules():
+        result.extend(rule.Ids)
+
+    seen = set()
+    unique = list()
+    for word in result:
+        if word and word not in seen:
+            seen.add(word)
+            unique.append(word)
+    return unique
+
+def isBinary(fileName):
+    return BinaryProofReader.isBinary(fileName)
+
+def toBinary(inFileName, outFileName):
+    proofToBinary(inFileName, outFileName, opcodes())
+
+def toText(inFileName, outFileName):
+    proofToText(inFileName, outFileName)
+
+def run_cmd_main():
+    p = argparse.ArgumentParser(
+        description = """Convert proofs between the text and the binary
+            proof format. The direction is detected from the input file
+            unless specified explicitly. VeriPB reads both formats.""")
+    p.add_argument("input", help="Proof to convert.")
+    p.add_argument("output", help="File to write the converted proof to.")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--toBinary", action="store_true", default=False,
+        help="Convert text proof to binary proof.")
+    group.add_argument("--toText", action="store_true", default=False,
+        help="Convert binary proof to text proof.")
+
+    args = p.parse_args()
+
+    toTextFormat = args.toText or (not args.toBinary and isBinary(args.input))
+    try:
+        if toTextFormat:
+            toText(args.input, args.output)
+        else:
+            toBinary(args.input, args.output)
+    except (ParseError, RuntimeError, ValueError) as e:
+        print(e, file = sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(run_cmd_main())
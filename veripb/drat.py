@@ -134,7 +134,7 @@ class DRAT(ReverseUnitPropagation):
                 return EmptyRule()
 
     def __init__(self, ineq, w, numVars, isContradiction):
-        super().__init__(ineq, w)
+        super().__init__(ineq)
         self.isContradiction = isContradiction
 
     def compute(self, antecedents, context):
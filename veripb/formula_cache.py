@@ -0,0 +1,113 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+
+from veripb.optimized.parsing import saveFormulaSnapshot, loadFormulaSnapshot
+
+class FormulaCache():
+    """Directory of snapshots of parsed formulas, so that a formula
+    that is checked repeatedly only needs to be parsed once.
+
+    Snapshots are keyed by a hash of the content of the formula file,
+    the format and the variable name mode. New snapshots are written
+    to a temporary file and moved into place atomically, so that
+    concurrent runs never see incomplete snapshots. If the cache
+    grows beyond maxSize bytes, the least recently used snapshots are
+    removed; eviction holds an exclusive lock on the cache directory.
+    Removing a snapshot that is read concurrently is safe, as the
+    reader keeps its mapping of the removed file."""
+
+    suffix = ".snapshot"
+    tmpSuffix = ".tmp"
+    # temporary files of crashed runs are removed after this many
+    # seconds
+    staleTmpAge = 3600
+    # incremented whenever the snapshot format or the parsers change
+    # in a way that changes the parsed formula
+    version = 1
+
+    def __init__(self, directory, maxSize):
+        self.directory = directory
+        self.maxSize = maxSize
+        os.makedirs(directory, exist_ok = True)
+
+    def key(self, fileName, kind, freeNames):
+        digest = hashlib.blake2b(digest_size = 20)
+        digest.update(b"%s %i %i\n" % (kind.encode(), freeNames, self.version))
+        with open(fileName, "rb") as file:
+            while True:
+                chunk = file.read(1 << 20)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key, varMgr):
+        """Returns the cached formula or None if there is no usable
+        snapshot, varMgr is only modified if the snapshot is used."""
+
+        path = self.path(key)
+        try:
+            formula = loadFormulaSnapshot(path, varMgr)
+        except RuntimeError:
+            if os.path.exists(path):
+                # corrupted or written by another version
+                self.remove(path)
+            return None
+
+        try:
+            # the modification time is used to track the last use
+            os.utime(path)
+        except OSError:
+            pass
+        return formula
+
+    def store(self, key, formula, varMgr):
+        fd, tmpPath = tempfile.mkstemp(dir = self.directory, suffix = self.tmpSuffix)
+        os.close(fd)
+        try:
+            saveFormulaSnapshot(formula, varMgr, tmpPath)
+            os.replace(tmpPath, self.path(key))
+        except BaseException:
+            self.remove(tmpPath)
+            raise
+        self.evict()
+
+    def evict(self):
+        with open(os.path.join(self.directory, "lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            now = time.time()
+            entries = list()
+            totalSize = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        continue
+                    if entry.name.endswith(self.suffix):
+                        entries.append((info.st_mtime, info.st_size, entry.path))
+                        totalSize += info.st_size
+                    elif entry.name.endswith(self.tmpSuffix) \
+                            and now - info.st_mtime > self.staleTmpAge:
+                        self.remove(entry.path)
+
+            entries.sort()
+            for mtime, size, path in entries:
+                if totalSize <= self.maxSize:
+                    break
+                self.remove(path)
+                totalSize -= size
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
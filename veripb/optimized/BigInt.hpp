@@ -20,6 +20,11 @@
 // }
 #include <string_view>
 #include <functional>
+#include <cstddef>
+#include <cstring>
+#include <limits>
+#include <ostream>
+#include <type_traits>
 
 
 template <class T>
@@ -42,6 +47,36 @@ inline int32_t convertInt(mpz_class value) {
     return value.get_si();
 }
 
+template<>
+inline int64_t convertInt(mpz_class value) {
+    static_assert(sizeof(long) == 8);
+    return value.get_si();
+}
+
+template<>
+inline uint64_t convertInt(mpz_class value) {
+    static_assert(sizeof(unsigned long) == 8);
+    return value.get_ui();
+}
+
+inline std::size_t hashLimbs(mpz_srcptr x) {
+    size_t hash = 0;
+    hash_combine(hash, x->_mp_size);
+
+    size_t limb_size = std::abs(x->_mp_size);
+
+    if (limb_size > 2) {
+        hash_combine(hash, x->_mp_d[0]);
+        hash_combine(hash, x->_mp_d[limb_size - 1]);
+    } else {
+        for (size_t i = 0; i < limb_size; i++) {
+            hash_combine(hash, x->_mp_d[i]);
+        }
+    }
+
+    return hash;
+}
+
 namespace std {
     inline BigInt abs(BigInt& num) {
         return ::abs(num);
@@ -61,31 +96,439 @@ namespace std {
                 return std::hash<long>()(y.get_si());
             }
 
-            const mpz_srcptr x = y.get_mpz_t();
+            return hashLimbs(y.get_mpz_t());
+        }
+    };
+}
 
-            size_t hash = 0;
-            hash_combine(hash, x->_mp_size);
+inline std::string toString(BigInt& num, int base = 10) {
+    return num.get_str(base);
+}
+
+/*
+ * Arbitrary precision integer that stores values fitting into 64 bit
+ * inline and only switches to a GMP integer if an operation
+ * overflows. A value is stored as GMP integer if and only if it does
+ * not fit into 64 bit, i.e., the representation of each value is
+ * unique.
+ *
+ * Inline values are stored in the place of the size fields of the
+ * GMP integer and are marked by a null limb pointer, so that
+ * promotion does not need an additional allocation.
+ */
+class HybridInt {
+private:
+    static_assert(sizeof(long) == 8, "HybridInt requires 64 bit long.");
+    static_assert(offsetof(__mpz_struct, _mp_d) == sizeof(int64_t),
+        "Unexpected layout of mpz_t.");
 
-            size_t limb_size = abs(x->_mp_size);
+    __mpz_struct rep;
+
+    int64_t small() const {
+        int64_t value;
+        std::memcpy(&value, &rep, sizeof(value));
+        return value;
+    }
 
-            if (limb_size > 2) {
-                hash_combine(hash, x->_mp_d[0]);
-                hash_combine(hash, x->_mp_d[limb_size - 1]);
+    void setSmall(int64_t value) {
+        std::memcpy(&rep, &value, sizeof(value));
+        rep._mp_d = nullptr;
+    }
+
+    // switch back to the inline value if the GMP integer fits
+    void normalize() {
+        if (mpz_fits_slong_p(&rep)) {
+            int64_t value = mpz_get_si(&rep);
+            mpz_clear(&rep);
+            setSmall(value);
+        }
+    }
+
+    /*
+     * Read only view of the value as GMP integer, which does not
+     * allocate for values stored inline.
+     */
+    class MpzView {
+    private:
+        mp_limb_t limb;
+        mpz_t view;
+        mpz_srcptr value;
+
+    public:
+        MpzView(const HybridInt& x) {
+            if (x.isSmall()) {
+                limb = x.get_ui();
+                value = mpz_roinit_n(view, &limb, (x.small() < 0) ? -1 : 1);
             } else {
-                for (size_t i = 0; i < limb_size; i++) {
-                    hash_combine(hash, x->_mp_d[i]);
-                }
+                value = &x.rep;
             }
+        }
+
+        MpzView(const MpzView&) = delete;
+
+        operator mpz_srcptr() const {
+            return value;
+        }
+    };
+
+    template<typename TOp>
+    static HybridInt slowOp(const HybridInt& a, const HybridInt& b, TOp op) {
+        HybridInt result;
+        mpz_init(&result.rep);
+        op(&result.rep, MpzView(a), MpzView(b));
+        result.normalize();
+        return result;
+    }
+
+    template<typename TOp>
+    void slowOpInplace(const HybridInt& other, TOp op) {
+        if (isSmall()) {
+            *this = slowOp(*this, other, op);
+        } else {
+            op(&rep, &rep, MpzView(other));
+            normalize();
+        }
+    }
+
+    static int compare(const HybridInt& a, const HybridInt& b) {
+        if (a.isSmall() && b.isSmall()) {
+            return (a.small() > b.small()) - (a.small() < b.small());
+        } else if (a.isSmall()) {
+            // b does not fit into 64 bit
+            return -mpz_sgn(&b.rep);
+        } else if (b.isSmall()) {
+            return mpz_sgn(&a.rep);
+        } else {
+            return mpz_cmp(&a.rep, &b.rep);
+        }
+    }
+
+    friend struct std::hash<HybridInt>;
+
+public:
+    HybridInt() {
+        setSmall(0);
+    }
+
+    template<typename TInt,
+        typename std::enable_if<std::is_integral<TInt>::value, int>::type = 0>
+    HybridInt(TInt value) {
+        if constexpr (std::is_unsigned<TInt>::value) {
+            if (value > static_cast<uint64_t>(std::numeric_limits<int64_t>::max())) {
+                mpz_init_set_ui(&rep, value);
+                return;
+            }
+        }
+        setSmall(value);
+    }
+
+    HybridInt(const mpz_class& value) {
+        mpz_init_set(&rep, value.get_mpz_t());
+        normalize();
+    }
+
+    HybridInt(mpz_class&& value) {
+        mpz_init(&rep);
+        mpz_swap(&rep, value.get_mpz_t());
+        normalize();
+    }
+
+    explicit HybridInt(const std::string& value)
+        : HybridInt(mpz_class(value))
+    {}
+
+    explicit HybridInt(const char* value)
+        : HybridInt(mpz_class(value))
+    {}
+
+    HybridInt(const HybridInt& other) {
+        if (other.isSmall()) {
+            rep = other.rep;
+        } else {
+            mpz_init_set(&rep, &other.rep);
+        }
+    }
+
+    HybridInt(HybridInt&& other) noexcept
+        : rep(other.rep)
+    {
+        other.setSmall(0);
+    }
+
+    HybridInt& operator=(const HybridInt& other) {
+        if (other.isSmall()) {
+            if (!isSmall()) {
+                mpz_clear(&rep);
+            }
+            rep = other.rep;
+        } else if (isSmall()) {
+            mpz_init_set(&rep, &other.rep);
+        } else {
+            mpz_set(&rep, &other.rep);
+        }
+        return *this;
+    }
+
+    HybridInt& operator=(HybridInt&& other) noexcept {
+        std::swap(rep, other.rep);
+        return *this;
+    }
+
+    ~HybridInt() {
+        if (!isSmall()) {
+            mpz_clear(&rep);
+        }
+    }
+
+    bool isSmall() const {
+        return rep._mp_d == nullptr;
+    }
+
+    bool fits_slong_p() const {
+        return isSmall();
+    }
+
+    long get_si() const {
+        return isSmall() ? small() : mpz_get_si(&rep);
+    }
+
+    // absolute value modulo 2^64, same as mpz_class::get_ui
+    unsigned long get_ui() const {
+        if (!isSmall()) {
+            return mpz_get_ui(&rep);
+        } else if (small() < 0) {
+            return -static_cast<unsigned long>(small());
+        } else {
+            return small();
+        }
+    }
+
+    mpz_class get_mpz() const {
+        return mpz_class(MpzView(*this));
+    }
+
+    std::string get_str(int base = 10) const {
+        if (isSmall() && base == 10) {
+            return std::to_string(small());
+        }
+        return get_mpz().get_str(base);
+    }
+
+    friend HybridInt operator-(const HybridInt& a) {
+        if (a.isSmall() && a.small() != std::numeric_limits<int64_t>::min()) {
+            return HybridInt(-a.small());
+        }
+        HybridInt result;
+        mpz_init(&result.rep);
+        mpz_neg(&result.rep, MpzView(a));
+        result.normalize();
+        return result;
+    }
+
+    friend HybridInt operator+(const HybridInt& a, const HybridInt& b) {
+        int64_t result;
+        if (a.isSmall() && b.isSmall()
+                && !__builtin_add_overflow(a.small(), b.small(), &result)) {
+            return HybridInt(result);
+        }
+        return slowOp(a, b, mpz_add);
+    }
+
+    friend HybridInt operator-(const HybridInt& a, const HybridInt& b) {
+        int64_t result;
+        if (a.isSmall() && b.isSmall()
+                && !__builtin_sub_overflow(a.small(), b.small(), &result)) {
+            return HybridInt(result);
+        }
+        return slowOp(a, b, mpz_sub);
+    }
+
+    friend HybridInt operator*(const HybridInt& a, const HybridInt& b) {
+        int64_t result;
+        if (a.isSmall() && b.isSmall()
+                && !__builtin_mul_overflow(a.small(), b.small(), &result)) {
+            return HybridInt(result);
+        }
+        return slowOp(a, b, mpz_mul);
+    }
+
+    // rounds towards zero, same as mpz_class
+    friend HybridInt operator/(const HybridInt& a, const HybridInt& b) {
+        if (a.isSmall() && b.isSmall()
+                && !(a.small() == std::numeric_limits<int64_t>::min() && b.small() == -1)) {
+            return HybridInt(a.small() / b.small());
+        }
+        return slowOp(a, b, mpz_tdiv_q);
+    }
 
-            return hash;
+    friend HybridInt operator%(const HybridInt& a, const HybridInt& b) {
+        if (a.isSmall() && b.isSmall()) {
+            // avoid overflow of min / -1, the remainder is always 0
+            return HybridInt(b.small() == -1 ? 0 : a.small() % b.small());
+        }
+        return slowOp(a, b, mpz_tdiv_r);
+    }
+
+    HybridInt& operator+=(const HybridInt& other) {
+        int64_t result;
+        if (isSmall() && other.isSmall()
+                && !__builtin_add_overflow(small(), other.small(), &result)) {
+            setSmall(result);
+        } else {
+            slowOpInplace(other, mpz_add);
+        }
+        return *this;
+    }
+
+    HybridInt& operator-=(const HybridInt& other) {
+        int64_t result;
+        if (isSmall() && other.isSmall()
+                && !__builtin_sub_overflow(small(), other.small(), &result)) {
+            setSmall(result);
+        } else {
+            slowOpInplace(other, mpz_sub);
+        }
+        return *this;
+    }
+
+    HybridInt& operator*=(const HybridInt& other) {
+        int64_t result;
+        if (isSmall() && other.isSmall()
+                && !__builtin_mul_overflow(small(), other.small(), &result)) {
+            setSmall(result);
+        } else {
+            slowOpInplace(other, mpz_mul);
+        }
+        return *this;
+    }
+
+    HybridInt& operator/=(const HybridInt& other) {
+        return *this = *this / other;
+    }
+
+    HybridInt& operator%=(const HybridInt& other) {
+        return *this = *this % other;
+    }
+
+    friend bool operator==(const HybridInt& a, const HybridInt& b) {
+        if (a.isSmall() != b.isSmall()) {
+            return false;
+        } else if (a.isSmall()) {
+            return a.small() == b.small();
+        } else {
+            return mpz_cmp(&a.rep, &b.rep) == 0;
+        }
+    }
+
+    friend bool operator!=(const HybridInt& a, const HybridInt& b) {
+        return !(a == b);
+    }
+
+    friend bool operator<(const HybridInt& a, const HybridInt& b) {
+        return compare(a, b) < 0;
+    }
+
+    friend bool operator<=(const HybridInt& a, const HybridInt& b) {
+        return compare(a, b) <= 0;
+    }
+
+    friend bool operator>(const HybridInt& a, const HybridInt& b) {
+        return compare(a, b) > 0;
+    }
+
+    friend bool operator>=(const HybridInt& a, const HybridInt& b) {
+        return compare(a, b) >= 0;
+    }
+
+    friend std::ostream& operator<<(std::ostream& os, const HybridInt& v) {
+        if (v.isSmall()) {
+            os << v.small();
+        } else {
+            os << &v.rep;
+        }
+        return os;
+    }
+};
+
+template<>
+inline int32_t convertInt(HybridInt value) {
+    return value.get_si();
+}
+
+template<>
+inline int64_t convertInt(HybridInt value) {
+    return value.get_si();
+}
+
+template<>
+inline uint64_t convertInt(HybridInt value) {
+    return value.get_ui();
+}
+
+/*
+ * Store value in result and return true if value fits into 64 bit.
+ */
+template<typename TInt,
+    typename std::enable_if<std::is_integral<TInt>::value, int>::type = 0>
+inline bool toInt64(TInt value, int64_t& result) {
+    if constexpr (std::is_unsigned<TInt>::value && sizeof(TInt) >= sizeof(int64_t)) {
+        if (value > static_cast<uint64_t>(std::numeric_limits<int64_t>::max())) {
+            return false;
+        }
+    }
+    result = value;
+    return true;
+}
+
+inline bool toInt64(const mpz_class& value, int64_t& result) {
+    if (!value.fits_slong_p()) {
+        return false;
+    }
+    result = value.get_si();
+    return true;
+}
+
+inline bool toInt64(const HybridInt& value, int64_t& result) {
+    if (!value.isSmall()) {
+        return false;
+    }
+    result = value.get_si();
+    return true;
+}
+
+inline HybridInt abs(const HybridInt& num) {
+    return (num < 0) ? -num : num;
+}
+
+namespace std {
+    inline HybridInt abs(HybridInt& num) {
+        return ::abs(num);
+    }
+
+    template<>
+    struct hash<HybridInt> {
+        // same value as the hash of the corresponding mpz_class
+        std::size_t operator()(const HybridInt& y) const {
+            if (y.isSmall()) {
+                return std::hash<long>()(y.small());
+            }
+            return hashLimbs(&y.rep);
         }
     };
 }
 
-inline std::string toString(BigInt& num, int base = 10) {
+inline std::string toString(HybridInt& num, int base = 10) {
     return num.get_str(base);
 }
 
+inline mpz_class toMpz(const BigInt& num) {
+    return num;
+}
+
+inline mpz_class toMpz(const HybridInt& num) {
+    return num.get_mpz();
+}
+
 #ifdef PY_BINDINGS
     namespace pybind11 { namespace detail {
         template <> struct type_caster<BigInt> {
@@ -158,5 +601,38 @@ inline std::string toString(BigInt& num, int base = 10) {
                 return result;
             }
         };
+
+        template <> struct type_caster<HybridInt> {
+        public:
+            PYBIND11_TYPE_CASTER(HybridInt, _("BigInt"));
+
+            bool load(handle src, bool convert) {
+                PyObject *source = src.ptr();
+                if (PyLong_Check(source)) {
+                    int overflow = 0;
+                    long long number = PyLong_AsLongLongAndOverflow(source, &overflow);
+                    if (!overflow && !(number == -1 && PyErr_Occurred())) {
+                        value = HybridInt(number);
+                        return true;
+                    }
+                    PyErr_Clear();
+                }
+
+                // large or non integer values take the slow path
+                type_caster<BigInt> caster;
+                if (!caster.load(src, convert)) {
+                    return false;
+                }
+                value = HybridInt(static_cast<BigInt&>(caster));
+                return true;
+            }
+
+            static handle cast(HybridInt src, return_value_policy policy, handle parent) {
+                if (src.fits_slong_p()) {
+                    return PyLong_FromLong(src.get_si());
+                }
+                return type_caster<BigInt>::cast(src.get_mpz(), policy, parent);
+            }
+        };
     }} // namespace pybind11::detail
 #endif // ifdef PY_BINDINGS
\ No newline at end of file
@@ -15,8 +15,8 @@ Propagator::Propagator(PropagationMaster& _propMaster)
     propMaster.addPropagator(*this);
 }
 
-long divideAndRoundUp(long value, BigInt divisor) {
-    BigInt result = ((value + divisor - 1) / divisor);
+long divideAndRoundUp(long value, CoefType divisor) {
+    CoefType result = ((value + divisor - 1) / divisor);
     return result.get_si();
 }
 
@@ -92,6 +92,102 @@ void ClausePropagator::cleanupWatches() {
     }
 }
 
+void BinaryImplicationPropagator::propagate() {
+    const auto& trail = propMaster.getTrail();
+    const Assignment& assignment = propMaster.getAssignment();
+    // only the literals that are already on the trail are
+    // propagated, so that the other propagators get a chance to
+    // find a conflict before following long implication chains
+    size_t end = trail.size();
+    while (qhead < end and !propMaster.isConflicting()) {
+        Lit falsifiedLit = ~trail[qhead];
+
+        for (const Implication& implication: implications[falsifiedLit]) {
+            assert(implication.clause->header.isMarkedForDeletion == false);
+            State value = assignment[implication.implied];
+            if (value == State::Unassigned) {
+                propMaster.enqueue(
+                    implication.implied,
+                    BinaryReason::aquire(*implication.clause, *this));
+            } else if (value == State::False) {
+                propMaster.conflict(
+                    BinaryReason::aquire(*implication.clause, *this));
+                break;
+            }
+        }
+
+        qhead += 1;
+    }
+}
+
+void BinaryImplicationPropagator::cleanupWatches() {
+    for (ImplicationList& il: implications) {
+        il.erase(
+            std::remove_if(
+                il.begin(),
+                il.end(),
+                [](auto& implication){
+                    return implication.clause->header.isMarkedForDeletion;
+                }
+            ),
+            il.end()
+        );
+    }
+}
+
+void CardinalityPropagator::propagate() {
+    const auto& trail = propMaster.getTrail();
+    while (qhead < trail.size() and !propMaster.isConflicting()) {
+        Lit falsifiedLit = ~trail[qhead];
+
+        WatchList& ws = watchlist[falsifiedLit];
+
+        const WatchedType* end = ws.data() + ws.size();
+        WatchedType* next = ws.data();
+        WatchedType* kept = next;
+
+        const uint lookAhead = 3;
+        for (; next != end && !propMaster.isConflicting(); next++) {
+            auto fetch = next + lookAhead;
+            if (fetch < end) {
+                __builtin_prefetch(fetch->ineq);
+            }
+
+            assert(next->ineq->header.isMarkedForDeletion == false);
+            bool keepWatch = next->ineq->updateWatch(*this, falsifiedLit);
+            if (keepWatch) {
+                *kept = *next;
+                kept += 1;
+            }
+        }
+
+        // in case of conflict copy remaining watches
+        for (; next != end; next++) {
+            *kept = *next;
+            kept += 1;
+        }
+
+        ws.erase(ws.begin() + (kept - ws.data()), ws.end());
+
+        qhead += 1;
+    }
+}
+
+void CardinalityPropagator::cleanupWatches() {
+    for (WatchList& wl: watchlist) {
+        wl.erase(
+            std::remove_if(
+                wl.begin(),
+                wl.end(),
+                [](auto& watch){
+                    return watch.ineq->header.isMarkedForDeletion;
+                }
+            ),
+            wl.end()
+        );
+    }
+}
+
 // int main(int argc, char const *argv[])
 // {
 //     numLexOrder cmp;
@@ -158,11 +254,30 @@ int hashColision = 0;
             .def("getDeletions", &PropEngine<CoefType>::getDeletions)
             .def("attachCount", &PropEngine<CoefType>::attachCount)
             .def("checkSat", &PropEngine<CoefType>::checkSat)
+            .def("propagatedAssignment", &PropEngine<CoefType>::propagatedAssignment)
             .def("propagatedLits", &PropEngine<CoefType>::propagatedLits)
             .def("increaseNumVarsTo", &PropEngine<CoefType>::increaseNumVarsTo)
             .def("printStats", &PropEngine<CoefType>::printStats)
+            .def("lookupStats", &PropEngine<CoefType>::lookupStats)
+            .def("schedulerStats", &PropEngine<CoefType>::schedulerStats)
             .def("computeEffected", &PropEngine<CoefType>::computeEffected)
+            .def("computeSubgoals", &PropEngine<CoefType>::computeSubgoals,
+                py::arg("sub"), py::arg("negated"), py::arg("onlyCore") = false,
+                "Return the constraints affected by the substitution, "
+                "that are not implied by negated, and the number of "
+                "constraints that are implied by negated.")
             .def("find", &PropEngine<CoefType>::find)
+            .def("findImplier",
+                [](PropEngine<CoefType>& engine, Inequality<CoefType>* goal) -> py::object {
+                    Inequality<CoefType>* implier = engine.findImplier(goal);
+                    if (implier == nullptr) {
+                        return py::none();
+                    }
+                    return py::cast(implier->minProofId());
+                },
+                "Return the id of a constraint that implies the goal "
+                "after substituting the literals propagated at level 0, "
+                "or None if there is no such constraint.")
             .def("moveToCore", &PropEngine<CoefType>::moveToCore)
             .def("moveMultipleToCore", &PropEngine<CoefType>::moveMultipleToCore)
             .def("moveAllToCore", &PropEngine<CoefType>::moveAllToCore);
@@ -182,9 +297,28 @@ int hashColision = 0;
             .def("contract", &Inequality<CoefType>::contract)
             .def("copy", &Inequality<CoefType>::copy)
             .def("implies", &Inequality<CoefType>::implies)
+            .def("impliesByMap", &Inequality<CoefType>::impliesByMap)
+            .def("impliesMany", &Inequality<CoefType>::impliesMany)
             .def("expand", &Inequality<CoefType>::expand)
             .def("negated", &Inequality<CoefType>::negated)
-            .def("rupCheck", &Inequality<CoefType>::rupCheck)
+            .def("rupCheck",
+                [](Inequality<CoefType>& ineq, PropEngine<CoefType>& propEngine, bool onlyCore, bool returnIds) -> py::object {
+                    if (!returnIds) {
+                        return py::bool_(ineq.rupCheck(propEngine, onlyCore));
+                    }
+
+                    std::vector<uint64_t> usedIds;
+                    if (!ineq.rupCheck(propEngine, onlyCore, &usedIds)) {
+                        return py::none();
+                    }
+                    return py::cast(usedIds);
+                },
+                py::arg("propEngine"), py::arg("onlyCore") = false, py::arg("returnIds") = false,
+                "Check reverse unit propagation. If returnIds is set, "
+                "return the ids of the constraints that participate in "
+                "the conflict, in the order in which they propagate, or "
+                "None if the check fails.")
+            .def("rupCheckHinted", &Inequality<CoefType>::rupCheckHinted)
             .def("__eq__", &Inequality<CoefType>::eq)
             .def("__repr__", &Inequality<CoefType>::repr)
             .def("toString", &Inequality<CoefType>::toString)
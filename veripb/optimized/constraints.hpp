@@ -4,6 +4,7 @@
 #include <iostream>
 #include <sstream>
 #include <unordered_map>
+#include <map>
 #include <unordered_set>
 #include <memory>
 #include <chrono>
@@ -14,6 +15,10 @@
 #include <type_traits>
 #include <numeric>
 #include <list>
+#include <iterator>
+#include <array>
+#include <new>
+#include <mutex>
 
 #include "BigInt.hpp"
 #include "Logging.hpp"
@@ -23,7 +28,7 @@
     #include <execinfo.h>
 #endif
 
-using CoefType = BigInt;
+using CoefType = HybridInt;
 // use one of the following lines istead to increas precision.
 // using CoefType = long long;
 // using CoefType = BigInt;
@@ -86,6 +91,215 @@ public:
 
 extern int hashColision;
 
+/*
+ * Allocator for the memory of constraints and their handles.
+ * Allocations up to maxBlockSize are rounded up to a multiple of
+ * granularity and each of these size classes takes its blocks from
+ * slabs of slabSize bytes, larger allocations use malloc. Slabs that
+ * become empty can be reused by any size class and are released in
+ * bulk, when the junkyards are cleared. Constraints are also created
+ * by the threads of the parallel parser, so all operations are
+ * synchronized.
+ */
+class SlabAllocator {
+public:
+    static constexpr size_t slabSize = 1 << 16;
+    static constexpr size_t granularity = 8;
+    static constexpr size_t maxBlockSize = 2048;
+    static constexpr size_t numSizeClasses = maxBlockSize / granularity;
+
+private:
+    struct FreeBlock {
+        FreeBlock* next;
+    };
+
+    struct alignas(granularity) Slab {
+        // neighbours in the list of slabs with free blocks
+        Slab* prev = nullptr;
+        Slab* next = nullptr;
+        FreeBlock* freeList = nullptr;
+        // blocks from here to end were never used
+        char* unused;
+        char* end;
+        size_t blockSize;
+        size_t numUsed = 0;
+        bool isAvailable = false;
+    };
+
+    std::mutex mutex;
+    std::array<Slab*, numSizeClasses> available{};
+    // slabs without used blocks, they can be reused for any size class
+    std::vector<Slab*> emptySlabs;
+
+    size_t numSlabs = 0;
+    size_t requestedBytes = 0;
+    size_t blockBytes = 0;
+    size_t largeBytes = 0;
+
+    static size_t sizeClass(size_t size) {
+        return (size - 1) / granularity;
+    }
+
+    static Slab* slabOf(void* ptr) {
+        return reinterpret_cast<Slab*>(
+            reinterpret_cast<uintptr_t>(ptr) & ~(slabSize - 1));
+    }
+
+    Slab* newSlab(size_t blockSize) {
+        void* addr;
+        if (!emptySlabs.empty()) {
+            addr = emptySlabs.back();
+            emptySlabs.pop_back();
+        } else {
+            addr = std::aligned_alloc(slabSize, slabSize);
+            if (addr == nullptr) {
+                throw std::bad_alloc();
+            }
+            numSlabs += 1;
+        }
+        Slab* slab = new (addr) Slab();
+        slab->unused = static_cast<char*>(addr) + sizeof(Slab);
+        slab->end = static_cast<char*>(addr) + slabSize;
+        slab->blockSize = blockSize;
+        return slab;
+    }
+
+    bool isFull(Slab* slab) {
+        return slab->freeList == nullptr
+            && slab->unused + slab->blockSize > slab->end;
+    }
+
+    void link(Slab* slab) {
+        Slab*& head = available[sizeClass(slab->blockSize)];
+        slab->prev = nullptr;
+        slab->next = head;
+        if (head != nullptr) {
+            head->prev = slab;
+        }
+        head = slab;
+        slab->isAvailable = true;
+    }
+
+    void unlink(Slab* slab) {
+        if (slab->prev != nullptr) {
+            slab->prev->next = slab->next;
+        } else {
+            available[sizeClass(slab->blockSize)] = slab->next;
+        }
+        if (slab->next != nullptr) {
+            slab->next->prev = slab->prev;
+        }
+        slab->isAvailable = false;
+    }
+
+public:
+    static SlabAllocator& get() {
+        // never destroyed, as constraints may still be freed while
+        // static objects are destroyed
+        static SlabAllocator* allocator = new SlabAllocator();
+        return *allocator;
+    }
+
+    void* allocate(size_t size) {
+        if (size > maxBlockSize) {
+            void* result = std::malloc(size);
+            if (result == nullptr) {
+                throw std::bad_alloc();
+            }
+            std::lock_guard<std::mutex> lock(mutex);
+            largeBytes += size;
+            return result;
+        }
+
+        std::lock_guard<std::mutex> lock(mutex);
+        Slab* slab = available[sizeClass(size)];
+        if (slab == nullptr) {
+            slab = newSlab((sizeClass(size) + 1) * granularity);
+            link(slab);
+        }
+
+        void* result;
+        if (slab->freeList != nullptr) {
+            result = slab->freeList;
+            slab->freeList = slab->freeList->next;
+        } else {
+            result = slab->unused;
+            slab->unused += slab->blockSize;
+        }
+        slab->numUsed += 1;
+        if (isFull(slab)) {
+            unlink(slab);
+        }
+
+        requestedBytes += size;
+        blockBytes += slab->blockSize;
+        return result;
+    }
+
+    void deallocate(void* ptr, size_t size) {
+        if (size > maxBlockSize) {
+            std::free(ptr);
+            std::lock_guard<std::mutex> lock(mutex);
+            largeBytes -= size;
+            return;
+        }
+
+        std::lock_guard<std::mutex> lock(mutex);
+        Slab* slab = slabOf(ptr);
+        assert(slab->blockSize == (sizeClass(size) + 1) * granularity);
+        FreeBlock* block = static_cast<FreeBlock*>(ptr);
+        block->next = slab->freeList;
+        slab->freeList = block;
+        slab->numUsed -= 1;
+        if (slab->numUsed == 0) {
+            if (slab->isAvailable) {
+                unlink(slab);
+            }
+            emptySlabs.push_back(slab);
+        } else if (!slab->isAvailable) {
+            link(slab);
+        }
+
+        requestedBytes -= size;
+        blockBytes -= slab->blockSize;
+    }
+
+    /*
+     * Return the memory of all slabs that have no used blocks.
+     */
+    void releaseEmptySlabs() {
+        std::lock_guard<std::mutex> lock(mutex);
+        for (Slab* slab: emptySlabs) {
+            std::free(slab);
+        }
+        numSlabs -= emptySlabs.size();
+        emptySlabs.clear();
+    }
+
+    size_t slabBytes() const {
+        return numSlabs * slabSize;
+    }
+
+    size_t getLargeBytes() const {
+        return largeBytes;
+    }
+
+    /*
+     * Fraction of the slab memory that is used by blocks.
+     */
+    double occupancy() const {
+        return numSlabs == 0 ? 1. : static_cast<double>(blockBytes) / slabBytes();
+    }
+
+    /*
+     * Fraction of the used blocks that is lost by rounding up to the
+     * size class.
+     */
+    double fragmentation() const {
+        return blockBytes == 0 ? 0. : 1. - static_cast<double>(requestedBytes) / blockBytes;
+    }
+};
+
 class IJunkyard {
 public:
     virtual void clear() = 0;
@@ -104,6 +318,7 @@ public:
         for (IJunkyard* yard: yards) {
             yard->clear();
         }
+        SlabAllocator::get().releaseEmptySlabs();
     }
 };
 
@@ -131,30 +346,25 @@ public:
     }
 };
 
-template<typename T>
-struct PointedEq {
-    bool operator () ( T const * lhs, T const * rhs ) const {
-        bool result = (*lhs == *rhs);
-        if (!result) {
-            hashColision += 1;
-        }
-        return result;
-    }
-};
-
-template<typename T>
-struct PointedHash {
-    std::size_t operator () ( T const * element ) const {
-        return std::hash<T>()(*element);
-    }
-};
+/*
+ * Finalizer of MurmurHash3, it is a bijection that spreads the bits
+ * of the input over all bits of the output.
+ */
+inline std::size_t mixHash(std::size_t value) {
+    value ^= value >> 33;
+    value *= 0xff51afd7ed558ccdULL;
+    value ^= value >> 33;
+    value *= 0xc4ceb9fe1a85ec53ULL;
+    value ^= value >> 33;
+    return value;
+}
 
 template<typename TVal>
 TVal divideAndRoundUp(TVal value, TVal divisor) {
     return (value + divisor - 1) / divisor;
 }
 
-long divideAndRoundUp(long value, BigInt divisor);
+long divideAndRoundUp(long value, CoefType divisor);
 
 typedef uint32_t LitData;
 
@@ -612,8 +822,13 @@ using InequalityPtr = std::unique_ptr<Inequality<T>>;
 template<typename T>
 class FixedSizeInequality;
 
+template<typename T>
+class FatInequality;
+
 class Clause;
 
+class Cardinality;
+
 template<typename T>
 class ConstraintHandler;
 
@@ -622,6 +837,8 @@ using FixedSizeInequalityHandler = ConstraintHandler<FixedSizeInequality<T>>;
 
 using ClauseHandler = ConstraintHandler<Clause>;
 
+using CardinalityHandler = ConstraintHandler<Cardinality>;
+
 template<typename T>
 class PropEngine;
 
@@ -658,6 +875,7 @@ private:
     template<typename T>
     friend class FixedSizeInequality;
     friend class Clause;
+    friend class Cardinality;
 public:
 
     ~InlineVec(){
@@ -727,6 +945,9 @@ public:
 struct DBConstraintHeader {
     bool isMarkedForDeletion = false;
     bool isReason = false;
+    // minimal id of the attached Inequality owning this constraint,
+    // nullptr if the constraint is not owned by an Inequality
+    const uint64_t* minId = nullptr;
 };
 
 
@@ -736,6 +957,8 @@ public:
     virtual bool isMarkedForDeletion() = 0;
     virtual void setIsReason() = 0;
     virtual void unsetIsReason() = 0;
+    virtual const uint64_t* getId() = 0;
+    virtual void getLits(std::vector<Lit>& lits) = 0;
     virtual void print(std::ostream&) = 0;
     virtual ~Reason(){};
 };
@@ -774,6 +997,16 @@ public:
         constraint->header.isReason = false;
     }
 
+    virtual const uint64_t* getId() {
+        return constraint->header.minId;
+    }
+
+    virtual void getLits(std::vector<Lit>& lits) {
+        for (const auto& term: constraint->terms) {
+            lits.push_back(term.lit);
+        }
+    }
+
     virtual void print(std::ostream& out) {
         out << *constraint;
     }
@@ -831,6 +1064,11 @@ private:
     std::vector<ReasonPtr> reasons;
     ReasonPtr conflictReason;
 
+    // buffers for conflict analysis
+    VarIndexedVec<size_t> trailPosition;
+    std::vector<bool> isUsed;
+    std::vector<Lit> reasonLits;
+
 
     PropState current;
 
@@ -942,6 +1180,57 @@ public:
         return current.conflict;
     }
 
+    /*
+     * Append the ids of the constraints that participate in the
+     * current conflict, i.e., the reason for the conflict and,
+     * transitively, the reasons for the falsified literals of
+     * participating constraints. Constraints without an id, such as
+     * the negated constraint of a RUP check, participate but are
+     * not reported. May contain duplicates.
+     */
+    void analyzeConflict(std::vector<uint64_t>& ids) {
+        assert(isConflicting());
+        trailPosition.resize(assignment.value.size() / 2);
+        for (size_t i = 0; i < trail.size(); ++i) {
+            trailPosition[trail[i].var()] = i;
+        }
+        isUsed.assign(trail.size(), false);
+
+        // mark the literals of the reason that were falsified before
+        // the trail position end
+        auto markFalsified = [this](Reason& reason, size_t end) {
+            reasonLits.clear();
+            reason.getLits(reasonLits);
+            for (Lit lit: reasonLits) {
+                if (assignment[lit] == State::False) {
+                    size_t pos = trailPosition[lit.var()];
+                    if (pos < end) {
+                        isUsed[pos] = true;
+                    }
+                }
+            }
+        };
+
+        if (conflictReason) {
+            if (conflictReason->getId() != nullptr) {
+                ids.push_back(*conflictReason->getId());
+            }
+            markFalsified(*conflictReason, trail.size());
+        }
+
+        for (size_t i = trail.size(); i > 0; --i) {
+            size_t pos = i - 1;
+            Reason* reason = reasons[pos].get();
+            // decisions have no reason
+            if (isUsed[pos] && reason != nullptr) {
+                if (reason->getId() != nullptr) {
+                    ids.push_back(*reason->getId());
+                }
+                markFalsified(*reason, pos);
+            }
+        }
+    }
+
     void enqueue(Lit lit, ReasonPtr&& reason) {
         // std::cout << "Enqueueing: " << lit << std::endl;
         trailUnchanged = false;
@@ -1032,6 +1321,16 @@ public:
         reasons.pop_back();
     }
 
+    /*
+     * Mark the trail as not propagated, which is necessary if
+     * propagators are activated that have not seen the trail.
+     * Otherwise, their propagations at level 0 are lost when the
+     * trail is reset to the current state.
+     */
+    void requeueTrail() {
+        current.qhead = 0;
+    }
+
     void reset(PropState resetState) {
         // std::cout << "Reset to trail pos " << resetState.qhead << std::endl;
         for (Propagator* propagator: knownPropagators) {
@@ -1097,6 +1396,73 @@ public:
 
 using ClauseReason = GenericDBReason<Clause, ClausePropagator>;
 
+/*
+ * Propagator for clauses with exactly two literals. Instead of
+ * watching the clause, the other literal is stored inline in the
+ * implication list of each literal, so that propagating does not
+ * need to access the clause unless it becomes a reason.
+ */
+class BinaryImplicationPropagator: public Propagator {
+public:
+    struct Implication {
+        Lit implied;
+        Clause* clause;
+    };
+    using ImplicationList = std::vector<Implication>;
+
+    LitIndexedVec<ImplicationList> implications;
+
+    BinaryImplicationPropagator(PropagationMaster& _propMaster, size_t nVars)
+        : Propagator(_propMaster)
+        , implications(2 * (nVars + 1))
+    {
+
+    }
+
+    void clear() {
+        reset(0);
+        for (ImplicationList& il:implications) {
+            il.clear();
+        }
+    }
+
+    void addImplication(Lit falsified, Lit implied, Clause& clause) {
+        implications[falsified].push_back({implied, &clause});
+    }
+
+    void removeImplications(Lit falsified, Clause& clause) {
+        auto& il = implications[falsified];
+        il.erase(
+            std::remove_if(
+                il.begin(),
+                il.end(),
+                [&clause](auto& implication){
+                    return implication.clause == &clause;
+                }
+            ),
+            il.end()
+        );
+    }
+
+    size_t get_mem_usage() {
+        size_t result = 0;
+        for (auto& il: implications) {
+            result += sizeof(Implication) * il.capacity();
+        }
+
+        return result + sizeof(ImplicationList) * implications.capacity();
+    }
+
+    virtual void increaseNumVarsTo(size_t nVars) {
+        implications.resize(2 * (nVars + 1));
+    }
+
+    virtual void propagate();
+    virtual void cleanupWatches();
+};
+
+using BinaryReason = GenericDBReason<Clause, BinaryImplicationPropagator>;
+
 class Clause {
 private:
     using TElement = Term<void>;
@@ -1145,6 +1511,8 @@ private:
         }
     }
 
+    Clause(const Cardinality& other);
+
     template<typename TermIter>
     Clause(size_t size, TermIter begin, TermIter end)
         : terms(size)
@@ -1195,6 +1563,41 @@ public:
         return terms.size() <= 1;
     }
 
+    bool isBinary() const {
+        return terms.size() == 2;
+    }
+
+    void clearWatches(BinaryImplicationPropagator& prop) {
+        assert(isBinary());
+        prop.removeImplications(terms[0].lit, *this);
+        prop.removeImplications(terms[1].lit, *this);
+    }
+
+    void initWatch(BinaryImplicationPropagator& prop) {
+        assert(isBinary());
+        prop.addImplication(terms[0].lit, terms[1].lit, *this);
+        prop.addImplication(terms[1].lit, terms[0].lit, *this);
+        updateWatch(prop, Lit::Undef(), true);
+    }
+
+    bool updateWatch(BinaryImplicationPropagator& prop, Lit falsifiedLit = Lit::Undef(), bool initial = false) {
+        if (header.isMarkedForDeletion) {
+            return false;
+        }
+
+        const Assignment& assignment = prop.propMaster.getAssignment();
+        State a = assignment[terms[0].lit];
+        State b = assignment[terms[1].lit];
+        if (a == State::False && b == State::False) {
+            prop.propMaster.conflict(BinaryReason::aquire(*this, prop));
+        } else if (a == State::False && b == State::Unassigned) {
+            prop.propMaster.enqueue(terms[1].lit, BinaryReason::aquire(*this, prop));
+        } else if (b == State::False && a == State::Unassigned) {
+            prop.propMaster.enqueue(terms[0].lit, BinaryReason::aquire(*this, prop));
+        }
+        return true;
+    }
+
     void initWatch(ClausePropagator& prop) {
         for (Term<void> term: terms) {
             assert(static_cast<size_t>(term.lit.var()) < prop.propMaster.getAssignment().value.size());
@@ -1317,92 +1720,349 @@ inline std::ostream& operator<<(std::ostream& os, const Clause& v) {
     return os;
 }
 
-template<typename T>
-class IneqPropagator;
+class CardinalityPropagator: public Propagator {
+public:
+    using WatchedType = WatchInfo<Cardinality>;
+    using WatchList = std::vector<WatchedType>;
 
-template<typename T>
-using IneqReason = GenericDBReason<FixedSizeInequality<T>, IneqPropagator<T>>;
+    LitIndexedVec<WatchList> watchlist;
 
-template<typename T>
-class FixedSizeInequality {
+    CardinalityPropagator(PropagationMaster& _propMaster, size_t nVars)
+        : Propagator(_propMaster)
+        , watchlist(2 * (nVars + 1))
+    {
+
+    }
+
+    void clear() {
+        reset(0);
+        for (WatchList& wl:watchlist) {
+            wl.clear();
+        }
+    }
+
+    void watch(Lit lit, WatchedType& w) {
+        watchlist[lit].push_back(w);
+    }
+
+    size_t get_mem_usage() {
+        size_t result = 0;
+        for (auto& wl: watchlist) {
+            result += sizeof(WatchedType) * wl.capacity();
+        }
+
+        return result + sizeof(WatchList) * watchlist.capacity();
+    }
+
+    virtual void increaseNumVarsTo(size_t nVars) {
+        watchlist.resize(2 * (nVars + 1));
+    }
+
+    virtual void propagate();
+    virtual void cleanupWatches();
+};
+
+using CardinalityReason = GenericDBReason<Cardinality, CardinalityPropagator>;
+
+/*
+ * Constraint where all coefficients are one and the degree k is at
+ * least two. Only the literals are stored. Propagation watches k + 1
+ * literals, as long as all of them are not falsified, the constraint
+ * can not propagate.
+ */
+class Cardinality {
 private:
-    uint32_t watchSize = 0;
-    bool enoughWatches = false;
+    using TElement = Term<void>;
+    using TVec = InlineVec<TElement>;
 
-    using TElement = Term<T>;
-    using TVec = std::conditional_t<
-            std::is_trivially_destructible<T>::value,
-            InlineVec<TElement>,
-            std::vector<TElement>
-        >;
-public:
-    T maxCoeff = 0;
+    friend CardinalityHandler;
+    friend std::ostream& operator<<(std::ostream& os, const Cardinality& v);
 
+public:
     using TTerm = TElement;
+    size_t propagationSearchStart = 0;
 
     // common constraint interface:
     DBConstraintHeader header;
-    T degree;
+    int32_t degree;
     TVec terms;
 
 private:
-    friend FixedSizeInequalityHandler<T>;
-    friend std::hash<FixedSizeInequality<T>>;
-
-    size_t size() const {
-        return terms.size();
+    Cardinality(size_t size)
+        : terms(size) {
     }
 
-    FixedSizeInequality(size_t size)
-        :terms(size) {
+    Cardinality(const Cardinality& other)
+        : degree(other.degree)
+        , terms(other.terms.size())
+    {
+        std::copy(other.terms.begin(), other.terms.end(), this->terms.begin());
     }
 
-    FixedSizeInequality(const FixedSizeInequality<T>& other)
-        : terms(other.terms.size())
+    Cardinality(const Clause& other)
+        : degree(1)
+        , terms(other.terms.size())
     {
-        using namespace std;
-        copy(other.terms.begin(), other.terms.end(), this->terms.begin());
-        this->degree = other.degree;
+        std::copy(other.terms.begin(), other.terms.end(), this->terms.begin());
     }
 
-    FixedSizeInequality(std::vector<Term<T>>& _terms, T _degree)
-        : degree(_degree)
-        , terms(_terms.size())
+    // the caller needs to make sure that all coefficients are one
+    template<typename T>
+    Cardinality(const FixedSizeInequality<T>& other)
+        : degree(convertInt<int32_t>(other.degree))
+        , terms(other.terms.size())
     {
-        std::copy(_terms.begin(),_terms.end(), this->terms.begin());
+        for (size_t i = 0; i < other.terms.size(); ++i) {
+            terms[i].lit = other.terms[i].lit;
+        }
     }
 
-    template<typename TermIter, typename TInt>
-    FixedSizeInequality(size_t size, TermIter begin, TermIter end, TInt _degree)
-        : degree(_degree)
-        , terms(size)
-    {
-        std::copy(begin, end, this->terms.begin());
+    size_t watchSize() const {
+        return std::min(terms.size(), static_cast<size_t>(std::max(degree, 0)) + 1);
     }
 
-    // FixedSizeInequality(Clause& clause)
-    //     : degree(1)
-    //     , terms(clause.terms.size())
-    // {
-    //     std::copy(clause.terms.begin(),clause.terms.end(), this->terms.begin());
-    //     // Term<T> term;
-    //     // term.coeff = 1;
-    //     // Term<T>* it = this->terms.begin();
-    //     // for (Term<void> term: clause.terms) {
-    //     //     term.lit = lit;
-    //     //     *it = term;
-    //     //     ++it;
-    //     // }
-    // }
+    void moveWatch(CardinalityPropagator& prop, size_t from, size_t to, Lit falsifiedLit, bool& keep) {
+        Lit old = terms[from].lit;
+        if (old == falsifiedLit) {
+            // the watch list of the falsified literal is cleaned up
+            // by the propagator
+            keep = false;
+        } else {
+            auto& ws = prop.watchlist[old];
+            for (size_t i = 0; i < ws.size(); ++i) {
+                if (ws[i].ineq == this) {
+                    std::swap(ws[i], ws.back());
+                    ws.pop_back();
+                    break;
+                }
+            }
+        }
 
-    void computeMaxCoeff(){
-        // We sort here, because we will need a sorted list for
-        // computing the watchsize.
-        std::sort(terms.begin(), terms.end(), orderByCoeff<Term<T>>);
-        maxCoeff = terms[terms.size() - 1].coeff;
+        std::swap(terms[from], terms[to]);
+        WatchInfo<Cardinality> watchInfo;
+        watchInfo.ineq = this;
+        prop.watch(terms[from].lit, watchInfo);
     }
 
-    void computeWatchSize() {
+public:
+    void clearWatches(CardinalityPropagator& prop) {
+        size_t nWatcher = watchSize();
+        for (size_t i = 0; i < nWatcher; i++) {
+            auto& ws = prop.watchlist[terms[i].lit];
+            ws.erase(
+                std::remove_if(
+                    ws.begin(),
+                    ws.end(),
+                    [this](auto& watch){
+                        return watch.ineq == this;
+                    }
+                ),
+                ws.end()
+            );
+        }
+    }
+
+    bool isPropagatingAt0() {
+        return terms.size() <= static_cast<size_t>(std::max(degree, 0));
+    }
+
+    void initWatch(CardinalityPropagator& prop) {
+        updateWatch(prop, Lit::Undef(), true);
+    }
+
+    // returns if the watch of the falsified literal is kept
+    bool updateWatch(CardinalityPropagator& prop, Lit falsifiedLit = Lit::Undef(), bool initial = false) {
+        bool keep = true;
+
+        if (header.isMarkedForDeletion) {
+            keep = false;
+            return keep;
+        }
+
+        const Assignment& assignment = prop.propMaster.getAssignment();
+        const size_t nWatcher = watchSize();
+        const size_t nUnwatched = terms.size() - nWatcher;
+
+        // replace falsified watches by non falsified literals, the
+        // search for replacements continues where it stopped last
+        // time
+        size_t pos = propagationSearchStart;
+        if (pos < nWatcher || pos >= terms.size()) {
+            pos = nWatcher;
+        }
+        size_t searched = 0;
+        for (size_t i = 0; i < nWatcher && searched < nUnwatched; i++) {
+            if (assignment[terms[i].lit] != State::False) {
+                continue;
+            }
+
+            while (searched < nUnwatched) {
+                size_t candidate = pos;
+                searched += 1;
+                pos += 1;
+                if (pos == terms.size()) {
+                    pos = nWatcher;
+                }
+
+                if (assignment[terms[candidate].lit] != State::False) {
+                    if (initial) {
+                        std::swap(terms[i], terms[candidate]);
+                    } else {
+                        moveWatch(prop, i, candidate, falsifiedLit, keep);
+                    }
+                    break;
+                }
+            }
+        }
+        propagationSearchStart = pos;
+
+        if (initial) {
+            keep = false;
+            for (size_t i = 0; i < nWatcher; i++) {
+                WatchInfo<Cardinality> watchInfo;
+                watchInfo.ineq = this;
+                prop.watch(terms[i].lit, watchInfo);
+            }
+        }
+
+        // if a watch is falsified then so are all unwatched literals
+        int32_t numNonFalse = 0;
+        for (size_t i = 0; i < nWatcher; i++) {
+            if (assignment[terms[i].lit] != State::False) {
+                numNonFalse += 1;
+            }
+        }
+
+        if (numNonFalse < degree) {
+            prop.propMaster.conflict(CardinalityReason::aquire(*this, prop));
+        } else if (numNonFalse == degree) {
+            for (size_t i = 0; i < nWatcher; i++) {
+                if (assignment[terms[i].lit] == State::Unassigned) {
+                    prop.propMaster.enqueue(
+                        terms[i].lit,
+                        CardinalityReason::aquire(*this, prop));
+                }
+            }
+        }
+
+        return keep;
+    }
+};
+
+inline Clause::Clause(const Cardinality& other)
+    : terms(other.terms.size())
+{
+    std::copy(other.terms.begin(), other.terms.end(), this->terms.begin());
+}
+
+inline std::ostream& operator<<(std::ostream& os, const Cardinality& v) {
+    for (Term<void> term: v.terms) {
+        os << term << " ";
+    };
+    os << " >= " << v.degree;
+    return os;
+}
+
+template<typename T>
+class IneqPropagator;
+
+template<typename T>
+using IneqReason = GenericDBReason<FixedSizeInequality<T>, IneqPropagator<T>>;
+
+template<typename T>
+class FixedSizeInequality {
+private:
+    uint32_t watchSize = 0;
+    bool enoughWatches = false;
+
+    using TElement = Term<T>;
+    using TVec = std::conditional_t<
+            std::is_trivially_destructible<T>::value,
+            InlineVec<TElement>,
+            std::vector<TElement>
+        >;
+public:
+    T maxCoeff = 0;
+
+    using TTerm = TElement;
+
+    // common constraint interface:
+    DBConstraintHeader header;
+    T degree;
+    TVec terms;
+
+private:
+    friend FixedSizeInequalityHandler<T>;
+    friend std::hash<FixedSizeInequality<T>>;
+
+    size_t size() const {
+        return terms.size();
+    }
+
+    FixedSizeInequality(size_t size)
+        :terms(size) {
+    }
+
+    FixedSizeInequality(const FixedSizeInequality<T>& other)
+        : terms(other.terms.size())
+    {
+        using namespace std;
+        copy(other.terms.begin(), other.terms.end(), this->terms.begin());
+        this->degree = other.degree;
+    }
+
+    // the caller needs to make sure that all values fit into T
+    template<typename TOther>
+    FixedSizeInequality(const FixedSizeInequality<TOther>& other)
+        : degree(convertInt<T>(other.degree))
+        , terms(other.terms.size())
+    {
+        for (size_t i = 0; i < other.terms.size(); i++) {
+            this->terms[i] = Term<T>(convertInt<T>(other.terms[i].coeff), other.terms[i].lit);
+        }
+    }
+
+    FixedSizeInequality(std::vector<Term<T>>& _terms, T _degree)
+        : degree(_degree)
+        , terms(_terms.size())
+    {
+        std::copy(_terms.begin(),_terms.end(), this->terms.begin());
+    }
+
+    template<typename TermIter, typename TInt>
+    FixedSizeInequality(size_t size, TermIter begin, TermIter end, TInt _degree)
+        : degree(_degree)
+        , terms(size)
+    {
+        std::copy(begin, end, this->terms.begin());
+    }
+
+    FixedSizeInequality(const Clause& clause)
+        : degree(1)
+        , terms(clause.terms.size())
+    {
+        for (size_t i = 0; i < clause.terms.size(); i++) {
+            this->terms[i] = Term<T>(1, clause.terms[i].lit);
+        }
+    }
+
+    FixedSizeInequality(const Cardinality& other)
+        : degree(other.degree)
+        , terms(other.terms.size())
+    {
+        for (size_t i = 0; i < other.terms.size(); i++) {
+            this->terms[i] = Term<T>(1, other.terms[i].lit);
+        }
+    }
+
+    void computeMaxCoeff(){
+        // We sort here, because we will need a sorted list for
+        // computing the watchsize.
+        std::sort(terms.begin(), terms.end(), orderByCoeff<Term<T>>);
+        maxCoeff = terms[terms.size() - 1].coeff;
+    }
+
+    void computeWatchSize() {
         if (terms.size() == 0) {
             return;
         }
@@ -1601,6 +2261,14 @@ public:
                     }
                 }
 
+                if (init) {
+                    // no replacement, keep watching the falsified
+                    // literal so that we notice when it is reassigned
+                    WatchInfo<FixedSizeInequality<T>> w;
+                    w.ineq = this;
+                    prop.watch(terms[i].lit, w);
+                }
+
                 found_new_watch:
                 ;
             } else {
@@ -1704,15 +2372,17 @@ inline std::ostream& operator<<(std::ostream& os, const ClausePropagator& v) {
 template<typename TConstraint>
 class ConstraintHandler {
 private:
-    void* malloc(size_t size) {
-        capacity = size;
+    static size_t memSize(size_t size) {
         size_t extra = extra_size_requirement<
                 typename TConstraint::TVec,
                 typename TConstraint::TElement
             >::value(size);
-        size_t memSize = sizeof(TConstraint) + extra;
-        // return std::aligned_alloc(64, memSize);
-        return std::malloc(memSize);
+        return sizeof(TConstraint) + extra;
+    }
+
+    void* malloc(size_t size) {
+        capacity = size;
+        return SlabAllocator::get().allocate(memSize(size));
     }
 
 public:
@@ -1724,7 +2394,7 @@ public:
     void free(){
         if (ineq != nullptr) {
             ineq->~TConstraint();
-            std::free(ineq);
+            SlabAllocator::get().deallocate(ineq, memSize(capacity));
             ineq = nullptr;
         }
     }
@@ -1736,6 +2406,7 @@ public:
 
     ConstraintHandler(ConstraintHandler<TConstraint>&& other) noexcept {
         ineq = other.ineq;
+        capacity = other.capacity;
         other.ineq = nullptr;
     }
 
@@ -1759,6 +2430,7 @@ public:
     ConstraintHandler& operator=(ConstraintHandler&& other) {
         this->free();
         ineq = other.ineq;
+        capacity = other.capacity;
         other.ineq = nullptr;
         return *this;
     }
@@ -1804,6 +2476,150 @@ public:
     }
 };
 
+/*
+ * Sum that is accumulated in 64 bit as long as all values and
+ * intermediate sums fit and in T otherwise.
+ */
+template<typename T>
+class CheckedSum {
+private:
+    int64_t small = 0;
+    bool isSmall = true;
+    T large;
+
+    void promote() {
+        if (isSmall) {
+            isSmall = false;
+            large = small;
+        }
+    }
+
+public:
+    template<typename TInt>
+    void add(const TInt& value) {
+        int64_t v;
+        int64_t result;
+        if (isSmall && toInt64(value, v) && !__builtin_add_overflow(small, v, &result)) {
+            small = result;
+        } else {
+            promote();
+            large += value;
+        }
+    }
+
+    template<typename TInt>
+    void subtract(const TInt& value) {
+        int64_t v;
+        int64_t result;
+        if (isSmall && toInt64(value, v) && !__builtin_sub_overflow(small, v, &result)) {
+            small = result;
+        } else {
+            promote();
+            large -= value;
+        }
+    }
+
+    bool isPositive() const {
+        return isSmall ? small > 0 : large > 0;
+    }
+};
+
+/*
+ * Checks if a constraint implies other constraints. The implying
+ * constraint is loaded into a variable indexed scratch array, so
+ * that each check only needs to iterate over the terms of the
+ * implied constraint.
+ */
+template<typename T>
+class ImplicationChecker {
+private:
+    // one plus the position of the term of a variable in terms or
+    // zero if the loaded constraint does not contain the variable
+    VarIndexedVec<uint32_t> pos;
+    std::vector<Term<T>> terms;
+    // sum of the coefficients minus the degree
+    T slack;
+    bool bussy = false;
+
+public:
+    static ImplicationChecker& get() {
+        static ImplicationChecker checker;
+        return checker;
+    }
+
+    template<typename TIneq>
+    void load(const TIneq& ineq) {
+        assert(!bussy && "critical error: I am used twice!");
+        bussy = true;
+
+        slack = 0;
+        slack -= ineq.degree;
+        for (const auto& term: ineq.terms) {
+            Var var = term.lit.var();
+            if (pos.size() <= var) {
+                pos.resize(var.value + 1, 0);
+            }
+            terms.emplace_back(term.coeff, term.lit);
+            pos[var] = terms.size();
+            slack += term.coeff;
+        }
+    }
+
+    void unload() {
+        for (const Term<T>& term: terms) {
+            pos[term.lit.var()] = 0;
+        }
+        terms.clear();
+        bussy = false;
+    }
+
+    /*
+     * Check if the loaded constraint implies ineq, i.e., if ineq
+     * can be obtained by weakening the loaded constraint. The
+     * weakening cost is the slack of the loaded constraint plus the
+     * degree of ineq minus the coefficients that do not need to be
+     * weakened.
+     */
+    template<typename TIneq>
+    bool implies(const TIneq& ineq) {
+        CheckedSum<T> weakenCost;
+        weakenCost.add(slack);
+        weakenCost.add(ineq.degree);
+        for (const auto& term: ineq.terms) {
+            Var var = term.lit.var();
+            if (pos.size() <= var || pos[var] == 0) {
+                continue;
+            }
+
+            const Term<T>& mine = terms[pos[var] - 1];
+            if (mine.lit == term.lit) {
+                if (mine.coeff <= term.coeff || term.coeff >= ineq.degree) {
+                    weakenCost.subtract(mine.coeff);
+                } else {
+                    // only weaken to the target coefficient, if the
+                    // target coefficient is not saturated
+                    weakenCost.subtract(term.coeff);
+                }
+            }
+        }
+        return !weakenCost.isPositive();
+    }
+
+    struct loadIneq {
+        template<typename TIneq>
+        void operator()(TIneq& ineq, ImplicationChecker& checker) {
+            checker.load(ineq);
+        }
+    };
+
+    struct isImplied {
+        template<typename TIneq>
+        bool operator()(TIneq& ineq, ImplicationChecker& checker) {
+            return checker.implies(ineq);
+        }
+    };
+};
+
 namespace InplaceIneqOps {
     /* This contains a set of methods that can operate on classes that have a
     member term of any Term<> type and a member degree of an integer type.
@@ -1818,6 +2634,11 @@ namespace InplaceIneqOps {
             return true;
         }
 
+        bool operator()(Cardinality& ineq) {
+            // all coefficients are one and the degree is positive
+            return true;
+        }
+
         /* returns true if the resulting constraint is normalized */
         template<typename TIneq>
         bool operator()(TIneq& ineq) {
@@ -1833,6 +2654,11 @@ namespace InplaceIneqOps {
         template<typename TInt>
         void operator()(Clause& ineq, TInt divisor) {}
 
+        template<typename TInt>
+        void operator()(Cardinality& ineq, TInt divisor) {
+            ineq.degree = divideAndRoundUp(ineq.degree, divisor);
+        }
+
         template<typename TIneq, typename TInt>
         void operator()(TIneq& ineq, TInt divisor) {
             ineq.degree = divideAndRoundUp(ineq.degree, divisor);
@@ -1897,6 +2723,12 @@ namespace InplaceIneqOps {
                 return false;
             }
 
+            // constraints that are created in the same way usually
+            // have their terms in the same order
+            if (std::equal(ineqA.terms.begin(), ineqA.terms.end(), ineqB.terms.begin())) {
+                return true;
+            }
+
             std::vector<TermA> mine(ineqA.terms.begin(), ineqA.terms.end());
             sort(mine.begin(), mine.end(), orderByVar<TermA>);
             std::vector<TermB> theirs(ineqB.terms.begin(), ineqB.terms.end());
@@ -1910,14 +2742,16 @@ namespace InplaceIneqOps {
         template<typename TIneq>
         size_t operator()(TIneq& ineq) {
             using TTerm = typename TIneq::TTerm;
-            std::vector<TTerm> mine(ineq.terms.begin(), ineq.terms.end());
-            sort(mine.begin(), mine.end(), orderByVar<TTerm>);
 
+            // the terms are not sorted, hence, the hashes of the
+            // terms are combined by a commutative operation
             std::size_t seed = 0;
-
-            for (const TTerm& term: mine) {
-                hash_combine(seed, term.coeff);
-                hash_combine(seed, term.lit);
+            for (const TTerm& term: ineq.terms) {
+                std::size_t termHash = 0;
+                hash_combine(termHash, term.coeff);
+                termHash = mixHash(termHash);
+                hash_combine(termHash, term.lit);
+                seed += mixHash(termHash);
             }
 
             hash_combine(seed, ineq.degree);
@@ -1928,24 +2762,30 @@ namespace InplaceIneqOps {
     struct implies {
         template<typename TIneqA, typename TIneqB>
         bool operator()(TIneqA& a, TIneqB& b) {
-            // using IntTypeIterA = typename TIneqA::TTerm::coeff_type;
-            // using IntTypeIterB = typename TIneqB::TTerm::coeff_type;
-
-            // using Type1 = typename int_conversion<IntTypeIterA, IntTypeIterB>::stronger;
-            // using Type2 = typename int_conversion<Type1, IntTypeA>::stronger;
-            // using IntTypeStronger = typename int_conversion<Type2, IntTypeB>::stronger;
-            // using IntSumSafe = typename int_information<IntTypeStronger>::sum_safe;
+            ImplicationChecker<CoefType>& checker = ImplicationChecker<CoefType>::get();
+            checker.load(a);
+            bool result = checker.implies(b);
+            checker.unload();
+            return result;
+        }
+    };
 
+    /*
+     * Same check as implies, but using a map of the terms of b that
+     * is built on every call. This was used before implies, it is
+     * kept for comparison in tests and benchmarks.
+     */
+    struct impliesByMap {
+        template<typename TIneqA, typename TIneqB>
+        bool operator()(TIneqA& a, TIneqB& b) {
             using TTerm = typename TIneqB::TTerm;
             std::unordered_map<size_t, TTerm> lookup;
             for (auto& term: b.terms) {
                 lookup.insert(std::make_pair(term.lit.var(), term));
             }
 
-            // IntSumSafe weakenCost = 0;
-            BigInt weakenCost = 0;
+            CoefType weakenCost = 0;
             for (auto& term: a.terms) {
-                using namespace std;
                 size_t var = term.lit.var();
 
                 auto search = lookup.find(var);
@@ -1985,6 +2825,28 @@ namespace InplaceIneqOps {
         }
     };
 
+    struct renameVars {
+        template<typename TIneq>
+        void operator()(TIneq& ineq, const std::vector<Var>& mapping) {
+            // the mapping is injective, hence the constraint stays
+            // normalized
+            for (auto& term: ineq.terms) {
+                term.lit = Lit(mapping[term.lit.var()], term.lit.isNegated());
+            }
+        }
+    };
+
+    struct getTerms {
+        template<typename TIneq, typename T>
+        T operator()(TIneq& ineq, std::vector<Term<T>>& terms) {
+            terms.reserve(terms.size() + ineq.terms.size());
+            for (auto& term: ineq.terms) {
+                terms.emplace_back(term.coeff, term.lit);
+            }
+            return ineq.degree;
+        }
+    };
+
     struct print {
         template<typename TIneq>
         std::ostream& operator()(TIneq& ineq, std::function<std::string(int)> varName, std::ostream& out) {
@@ -2160,37 +3022,274 @@ public:
     }
 };
 
+/*
+ * For every literal the list of constraints containing it, which is
+ * used to find the constraints that are affected by a substitution.
+ * Constraints are identified by dense ids, so that an occurrence only
+ * takes 4 bytes, and lists are only allocated for literals that
+ * occur. Removing a constraint only marks its id as removed, the
+ * entries are dropped when the list is compacted, which happens when
+ * it is traversed or when a large part of all entries is removed.
+ * An id is reused once all its entries are dropped.
+ */
 template<typename T>
-class PropagatorGroup {
+class OccursLists {
 private:
-    std::array<std::list<Inequality<T>*>, 4> lists;
-    bool _isActive = false;
-public:
-    PropagationMaster& propMaster;
-    std::vector<Inequality<T>*> propagatingAt0;
+    using Id = uint32_t;
+
+    struct List {
+        std::vector<Id> ids;
+        size_t numRemoved = 0;
+    };
+
+    size_t numLits;
+    // index + 1 of the list of a literal or 0 if it has none
+    LitIndexedVec<uint32_t> listIndex;
+    std::vector<List> lists;
+
+    std::vector<Inequality<T>*> constraints;
+    std::vector<bool> isRemoved;
+    std::vector<bool> isSeen;
+    // number of entries of a removed id that are not dropped yet
+    std::vector<uint32_t> numPending;
+    std::vector<Id> freeIds;
+
+    size_t numEntries = 0;
+    size_t numRemovedEntries = 0;
+
+    List* find(Lit lit) {
+        size_t pos = static_cast<size_t>(lit);
+        if (pos >= listIndex.size() || listIndex[lit] == 0) {
+            return nullptr;
+        }
+        return &lists[listIndex[lit] - 1];
+    }
+
+    void compact(List& list) {
+        auto kept = list.ids.begin();
+        for (Id id: list.ids) {
+            if (!isRemoved[id]) {
+                *kept = id;
+                ++kept;
+            } else if (--numPending[id] == 0) {
+                isRemoved[id] = false;
+                freeIds.push_back(id);
+            }
+        }
+        list.ids.erase(kept, list.ids.end());
+
+        numEntries -= list.numRemoved;
+        numRemovedEntries -= list.numRemoved;
+        list.numRemoved = 0;
+    }
+
+    void compactAll() {
+        for (List& list: lists) {
+            if (list.numRemoved > 0) {
+                compact(list);
+            }
+        }
+    }
+
+public:
+    OccursLists(size_t nVars)
+        : numLits(2 * (nVars + 1))
+    {}
+
+    Id newId(Inequality<T>& ineq) {
+        Id id;
+        if (freeIds.empty()) {
+            id = constraints.size();
+            constraints.push_back(&ineq);
+            isRemoved.push_back(false);
+            isSeen.push_back(false);
+            numPending.push_back(0);
+        } else {
+            id = freeIds.back();
+            freeIds.pop_back();
+            constraints[id] = &ineq;
+        }
+        ineq._occursId = id;
+        return id;
+    }
+
+    void insert(Lit lit, Id id) {
+        if (listIndex.empty()) {
+            listIndex.resize(numLits);
+        }
+        if (listIndex[lit] == 0) {
+            lists.emplace_back();
+            listIndex[lit] = lists.size();
+        }
+        lists[listIndex[lit] - 1].ids.push_back(id);
+        numEntries += 1;
+    }
+
+    /*
+     * Mark one entry in the list of lit as removed, all entries of
+     * a constraint need to be marked before calling release.
+     */
+    void erase(Lit lit) {
+        List* list = find(lit);
+        assert(list != nullptr);
+        list->numRemoved += 1;
+        numRemovedEntries += 1;
+    }
+
+    void release(Inequality<T>& ineq, size_t numIneqEntries) {
+        Id id = ineq._occursId;
+        isRemoved[id] = true;
+        numPending[id] = numIneqEntries;
+        if (numIneqEntries == 0) {
+            isRemoved[id] = false;
+            freeIds.push_back(id);
+        }
+
+        if (numRemovedEntries > 1024 && 2 * numRemovedEntries > numEntries) {
+            compactAll();
+        }
+    }
+
+    /*
+     * Append the constraints containing lit to result, that are not
+     * marked as seen, and mark them. Call unmark on the result
+     * before the next collection.
+     */
+    void collect(Lit lit, std::vector<Inequality<T>*>& result) {
+        List* list = find(lit);
+        if (list != nullptr) {
+            if (list->numRemoved > 0) {
+                compact(*list);
+            }
+            for (Id id: list->ids) {
+                if (!isSeen[id]) {
+                    isSeen[id] = true;
+                    result.push_back(constraints[id]);
+                }
+            }
+        }
+    }
+
+    void unmark(const std::vector<Inequality<T>*>& collected) {
+        for (Inequality<T>* ineq: collected) {
+            unmark(*ineq);
+        }
+    }
+
+    void unmark(Inequality<T>& ineq) {
+        isSeen[ineq._occursId] = false;
+    }
+
+    void clear() {
+        listIndex.clear();
+        lists.clear();
+        constraints.clear();
+        isRemoved.clear();
+        isSeen.clear();
+        numPending.clear();
+        freeIds.clear();
+        numEntries = 0;
+        numRemovedEntries = 0;
+    }
+
+    void increaseNumVarsTo(size_t nVars) {
+        numLits = 2 * (nVars + 1);
+        if (!listIndex.empty()) {
+            listIndex.resize(numLits);
+        }
+    }
+
+    size_t get_mem_usage() {
+        size_t result = listIndex.capacity() * sizeof(uint32_t)
+            + lists.capacity() * sizeof(List)
+            + constraints.capacity() * sizeof(Inequality<T>*)
+            + numPending.capacity() * sizeof(uint32_t)
+            + freeIds.capacity() * sizeof(Id)
+            + (isRemoved.capacity() + isSeen.capacity()) / 8;
+        for (List& list: lists) {
+            result += list.ids.capacity() * sizeof(Id);
+        }
+        return result;
+    }
+};
+
+template<typename T>
+class PropagatorGroup {
+private:
+    std::array<std::vector<Inequality<T>*>, 4> lists;
+    // number of removed constraints in each list, their entries are
+    // nullptr until the list is compacted
+    std::array<size_t, 4> numRemoved = {};
+    bool _isActive = false;
+public:
+    PropagationMaster& propMaster;
+    std::vector<Inequality<T>*> propagatingAt0;
 
 
 
 
     enum class State {unhandled, unattached, unregistered, handled};
 
-    std::list<Inequality<T>*>& get(State state) {
+    /*
+     * The constraints in the given state, in the order they were
+     * added to the state.
+     */
+    std::vector<Inequality<T>*>& get(State state) {
+        if (numRemoved[static_cast<int>(state)] > 0) {
+            compact(state);
+        }
         return lists[static_cast<int>(state)];
     }
 
-    typedef std::unordered_set<Inequality<T>*>  OccursList;
-    LitIndexedVec<OccursList> occurs;
+private:
+    void compact(State state) {
+        std::vector<Inequality<T>*>& list = lists[static_cast<int>(state)];
+        size_t kept = 0;
+        for (Inequality<T>* ineq: list) {
+            if (ineq != nullptr) {
+                ineq->_groupIndex = kept;
+                list[kept] = ineq;
+                kept += 1;
+            }
+        }
+        list.resize(kept);
+        numRemoved[static_cast<int>(state)] = 0;
+    }
+
+    void append(State state, Inequality<T>& ineq) {
+        std::vector<Inequality<T>*>& list = get(state);
+        ineq._groupIndex = list.size();
+        ineq._groupState = state;
+        list.push_back(&ineq);
+    }
+
+    void moveAll(State from, State to) {
+        for (Inequality<T>* ineq: get(from)) {
+            append(to, *ineq);
+        }
+        get(from).clear();
+    }
+
+public:
+
+    OccursLists<T> occurs;
 
     IneqPropagator<T> ineqPropagator;
     IneqPropagator<int32_t> ineq32Propagator;
+    IneqPropagator<int64_t> ineq64Propagator;
+    CardinalityPropagator cardinalityPropagator;
     ClausePropagator clausePropagator;
+    BinaryImplicationPropagator binaryPropagator;
 
     PropagatorGroup(PropagationMaster& _propMaster, size_t _nVars)
         : propMaster(_propMaster)
-        , occurs(2 * (_nVars + 1))
+        , occurs(_nVars)
         , ineqPropagator(_propMaster, _nVars)
         , ineq32Propagator(_propMaster, _nVars)
+        , ineq64Propagator(_propMaster, _nVars)
+        , cardinalityPropagator(_propMaster, _nVars)
         , clausePropagator(_propMaster, _nVars)
+        , binaryPropagator(_propMaster, _nVars)
 
     {}
 
@@ -2200,23 +3299,25 @@ public:
         for (auto& list:lists) {
             list.clear();
         }
+        numRemoved.fill(0);
 
-        for (OccursList& ol:occurs) {
-            ol.clear();
-        }
+        occurs.clear();
 
+        binaryPropagator.clear();
         clausePropagator.clear();
+        cardinalityPropagator.clear();
         ineq32Propagator.clear();
+        ineq64Propagator.clear();
         ineqPropagator.clear();
     }
 
     size_t get_mem_usage() {
         // memory of propagators is counted in propmaster
-        return sizeof(OccursList) * occurs.capacity();
+        return occurs.get_mem_usage();
     }
 
     void increaseNumVarsTo(size_t nVars) {
-        occurs.resize(2 * (nVars + 1));
+        occurs.increaseNumVarsTo(nVars);
     }
 
     bool isActive() {
@@ -2227,7 +3328,10 @@ public:
         if (!_isActive) {
             _isActive = true;
             propMaster.activatePropagator(clausePropagator);
+            propMaster.activatePropagator(binaryPropagator);
+            propMaster.activatePropagator(cardinalityPropagator);
             propMaster.activatePropagator(ineq32Propagator);
+            propMaster.activatePropagator(ineq64Propagator);
             propMaster.activatePropagator(ineqPropagator);
         }
     }
@@ -2236,7 +3340,10 @@ public:
         if (_isActive) {
             _isActive = false;
             propMaster.deactivatePropagator(clausePropagator);
+            propMaster.deactivatePropagator(binaryPropagator);
+            propMaster.deactivatePropagator(cardinalityPropagator);
             propMaster.deactivatePropagator(ineq32Propagator);
+            propMaster.deactivatePropagator(ineq64Propagator);
             propMaster.deactivatePropagator(ineqPropagator);
         }
     }
@@ -2247,12 +3354,18 @@ public:
         }
     }
 
-    void attachUnattached() {
+    /*
+     * Return true if any constraints were attached.
+     */
+    bool attachUnattached() {
+        bool attached = !get(State::unhandled).empty() || !get(State::unattached).empty();
         for (State state: {State::unhandled, State::unattached}) {
-            for (Inequality<T>* ineq: get(state)) {
+            // newest constraints first
+            std::vector<Inequality<T>*>& list = get(state);
+            for (auto it = list.rbegin(); it != list.rend(); ++it) {
+                Inequality<T>* ineq = *it;
                 ineq->wasAttached = true;
                 ineq->initWatch(*this);
-                ineq->_groupState = (state == State::unhandled) ? State::unregistered : State::handled;
 
                 if (ineq->isPropagatingAt0()) {
                     this->propagatingAt0.push_back(ineq);
@@ -2260,26 +3373,25 @@ public:
             }
         }
 
-        get(State::unregistered).splice(get(State::unregistered).end(), get(State::unhandled));
-        get(State::handled).splice(get(State::handled).end(), get(State::unattached));
+        moveAll(State::unhandled, State::unregistered);
+        moveAll(State::unattached, State::handled);
+        return attached;
     }
 
     void registerOccurences() {
         for (State state: {State::unhandled, State::unregistered}) {
-            for (Inequality<T>* ineq: get(state)) {
-                ineq->registerOccurence(*this);
-                ineq->_groupState = (state == State::unhandled) ? State::unattached : State::handled;
+            std::vector<Inequality<T>*>& list = get(state);
+            for (auto it = list.rbegin(); it != list.rend(); ++it) {
+                (*it)->registerOccurence(*this);
             }
         }
 
-        get(State::unattached).splice(get(State::unattached).end(), get(State::unhandled));
-        get(State::handled).splice(get(State::handled).end(), get(State::unregistered));
+        moveAll(State::unhandled, State::unattached);
+        moveAll(State::unregistered, State::handled);
     }
 
     void add(Inequality<T>& ineq) {
-        get(State::unhandled).push_front(&ineq);
-        ineq._groupIter = get(State::unhandled).begin();
-        ineq._groupState = State::unhandled;
+        append(State::unhandled, ineq);
     }
 
     void remove(Inequality<T>& ineq) {
@@ -2291,7 +3403,15 @@ public:
             }
         }
 
-        get(ineq._groupState).erase(ineq._groupIter);
+        // the order of the remaining constraints is kept, the entry
+        // is dropped once more than half of the list is removed or
+        // the list is accessed
+        size_t state = static_cast<size_t>(ineq._groupState);
+        lists[state][ineq._groupIndex] = nullptr;
+        numRemoved[state] += 1;
+        if (2 * numRemoved[state] > lists[state].size()) {
+            compact(ineq._groupState);
+        }
         if (ineq._groupState == State::unregistered
                 || ineq._groupState == State::handled) {
             // we need to clear the watches now, a lazy removal is not
@@ -2306,9 +3426,9 @@ public:
         }
     }
 
-    std::unordered_set<Inequality<T>*> computeEffected(Substitution& sub) {
+    std::vector<Inequality<T>*> computeEffected(Substitution& sub) {
         registerOccurences();
-        std::unordered_set<Inequality<T>*> unique;
+        std::vector<Inequality<T>*> result;
         for (auto it: sub.map) {
             Lit from = it.first;
             Lit to   = it.second;
@@ -2318,10 +3438,26 @@ public:
             // not need to add it to the set of effected
             // constraints
             if (to != Substitution::one()) {
-                unique.insert(occurs[from].begin(), occurs[to].end());
+                occurs.collect(from, result);
             }
         }
-        return unique;
+        occurs.unmark(result);
+        return result;
+    }
+
+    /*
+     * Append the constraints that contain a literal of terms to
+     * result, every constraint is appended at most once.
+     */
+    void collectOccurences(const std::vector<Term<T>>& terms, std::vector<Inequality<T>*>& result) {
+        registerOccurences();
+        size_t start = result.size();
+        for (const Term<T>& term: terms) {
+            occurs.collect(term.lit, result);
+        }
+        for (auto it = result.begin() + start; it != result.end(); ++it) {
+            occurs.unmark(**it);
+        }
     }
 
     struct initWatch {
@@ -2333,8 +3469,20 @@ public:
             constraint.initWatch(engine.ineq32Propagator);
         }
 
+        void operator()(FixedSizeInequality<int64_t>& constraint, PropagatorGroup<T>& engine) {
+            constraint.initWatch(engine.ineq64Propagator);
+        }
+
+        void operator()(Cardinality& constraint, PropagatorGroup<T>& engine) {
+            constraint.initWatch(engine.cardinalityPropagator);
+        }
+
         void operator()(Clause& constraint, PropagatorGroup<T>& engine) {
-            constraint.initWatch(engine.clausePropagator);
+            if (constraint.isBinary()) {
+                constraint.initWatch(engine.binaryPropagator);
+            } else {
+                constraint.initWatch(engine.clausePropagator);
+            }
         }
     };
 
@@ -2347,8 +3495,20 @@ public:
             constraint.clearWatches(engine.ineq32Propagator);
         }
 
+        void operator()(FixedSizeInequality<int64_t>& constraint, PropagatorGroup<T>& engine) {
+            constraint.clearWatches(engine.ineq64Propagator);
+        }
+
+        void operator()(Cardinality& constraint, PropagatorGroup<T>& engine) {
+            constraint.clearWatches(engine.cardinalityPropagator);
+        }
+
         void operator()(Clause& constraint, PropagatorGroup<T>& engine) {
-            constraint.clearWatches(engine.clausePropagator);
+            if (constraint.isBinary()) {
+                constraint.clearWatches(engine.binaryPropagator);
+            } else {
+                constraint.clearWatches(engine.clausePropagator);
+            }
         }
     };
 
@@ -2361,8 +3521,20 @@ public:
             constraint.updateWatch(engine.ineq32Propagator);
         }
 
+        void operator()(FixedSizeInequality<int64_t>& constraint, PropagatorGroup<T>& engine) {
+            constraint.updateWatch(engine.ineq64Propagator);
+        }
+
+        void operator()(Cardinality& constraint, PropagatorGroup<T>& engine) {
+            constraint.updateWatch(engine.cardinalityPropagator);
+        }
+
         void operator()(Clause& constraint, PropagatorGroup<T>& engine) {
-            constraint.updateWatch(engine.clausePropagator);
+            if (constraint.isBinary()) {
+                constraint.updateWatch(engine.binaryPropagator);
+            } else {
+                constraint.updateWatch(engine.clausePropagator);
+            }
         }
     };
 
@@ -2370,8 +3542,9 @@ public:
     struct addOccurence {
         template<typename TIneq>
         void operator()(TIneq& ineq, PropagatorGroup<T>& engine, Inequality<T>& w){
+            uint32_t id = engine.occurs.newId(w);
             for (auto& term: ineq.terms) {
-                engine.occurs[term.lit].emplace(&w);
+                engine.occurs.insert(term.lit, id);
             }
         }
     };
@@ -2380,20 +3553,381 @@ public:
         template<typename TIneq>
         void operator()(TIneq& ineq, PropagatorGroup<T>& engine, Inequality<T>& w){
             for (auto& term: ineq.terms) {
-                engine.occurs[term.lit].erase(&w);
+                engine.occurs.erase(term.lit);
             }
+            engine.occurs.release(w, ineq.terms.size());
         }
     };
 };
 
 
+/*
+ * Lightweight propagator for checking reverse unit propagation with
+ * hints: instead of watching all constraints of the database, every
+ * hinted constraint is looked at exactly once, in the order given by
+ * the hints, and propagates under the current assignment. The
+ * propagators of the group are only used as owners of the reasons.
+ */
+template<typename T>
+class HintPropagator {
+    PropagatorGroup<T>& group;
+
+    IneqPropagator<T>& propagator(FixedSizeInequality<T>& ineq) {
+        return group.ineqPropagator;
+    }
+
+    IneqPropagator<int32_t>& propagator(FixedSizeInequality<int32_t>& ineq) {
+        return group.ineq32Propagator;
+    }
+
+    IneqPropagator<int64_t>& propagator(FixedSizeInequality<int64_t>& ineq) {
+        return group.ineq64Propagator;
+    }
+
+public:
+    HintPropagator(PropagatorGroup<T>& _group)
+        : group(_group)
+    {}
+
+    void operator()(Clause& clause) {
+        if (clause.isBinary()) {
+            clause.updateWatch(group.binaryPropagator);
+            return;
+        }
+
+        PropagationMaster& propMaster = group.propMaster;
+        const Assignment& assignment = propMaster.getAssignment();
+        Lit unassigned = Lit::Undef();
+        size_t numUnassigned = 0;
+        for (Term<void> term: clause.terms) {
+            switch (assignment[term.lit]) {
+                case State::True:
+                    return;
+                case State::Unassigned:
+                    unassigned = term.lit;
+                    numUnassigned += 1;
+                    break;
+                case State::False:
+                    break;
+            }
+        }
+
+        if (numUnassigned == 0) {
+            propMaster.conflict(ClauseReason::aquire(clause, group.clausePropagator));
+        } else if (numUnassigned == 1) {
+            propMaster.enqueue(unassigned, ClauseReason::aquire(clause, group.clausePropagator));
+        }
+    }
+
+    void operator()(Cardinality& ineq) {
+        PropagationMaster& propMaster = group.propMaster;
+        const Assignment& assignment = propMaster.getAssignment();
+        int32_t numNonFalse = 0;
+        for (Term<void> term: ineq.terms) {
+            if (assignment[term.lit] != State::False) {
+                numNonFalse += 1;
+            }
+        }
+
+        if (numNonFalse < ineq.degree) {
+            propMaster.conflict(CardinalityReason::aquire(ineq, group.cardinalityPropagator));
+        } else if (numNonFalse == ineq.degree) {
+            for (Term<void> term: ineq.terms) {
+                if (assignment[term.lit] == State::Unassigned) {
+                    propMaster.enqueue(term.lit, CardinalityReason::aquire(ineq, group.cardinalityPropagator));
+                }
+            }
+        }
+    }
+
+    template<typename TInt>
+    void operator()(FixedSizeInequality<TInt>& ineq) {
+        PropagationMaster& propMaster = group.propMaster;
+        const Assignment& assignment = propMaster.getAssignment();
+        TInt slack = -ineq.degree;
+        for (const auto& term: ineq.terms) {
+            if (assignment[term.lit] != State::False) {
+                slack += term.coeff;
+            }
+        }
+
+        if (slack < 0) {
+            propMaster.conflict(IneqReason<TInt>::aquire(ineq, propagator(ineq)));
+            return;
+        }
+
+        for (const auto& term: ineq.terms) {
+            if (term.coeff > slack && assignment[term.lit] == State::Unassigned) {
+                propMaster.enqueue(term.lit, IneqReason<TInt>::aquire(ineq, propagator(ineq)));
+            }
+        }
+    }
+};
+
+/*
+ * Decides when the trail at level 0 is propagated before a RUP check.
+ *
+ * Fully propagating is too time consuming in some cases in connection
+ * with redundancy checks. Consider that we want to check F, \neg C,
+ * \neg D |- \bot in a redundancy check. Propagating F, \neg C might
+ * take quite some time but together with \neg D we arrive at conflict
+ * quickly. This can happen especially if F contains constraints with
+ * huge coefficients. However, never doing the propagation as a pre
+ * step would mean that a pure RUP proof is never reusing a trail and
+ * is instead propagating all units in every step.
+ *
+ * A check on a trail that is not up to date potentially repeats
+ * (part of) the propagation at level 0 and undoes it afterwards.
+ * Hence, the propagation at level 0 is performed once the time spent
+ * in checks since the trail became outdated exceeds the expected time
+ * of propagating at level 0. Propagating at level 0 is incremental,
+ * i.e., after attaching constraints only their consequences are
+ * propagated, while after a reset of the trail everything needs to
+ * be propagated again. The expected time is therefore a moving
+ * average of previous propagations of the same kind.
+ */
+class PropagationScheduler {
+private:
+    using Duration = std::chrono::duration<double>;
+
+    struct Estimate {
+        Duration expected = std::chrono::seconds(0);
+        long long count = 0;
+
+        void update(Duration time) {
+            if (count == 0) {
+                expected = time;
+            } else {
+                expected = (expected + time) / 2;
+            }
+            count += 1;
+        }
+    };
+
+    bool upToDate = false;
+    bool wasReset = true;
+    Estimate incremental;
+    Estimate full;
+    Duration outdatedTime = std::chrono::seconds(0);
+
+    Estimate& pending() {
+        return wasReset ? full : incremental;
+    }
+
+public:
+    Duration timeBase = std::chrono::seconds(0);
+    Duration timeTemporary = std::chrono::seconds(0);
+    long long scheduledPropagations = 0;
+    long long checksUpToDate = 0;
+    long long checksOutdated = 0;
+
+    /*
+     * Called when constraints were attached (trailReset = false) or
+     * the trail was reset (trailReset = true).
+     */
+    void outdate(bool trailReset) {
+        upToDate = false;
+        wasReset |= trailReset;
+    }
+
+    /*
+     * Return true if the trail should be propagated at level 0
+     * before the next check. Without any estimate the trail is
+     * propagated after the first check on the outdated trail.
+     */
+    bool shouldPropagate() {
+        if (upToDate) {
+            checksUpToDate += 1;
+            return false;
+        } else if (outdatedTime > pending().expected) {
+            scheduledPropagations += 1;
+            return true;
+        } else {
+            checksOutdated += 1;
+            return false;
+        }
+    }
+
+    void baseDone(Duration time) {
+        timeBase += time;
+        if (!upToDate) {
+            pending().update(time);
+            outdatedTime = Duration(0);
+            upToDate = true;
+            wasReset = false;
+        }
+    }
+
+    void temporaryDone(Duration time) {
+        timeTemporary += time;
+        if (!upToDate) {
+            outdatedTime += time;
+        }
+    }
+
+    long long incrementalPropagations() {
+        return incremental.count;
+    }
+
+    long long fullPropagations() {
+        return full.count;
+    }
+};
+
+/*
+ * Set of attached constraints, where constraints with the same terms
+ * and degree are identified. The set uses open addressing with linear
+ * probing in a flat array of slots. Each slot stores the (mixed) hash
+ * of its constraint next to the pointer, so that constraints only
+ * need to be compared if their hashes agree. Elements are removed by
+ * shifting the following elements of the probe sequence backwards,
+ * so that no tombstones are needed.
+ */
+template<typename T>
+class InequalityLookup {
+private:
+    typedef Inequality<T> Ineq;
+
+    struct Slot {
+        std::size_t hash;
+        Ineq* ineq = nullptr;
+    };
+
+    static constexpr size_t minCapacity = 16;
+
+    std::vector<Slot> slots;
+    size_t mask;
+    size_t numElements = 0;
+
+    size_t home(std::size_t hash) const {
+        return hash & mask;
+    }
+
+    bool equals(Ineq* a, Ineq* b) {
+        Timer timer(timeCompare);
+        comparisons += 1;
+        bool result = (*a == *b);
+        if (!result) {
+            hashColision += 1;
+        }
+        return result;
+    }
+
+    /*
+     * Return the index of the slot containing a constraint equal to
+     * ineq or of the empty slot where it would be inserted.
+     */
+    size_t probe(Ineq* ineq, std::size_t hash) {
+        size_t i = home(hash);
+        while (true) {
+            probes += 1;
+            Slot& slot = slots[i];
+            if (slot.ineq == nullptr
+                    || (slot.hash == hash && (slot.ineq == ineq || equals(slot.ineq, ineq)))) {
+                return i;
+            }
+            i = (i + 1) & mask;
+        }
+    }
+
+    void grow() {
+        std::vector<Slot> old(2 * slots.size());
+        std::swap(old, slots);
+        mask = slots.size() - 1;
+
+        for (Slot& slot: old) {
+            if (slot.ineq != nullptr) {
+                size_t i = home(slot.hash);
+                while (slots[i].ineq != nullptr) {
+                    i = (i + 1) & mask;
+                }
+                slots[i] = slot;
+            }
+        }
+    }
+
+public:
+    long long probes = 0;
+    long long comparisons = 0;
+    std::chrono::duration<double> timeCompare = std::chrono::seconds(0);
+
+    InequalityLookup()
+        : slots(minCapacity)
+        , mask(minCapacity - 1)
+    {}
+
+    /*
+     * Return the constraint in the set that is equal to ineq, if
+     * there is none, ineq is inserted and returned. The hash is the
+     * value of Inequality::hash().
+     */
+    Ineq* insert(Ineq* ineq, std::size_t hash) {
+        if (4 * (numElements + 1) > 3 * slots.size()) {
+            grow();
+        }
+
+        hash = mixHash(hash);
+        Slot& slot = slots[probe(ineq, hash)];
+        if (slot.ineq == nullptr) {
+            slot.hash = hash;
+            slot.ineq = ineq;
+            numElements += 1;
+        }
+        return slot.ineq;
+    }
+
+    Ineq* find(Ineq* ineq, std::size_t hash) {
+        return slots[probe(ineq, mixHash(hash))].ineq;
+    }
+
+    /*
+     * Remove ineq itself, equal constraints are not removed.
+     */
+    void erase(Ineq* ineq, std::size_t hash) {
+        size_t i = home(mixHash(hash));
+        while (slots[i].ineq != ineq) {
+            if (slots[i].ineq == nullptr) {
+                return;
+            }
+            i = (i + 1) & mask;
+        }
+
+        numElements -= 1;
+        size_t j = i;
+        while (true) {
+            j = (j + 1) & mask;
+            if (slots[j].ineq == nullptr) {
+                break;
+            }
+
+            // the element in slot j can only move to the empty slot
+            // i if its home slot is not cyclically in (i, j]
+            size_t k = home(slots[j].hash);
+            bool inRange = (i <= j) ? (i < k && k <= j) : (i < k || k <= j);
+            if (!inRange) {
+                slots[i] = slots[j];
+                i = j;
+            }
+        }
+        slots[i].ineq = nullptr;
+    }
+
+    size_t size() const {
+        return numElements;
+    }
+
+    size_t get_mem_usage() const {
+        return slots.capacity() * sizeof(Slot);
+    }
+};
+
 template<typename T>
 class PropEngine {
 private:
 
 
     typedef Inequality<T> Ineq;
-    std::unordered_set<Ineq*, PointedHash<Ineq>, PointedEq<Ineq>> constraintLookup;
+    InequalityLookup<T> constraintLookup;
 
     size_t nVars;
     bool updateWatch = true;
@@ -2409,22 +3943,39 @@ private:
     // rapid reallocation
     FixedSizeInequalityHandler<T> negated;
     bool hasDetached = false;
+    PropagationScheduler scheduler;
+
+    // scratch space of findImplier, goalPos[var] is one plus the
+    // position of the term of var in goalTerms or zero
+    std::vector<Term<T>> goalTerms;
+    VarIndexedVec<uint32_t> goalPos;
+    std::vector<Inequality<T>*> candidates;
+
+    // scratch space of computeSubgoals
+    FatInequality<T> substitutedFat;
+    FixedSizeInequalityHandler<T> substituted;
+    ImplicationChecker<T> negatedChecker;
 
 public:
     PropagatorGroup<T> core;
     PropagatorGroup<T> derived;
+    HintPropagator<T> hintPropagator;
 
     std::chrono::duration<double> timeEffected = std::chrono::seconds(1);
     std::chrono::duration<double> timeFind = std::chrono::seconds(1);
+    std::chrono::duration<double> timeHash = std::chrono::seconds(1);
     std::chrono::duration<double> timeInitProp = std::chrono::seconds(1);
     std::chrono::duration<double> timePropagate = std::chrono::seconds(1);
     std::chrono::duration<double> timeRUP = std::chrono::seconds(1);
+    std::chrono::duration<double> timeImplier = std::chrono::seconds(1);
 
 
     long long visit = 0;
     long long visit_sat = 0;
     long long visit_required = 0;
     long long lookup_requests = 0;
+    long long implier_requests = 0;
+    long long implier_candidates = 0;
 
 
     PropEngine(size_t _nVars)
@@ -2433,17 +3984,21 @@ public:
         , tmpPropagator(propMaster, _nVars)
         , core(propMaster, _nVars)
         , derived(propMaster, _nVars)
+        , hintPropagator(core)
         , timeEffected(0)
         , timeFind(0)
+        , timeHash(0)
         , timeInitProp(0)
         , timeRUP(0)
+        , timeImplier(0)
     {
         derived.activatePropagators();
         core.activatePropagators();
     }
 
     size_t get_mem_usage() {
-        return core.get_mem_usage() + derived.get_mem_usage() + propMaster.get_mem_usage();
+        return core.get_mem_usage() + derived.get_mem_usage() + propMaster.get_mem_usage()
+            + constraintLookup.get_mem_usage();
     }
 
     void printStats() {
@@ -2475,6 +4030,18 @@ public:
             << std::fixed << std::setprecision(2)
             << timeFind.count() << std::endl ;
 
+        std::cout << "c statistic: time find hash: "
+            << std::fixed << std::setprecision(2)
+            << timeHash.count() << std::endl ;
+
+        std::cout << "c statistic: time find compare: "
+            << std::fixed << std::setprecision(2)
+            << constraintLookup.timeCompare.count() << std::endl ;
+
+        std::cout << "c statistic: time find probe: "
+            << std::fixed << std::setprecision(2)
+            << timeProbe().count() << std::endl ;
+
         std::cout << "c statistic: time initpropagation: "
             << std::fixed << std::setprecision(2)
             << timeInitProp.count() << std::endl ;
@@ -2491,9 +4058,86 @@ public:
             << std::fixed << std::setprecision(2)
             << timeRUP.count() << std::endl ;
 
+        std::cout << "c statistic: time find implier: "
+            << std::fixed << std::setprecision(2)
+            << timeImplier.count() << std::endl ;
+
+
+        SlabAllocator& allocator = SlabAllocator::get();
+        std::cout << "c statistic: constraint memory in slabs: "
+            << std::fixed << std::setprecision(3)
+            << static_cast<float>(allocator.slabBytes()) / 1024 / 1024 / 1024 << " GB" << std::endl;
+
+        std::cout << "c statistic: constraint memory outside slabs: "
+            << std::fixed << std::setprecision(3)
+            << static_cast<float>(allocator.getLargeBytes()) / 1024 / 1024 / 1024 << " GB" << std::endl;
+
+        std::cout << "c statistic: slab occupancy: "
+            << std::fixed << std::setprecision(2)
+            << 100 * allocator.occupancy() << " %" << std::endl;
+
+        std::cout << "c statistic: slab fragmentation: "
+            << std::fixed << std::setprecision(2)
+            << 100 * allocator.fragmentation() << " %" << std::endl;
 
         std::cout << "c statistic: hashColisions: " << hashColision << std::endl;
         std::cout << "c statistic: lookup_requests: " << lookup_requests << std::endl;
+        std::cout << "c statistic: lookup_probes: " << constraintLookup.probes << std::endl;
+        std::cout << "c statistic: lookup_comparisons: " << constraintLookup.comparisons << std::endl;
+        std::cout << "c statistic: implier_requests: " << implier_requests << std::endl;
+        std::cout << "c statistic: implier_candidates: " << implier_candidates << std::endl;
+
+        std::cout << "c statistic: time propagate at level 0: "
+            << std::fixed << std::setprecision(2)
+            << scheduler.timeBase.count() << std::endl ;
+
+        std::cout << "c statistic: time propagate negated: "
+            << std::fixed << std::setprecision(2)
+            << scheduler.timeTemporary.count() << std::endl ;
+
+        std::cout << "c statistic: incremental propagations at level 0: " << scheduler.incrementalPropagations() << std::endl;
+        std::cout << "c statistic: full propagations at level 0: " << scheduler.fullPropagations() << std::endl;
+        std::cout << "c statistic: scheduled propagations at level 0: " << scheduler.scheduledPropagations << std::endl;
+        std::cout << "c statistic: rup checks on propagated trail: " << scheduler.checksUpToDate << std::endl;
+        std::cout << "c statistic: rup checks on outdated trail: " << scheduler.checksOutdated << std::endl;
+    }
+
+    /*
+     * Time spent in the lookup table of find, attach and detach
+     * that is neither hashing nor comparing constraints.
+     */
+    std::chrono::duration<double> timeProbe() {
+        return timeFind - timeHash - constraintLookup.timeCompare;
+    }
+
+    std::map<std::string, double> lookupStats() {
+        return {
+            {"lookup_requests", lookup_requests},
+            {"lookup_probes", constraintLookup.probes},
+            {"lookup_comparisons", constraintLookup.comparisons},
+            {"hash_colisions", hashColision},
+            {"time_find", timeFind.count()},
+            {"time_hash", timeHash.count()},
+            {"time_compare", constraintLookup.timeCompare.count()},
+            {"time_probe", timeProbe().count()}
+        };
+    }
+
+    std::map<std::string, double> schedulerStats() {
+        return {
+            {"time_base", scheduler.timeBase.count()},
+            {"time_temporary", scheduler.timeTemporary.count()},
+            {"incremental_propagations", scheduler.incrementalPropagations()},
+            {"full_propagations", scheduler.fullPropagations()},
+            {"scheduled_propagations", scheduler.scheduledPropagations},
+            {"checks_up_to_date", scheduler.checksUpToDate},
+            {"checks_outdated", scheduler.checksOutdated}
+        };
+    }
+
+    std::size_t lookupHash(Inequality<T>* ineq) {
+        Timer timer(timeHash);
+        return ineq->hash();
     }
 
     void increaseNumVarsTo(size_t _nVars){
@@ -2511,6 +4155,18 @@ public:
         propMaster.propagate();
     }
 
+    /*
+     * Propagate the trail at level 0, i.e., outside of an AutoReset.
+     */
+    void propagateBase() {
+        std::chrono::duration<double> time(0);
+        {
+            Timer timer(time);
+            propagate();
+        }
+        scheduler.baseDone(time);
+    }
+
     std::vector<int> propagate4sat(std::vector<int>& lits) {
         AutoReset reset(this->propMaster);
 
@@ -2557,10 +4213,47 @@ public:
         return  missing;
     }
 
+    /*
+     * Return the literals that are assigned after propagating lits
+     * or an empty vector if this results in a conflict. If
+     * checkSat(lits) succeeds, this is a full assignment.
+     */
+    std::vector<int> propagatedAssignment(std::vector<int>& lits) {
+        initPropagation();
+        propagateBase();
+
+        AutoReset reset(this->propMaster);
+        std::vector<int> assignment;
+        for (int lit: lits) {
+            Lit l(lit);
+            auto val = propMaster.getAssignment().value[l];
+            if (val == State::Unassigned) {
+                propMaster.enqueue(l, nullptr);
+            } else if (val == State::False) {
+                return assignment;
+            }
+        }
+
+        propagate();
+        if (propMaster.isConflicting()) {
+            return assignment;
+        }
+
+        for (uint var = 1; var <= nVars; var++) {
+            State val = propMaster.getAssignment().value[Lit(var)];
+            if (val == State::True) {
+                assignment.push_back(var);
+            } else if (val == State::False) {
+                assignment.push_back(-static_cast<int>(var));
+            }
+        }
+        return assignment;
+    }
+
     std::vector<int> checkSat(std::vector<int>& lits) {
         // AutoReset reset(this->propMaster);
         initPropagation();
-        propagate();
+        propagateBase();
         return propagate4sat(lits);
     }
 
@@ -2569,7 +4262,7 @@ public:
         toAttach->contract();
         {
             Timer timer(timeFind);
-            ineq = *constraintLookup.insert(toAttach).first;
+            ineq = constraintLookup.insert(toAttach, lookupHash(toAttach));
             lookup_requests += 1;
         }
 
@@ -2580,6 +4273,9 @@ public:
         if (!ineq->isAttached) {
             ineq->isAttached = true;
             ineq->freeze(this->nVars);
+            // the constraint might have been attached and detached
+            // before
+            ineq->unmarkForDeletion();
             dbMem += ineq->mem();
             cumDbMem += ineq->mem();
             maxDbMem = std::max(dbMem, maxDbMem);
@@ -2629,6 +4325,7 @@ public:
             PropState emptyTrail;
             propMaster.reset(emptyTrail);
             core.doPropagationsAt0();
+            scheduler.outdate(true);
         } else if (hasDetached && !propMaster.isTrailClean()) {
             propMaster.cleanupTrail();
 
@@ -2636,14 +4333,19 @@ public:
             if (!coreOnly) {
                 derived.doPropagationsAt0();
             }
+            scheduler.outdate(true);
         } else if (!coreOnly && !derived.isActive()) {
             derived.activatePropagators();
+            propMaster.requeueTrail();
             derived.doPropagationsAt0();
+            scheduler.outdate(false);
         }
 
-        core.attachUnattached();
-        if (!coreOnly) {
-            derived.attachUnattached();
+        if (core.attachUnattached()) {
+            scheduler.outdate(false);
+        }
+        if (!coreOnly && derived.attachUnattached()) {
+            scheduler.outdate(false);
         }
 
         if (hasDetached) {
@@ -2688,8 +4390,11 @@ public:
                 erased = true;
 
                 ineq->isAttached = false;
-                constraintLookup.erase(ineq);
-                lookup_requests += 1;
+                {
+                    Timer timer(timeFind);
+                    constraintLookup.erase(ineq, lookupHash(ineq));
+                    lookup_requests += 1;
+                }
 
                 dbMem -= ineq->mem();
 
@@ -2712,7 +4417,7 @@ public:
     std::vector<int> propagatedLits() {
         // AutoReset reset(this->propMaster);
         initPropagation();
-        propagate();
+        propagateBase();
 
         std::vector<int> assignment;
         for (uint var = 1; var <= nVars; var++) {
@@ -2729,81 +4434,167 @@ public:
         return assignment;
     }
 
-    void addIfNeccessary(std::vector<InequalityPtr<T>>& result, Inequality<T>* ineq, Substitution& sub) {
-        InequalityPtr<T> rhs = ineq->copy();
-        // we want to keep the id, as they will be used for subgoals
-        rhs->copyId(*ineq);
-        rhs->substitute(sub);
-        if (!ineq->implies(*rhs) && !find(rhs.get())
-            ) {
-            result.emplace_back(std::move(rhs));
+    /*
+     * Substitute ineq into the scratch constraint substituted and add
+     * a copy of it to result, unless it is implied by ineq, by the
+     * constraint loaded into negatedChecker (if any) or is already
+     * in the database. Return true if it is implied by the loaded
+     * constraint.
+     */
+    bool addIfNeccessary(std::vector<InequalityPtr<T>>& result, Inequality<T>* ineq, Substitution& sub, bool checkNegated) {
+        ineq->loadSubstituted(substitutedFat, sub);
+        size_t size = substitutedFat.size();
+        substituted.replace_new(size, size);
+        substitutedFat.unload(*substituted.ineq);
+        FixedSizeInequality<T>& rhs = *substituted.ineq;
+
+        ImplicationChecker<T>& checker = ImplicationChecker<T>::get();
+        ineq->loadInto(checker);
+        bool isWeakened = checker.implies(rhs);
+        checker.unload();
+        if (isWeakened) {
+            return false;
+        }
+
+        if (checkNegated && negatedChecker.implies(rhs)) {
+            return true;
+        }
+
+        InequalityPtr<T> goal = std::make_unique<Inequality<T>>(FixedSizeInequalityHandler<T>(rhs));
+        if (find(goal.get()) == nullptr) {
+            // we want to keep the id, as they will be used for subgoals
+            goal->copyId(*ineq);
+            result.emplace_back(std::move(goal));
         }
+        return false;
     }
 
-    std::vector<InequalityPtr<T>> computeEffected(
+    /*
+     * Return the constraints affected by sub with sub applied, that
+     * are not implied by the original constraint, by negated (if it
+     * is not nullptr) and are not in the database. The second value
+     * is the number of constraints dropped because they are implied
+     * by negated. Constraints are only copied if they are returned.
+     */
+    std::pair<std::vector<InequalityPtr<T>>, size_t> computeSubgoals(
             Substitution& sub,
+            Inequality<T>* negated,
             bool onlyCore = false)
     {
         Timer timer(timeEffected);
 
+        std::pair<std::vector<InequalityPtr<T>>, size_t> result;
+        std::vector<InequalityPtr<T>>& goals = result.first;
+        result.second = 0;
 
-        std::vector<InequalityPtr<T>> result;
-        for (Inequality<T>* ineq: core.computeEffected(sub)) {
-            addIfNeccessary(result, ineq, sub);
+        if (negated != nullptr) {
+            negated->loadInto(negatedChecker);
         }
 
+        for (Inequality<T>* ineq: core.computeEffected(sub)) {
+            result.second += addIfNeccessary(goals, ineq, sub, negated != nullptr);
+        }
 
         if (!onlyCore) {
             for (Inequality<T>* ineq: derived.computeEffected(sub)) {
-                addIfNeccessary(result, ineq, sub);
+                result.second += addIfNeccessary(goals, ineq, sub, negated != nullptr);
             }
         }
 
+        if (negated != nullptr) {
+            negatedChecker.unload();
+        }
         return result;
     }
 
+    std::vector<InequalityPtr<T>> computeEffected(
+            Substitution& sub,
+            bool onlyCore = false)
+    {
+        return computeSubgoals(sub, nullptr, onlyCore).first;
+    }
+
     Inequality<T>* find(Inequality<T>* ineq) {
         Timer timer(timeFind);
-        ineq->contract();
         lookup_requests += 1;
+        return constraintLookup.find(ineq, lookupHash(ineq));
+    }
+
+    /*
+     * Return an attached constraint that implies goal after
+     * substituting the literals propagated at level 0, or nullptr
+     * if there is none. Only constraints sharing a literal with the
+     * goal are considered, all others can only imply the goal if
+     * they are falsified by the propagated literals. Temporarily
+     * attached constraints are not in the proof database and are
+     * not returned.
+     */
+    Inequality<T>* findImplier(Inequality<T>* goal) {
+        initPropagation();
+        propagateBase();
 
-        auto result = constraintLookup.find(ineq);
-        if (result == constraintLookup.end()) {
-            return nullptr;
-        } else {
-            return *result;
+        Timer timer(timeImplier);
+        implier_requests += 1;
+
+        goalTerms.clear();
+        T degree = goal->getTerms(goalTerms);
+
+        size_t maxVar = nVars;
+        for (const Term<T>& term: goalTerms) {
+            maxVar = std::max(maxVar, static_cast<size_t>(term.lit.var()));
+        }
+        if (goalPos.size() <= maxVar) {
+            goalPos.resize(maxVar + 1, 0);
+        }
+        for (size_t i = 0; i < goalTerms.size(); i++) {
+            goalPos[goalTerms[i].lit.var()] = i + 1;
+        }
+
+        Inequality<T>* result = nullptr;
+        for (PropagatorGroup<T>* group: {&core, &derived}) {
+            candidates.clear();
+            group->collectOccurences(goalTerms, candidates);
+            implier_candidates += candidates.size();
+            for (Inequality<T>* ineq: candidates) {
+                if (ineq->minProofId() != 0 && ineq->impliesAssigned(*this, degree)) {
+                    result = ineq;
+                    break;
+                }
+            }
+            if (result != nullptr) {
+                break;
+            }
         }
+
+        for (const Term<T>& term: goalTerms) {
+            goalPos[term.lit.var()] = 0;
+        }
+        return result;
     }
 
 
 
 
+    /*
+     * If usedIds is not nullptr and the check succeeds, the ids of
+     * the constraints that participate in the conflict are appended
+     * to usedIds. The conflict analysis is only performed in this
+     * case.
+     */
     struct rupCheck {
         template<typename TIneq>
-        bool operator()(const TIneq& redundant, PropEngine<T>& engine, bool onlyCore) {
+        bool operator()(const TIneq& redundant, PropEngine<T>& engine, bool onlyCore, std::vector<uint64_t>* usedIds = nullptr) {
             Timer timer(engine.timeRUP);
             engine.initPropagation(onlyCore);
 
-            // Fully propagating is too time consuming in some cases
-            // in connection with redundancy checks. Consider that we
-            // want to check F, \neg C, \neg D |- \bot in a redundancy
-            // check. Propagating F, \neg C might take quite some time
-            // but together with \neg D we arrive at conflict quickly.
-            // This can happen especially if F contains constraints
-            // with huge coefficients. However, never doing the
-            // propagation as a pre step would mean that a pure RUP
-            // proof is never reusing a trail and is instead
-            // propagating all units in every step. By propagating
-            // every 10th time we should achieve reasonable
-            // performance for both cases.
-            static size_t magic = 0;
-            magic += 1;
-            if (magic > 10) {
-                engine.propagate();
-                magic = 0;
+            if (engine.scheduler.shouldPropagate()) {
+                engine.propagateBase();
             }
 
             if (engine.propMaster.isConflicting()) {
+                if (usedIds != nullptr) {
+                    engine.propMaster.analyzeConflict(*usedIds);
+                }
                 return true;
             }
 
@@ -2814,17 +4605,111 @@ public:
                 AutoReset reset(engine.propMaster);
                 InplaceIneqOps::negate()(*negated.ineq);
 
-                engine.propMaster.activatePropagator(engine.tmpPropagator);
-                negated->initWatch(engine.tmpPropagator);
+                std::chrono::duration<double> time(0);
+                {
+                    Timer timer(time);
+                    engine.propMaster.activatePropagator(engine.tmpPropagator);
+                    negated->initWatch(engine.tmpPropagator);
 
-                engine.propagate();
+                    engine.propagate();
 
-                negated->clearWatches(engine.tmpPropagator);
+                    negated->clearWatches(engine.tmpPropagator);
+                }
+                engine.scheduler.temporaryDone(time);
                 engine.propMaster.deactivatePropagator(engine.tmpPropagator);
                 // for (Lit lit : this->trail) {
                 //     std::cout << lit << " ";
                 // }
                 // std::cout << std::endl;
+                bool success = engine.propMaster.isConflicting();
+                if (success && usedIds != nullptr) {
+                    engine.propMaster.analyzeConflict(*usedIds);
+                }
+                return success;
+            }
+        }
+    };
+
+    /*
+     * Check if the constraint implies the goal of findImplier after
+     * substituting the literals assigned at level 0. This is the
+     * same check as in InplaceIneqOps::implies, where true literals
+     * are weakened and false literals are dropped.
+     */
+    struct impliesAssigned {
+        template<typename TIneq>
+        bool operator()(const TIneq& ineq, PropEngine<T>& engine, const T& goalDegree) {
+            const Assignment& assignment = engine.propMaster.getAssignment();
+
+            // all terms add a non-negative amount, hence we can stop
+            // as soon as the cost is positive
+            T weakenCost = goalDegree;
+            weakenCost -= ineq.degree;
+            for (const auto& term: ineq.terms) {
+                if (weakenCost > 0) {
+                    return false;
+                }
+
+                State val = assignment.value[term.lit];
+                if (val == State::False) {
+                    continue;
+                } else if (val == State::True) {
+                    weakenCost += term.coeff;
+                    continue;
+                }
+
+                uint32_t pos = engine.goalPos[term.lit.var()];
+                if (pos == 0 || engine.goalTerms[pos - 1].lit != term.lit) {
+                    weakenCost += term.coeff;
+                } else {
+                    const T& theirs = engine.goalTerms[pos - 1].coeff;
+                    if (term.coeff > theirs && theirs < goalDegree) {
+                        // only weaken if target coeffient is not saturated
+                        weakenCost += term.coeff;
+                        weakenCost -= theirs;
+                    }
+                }
+            }
+            return weakenCost <= 0;
+        }
+    };
+
+    /*
+     * Check reverse unit propagation, where propagation is
+     * restricted to the negated constraint and the hinted
+     * constraints. Every hint is propagated once in the given
+     * order, the negated constraint is watched and propagates after
+     * every hint.
+     */
+    struct hintedRupCheck {
+        template<typename TIneq>
+        bool operator()(const TIneq& redundant, PropEngine<T>& engine, const std::vector<Inequality<T>*>& hints) {
+            Timer timer(engine.timeRUP);
+            engine.initPropagation();
+
+            if (engine.propMaster.isConflicting()) {
+                return true;
+            }
+
+            FixedSizeInequalityHandler<T>& negated = engine.negated;
+            negated.replace_new(redundant.terms.size(), redundant.terms.size(),
+                redundant.terms.begin(), redundant.terms.end(), redundant.degree);
+            {
+                AutoReset reset(engine.propMaster);
+                InplaceIneqOps::negate()(*negated.ineq);
+
+                negated->initWatch(engine.tmpPropagator);
+                engine.tmpPropagator.propagate();
+
+                for (Inequality<T>* hint: hints) {
+                    if (engine.propMaster.isConflicting()) {
+                        break;
+                    }
+                    hint->propagateHint(engine.hintPropagator);
+                    engine.tmpPropagator.propagate();
+                }
+
+                negated->clearWatches(engine.tmpPropagator);
                 return engine.propMaster.isConflicting();
             }
         }
@@ -2892,27 +4777,28 @@ public:
         bussy = false;
     }
 
-    template<typename TConstraint>
-    void load(TConstraint& ineq) {
+    /*
+     * Load ineq with mapLit applied to its literals. If ineq is not
+     * const the coefficients are moved out of ineq.
+     */
+    template<typename TConstraint, typename MapLit>
+    void loadMapped(TConstraint& ineq, MapLit mapLit) {
         assert(!bussy && "critical error: I am used twice!");
         bussy = true;
 
         this->degree = ineq.degree;
         Term<T> myTerm;
         for (auto& term: ineq.terms) {
+            Lit lit = mapLit(term.lit);
             if (term.coeff < 0) {
-                myTerm.lit = ~term.lit;
+                myTerm.lit = ~lit;
                 myTerm.coeff = -term.coeff;
                 this->degree += myTerm.coeff;
             } else {
-                myTerm.lit = term.lit;
+                myTerm.lit = lit;
                 myTerm.coeff = std::move(term.coeff);
             }
             addLhs(myTerm);
-            // T coeff = cpsign(term.coeff, term.lit);
-            // using namespace std;
-
-            // setCoeff(term.lit.var(), coeff);
         }
 
         if (this->coeffs.size() > 0) {
@@ -2925,6 +4811,23 @@ public:
         }
     }
 
+    template<typename TConstraint>
+    void load(TConstraint& ineq) {
+        loadMapped(ineq, [](Lit lit){ return lit; });
+    }
+
+    /*
+     * Load ineq with sub applied to its literals, ineq itself is not
+     * modified.
+     */
+    template<typename TConstraint>
+    void load(const TConstraint& ineq, const Substitution& sub) {
+        loadMapped(ineq, [&sub](Lit lit){
+            auto it = sub.map.find(lit);
+            return (it != sub.map.end()) ? it->second : lit;
+        });
+    }
+
     void unload(FixedSizeInequality<T>& ineq) {
         bussy = false;
 
@@ -3008,6 +4911,13 @@ public:
         }
     };
 
+    struct callLoadSubstituted {
+        template<typename TConstraint>
+        void operator()(TConstraint& constraint, FatInequality<T>& fat, const Substitution& sub){
+            fat.load(constraint, sub);
+        }
+    };
+
     struct callAdd {
         template<typename TConstraint>
         void operator()(TConstraint& constraint, FatInequality<T>& callee){
@@ -3017,10 +4927,11 @@ public:
 };
 
 using IneqLarge = FixedSizeInequality<int32_t>;
-using IneqBig = FixedSizeInequality<BigInt>;
+using IneqInt64 = FixedSizeInequality<int64_t>;
+using IneqBig = FixedSizeInequality<CoefType>;
 
 enum class TypeId {
-    Clause, IneqLarge, IneqBig
+    Clause, Cardinality, IneqLarge, IneqInt64, IneqBig
 };
 
 template<typename T>
@@ -3031,11 +4942,21 @@ struct type_id<Clause> {
     static constexpr TypeId value = TypeId::Clause;
 };
 
+template<>
+struct type_id<Cardinality> {
+    static constexpr TypeId value = TypeId::Cardinality;
+};
+
 template<>
 struct type_id<IneqLarge> {
     static constexpr TypeId value = TypeId::IneqLarge;
 };
 
+template<>
+struct type_id<IneqInt64> {
+    static constexpr TypeId value = TypeId::IneqInt64;
+};
+
 template<>
 struct type_id<IneqBig> {
     static constexpr TypeId value = TypeId::IneqBig;
@@ -3069,10 +4990,21 @@ public:
     virtual bool isReason() = 0;
     virtual CoeffBound getBoundTerms() = 0;
     virtual CoeffBound getBoundDegree() = 0;
+    virtual CoeffBound getBoundSum() = 0;
     virtual bool isPropagatingAt0() = 0;
     virtual void markedForDeletion() = 0;
+    virtual void unmarkForDeletion() = 0;
+    virtual void setId(const uint64_t* minId) = 0;
     virtual size_t mem() = 0;
     virtual ~BaseHandle() = default;
+
+    static void* operator new(size_t size) {
+        return SlabAllocator::get().allocate(size);
+    }
+
+    static void operator delete(void* ptr, size_t size) {
+        SlabAllocator::get().deallocate(ptr, size);
+    }
 };
 
 template<typename TConstraint>
@@ -3119,11 +5051,38 @@ struct Handle : public BaseHandle {
         return getBound(get().degree);
     }
 
+    /*
+     * Bound on the sum of the absolute values of the coefficients and
+     * the degree. Propagation only adds up coefficients and the
+     * degree, so it can not overflow in a type that can represent
+     * this sum.
+     */
+    virtual CoeffBound getBoundSum() {
+        if (std::is_same<TConstraint, Clause>::value) {
+            return getBound(static_cast<int64_t>(get().terms.size()));
+        }
+
+        CoefType sum = get().degree;
+        sum = abs(sum);
+        for (auto& term: get().terms) {
+            sum += term.coeff;
+        }
+        return getBound(sum);
+    }
+
 
     virtual void markedForDeletion() {
         get().header.isMarkedForDeletion = true;
     }
 
+    virtual void unmarkForDeletion() {
+        get().header.isMarkedForDeletion = false;
+    }
+
+    virtual void setId(const uint64_t* minId) {
+        get().header.minId = minId;
+    }
+
     virtual bool isPropagatingAt0() {
         return get().isPropagatingAt0();
     }
@@ -3164,9 +5123,15 @@ struct unpacked {
             case TypeId::Clause:
                 return m(static_cast<Handle<Clause>*>(a)->get(), std::forward<Args>(args)...);
                 break;
+            case TypeId::Cardinality:
+                return m(static_cast<Handle<Cardinality>*>(a)->get(), std::forward<Args>(args)...);
+                break;
             case TypeId::IneqLarge:
                 return m(static_cast<Handle<IneqLarge>*>(a)->get(), std::forward<Args>(args)...);
                 break;
+            case TypeId::IneqInt64:
+                return m(static_cast<Handle<IneqInt64>*>(a)->get(), std::forward<Args>(args)...);
+                break;
             case TypeId::IneqBig:
                 return m(static_cast<Handle<IneqBig>*>(a)->get(), std::forward<Args>(args)...);
                 break;
@@ -3222,6 +5187,115 @@ struct unpacked {
 template<typename T>
 using FatInequalityPtr = std::unique_ptr<FatInequality<T>>;
 
+/*
+ * Set of the ids under which a constraint is attached. Almost all
+ * constraints have a single id, which is stored inline, the ids of
+ * duplicates are stored in a separately allocated vector. Ids are
+ * kept in the order they were inserted.
+ */
+class IdSet {
+private:
+    static constexpr uint64_t none = std::numeric_limits<uint64_t>::max();
+
+    uint64_t first = none;
+    std::unique_ptr<std::vector<uint64_t>> rest;
+
+public:
+    class const_iterator {
+    private:
+        const IdSet* set;
+        size_t pos;
+
+    public:
+        using iterator_category = std::forward_iterator_tag;
+        using value_type = uint64_t;
+        using difference_type = std::ptrdiff_t;
+        using pointer = const uint64_t*;
+        using reference = const uint64_t&;
+
+        const_iterator(const IdSet* _set, size_t _pos)
+            : set(_set)
+            , pos(_pos)
+        {}
+
+        reference operator*() const {
+            return (pos == 0) ? set->first : (*set->rest)[pos - 1];
+        }
+
+        const_iterator& operator++() {
+            pos += 1;
+            return *this;
+        }
+
+        bool operator==(const const_iterator& other) const {
+            return pos == other.pos;
+        }
+
+        bool operator!=(const const_iterator& other) const {
+            return pos != other.pos;
+        }
+    };
+
+    size_t size() const {
+        if (first == none) {
+            return 0;
+        } else if (rest) {
+            return 1 + rest->size();
+        } else {
+            return 1;
+        }
+    }
+
+    const_iterator begin() const {
+        return const_iterator(this, 0);
+    }
+
+    const_iterator end() const {
+        return const_iterator(this, size());
+    }
+
+    void insert(uint64_t id) {
+        assert(id != none);
+        if (first == none) {
+            first = id;
+        } else if (first != id) {
+            if (!rest) {
+                rest = std::make_unique<std::vector<uint64_t>>();
+            } else if (std::find(rest->begin(), rest->end(), id) != rest->end()) {
+                return;
+            }
+            rest->push_back(id);
+        }
+    }
+
+    void erase(uint64_t id) {
+        if (first == id) {
+            if (rest) {
+                first = rest->front();
+                rest->erase(rest->begin());
+                if (rest->empty()) {
+                    rest = nullptr;
+                }
+            } else {
+                first = none;
+            }
+        } else if (rest) {
+            auto it = std::find(rest->begin(), rest->end(), id);
+            if (it != rest->end()) {
+                rest->erase(it);
+                if (rest->empty()) {
+                    rest = nullptr;
+                }
+            }
+        }
+    }
+
+    void clear() {
+        first = none;
+        rest = nullptr;
+    }
+};
+
 /**
  * stores constraint in (literal) normalized form
  *
@@ -3235,11 +5309,16 @@ class Inequality {
 private:
     bool loaded = false;
     bool frozen = false;
+    // the hash is cached until the constraint is modified, which
+    // can not happen anymore once it is frozen
+    bool hasHash = false;
+    std::size_t hashValue = 0;
     FatInequalityPtr<T> expanded;
 
     HandlePtr handle;
 
-    static std::vector<FatInequalityPtr<T>> pool;
+    // thread local, so that formulas can be parsed in parallel
+    static thread_local std::vector<FatInequalityPtr<T>> pool;
     const bool useClauses = true;
 
     friend std::hash<Inequality<T>>;
@@ -3248,15 +5327,18 @@ public:
     bool wasAttached = false;
     bool isCoreConstraint = false;
     uint64_t minId = std::numeric_limits<uint64_t>::max();
-    std::unordered_set<uint64_t> ids;
+    IdSet ids;
     uint attachCount = 0;
 
     // used exclusively by PropagatorGroup
-    typename std::list<Inequality*>::iterator _groupIter;
+    size_t _groupIndex;
+    uint32_t _occursId;
     typename PropagatorGroup<T>::State _groupState;
 
     Inequality(Inequality& other)
-        : handle(other.handle->copy())
+        : hasHash(other.hasHash)
+        , hashValue(other.hashValue)
+        , handle(other.handle->copy())
     {
         assert(other.loaded == false);
     }
@@ -3325,17 +5407,38 @@ public:
                 CoeffBound termBound = handle->getBoundTerms();
                 CoeffBound degreeBound = handle->getBoundDegree();
                 if (termBound == CoeffBound::one && degreeBound == CoeffBound::one) {
-                    ClauseHandler clauseManager = unpacked::call(
-                        InplaceIneqOps::makeHandler<Clause>(), handle.get());
-                    HandlePtr clauseHandle = make_handle(std::move(clauseManager));
-                    std::swap(clauseHandle, handle);
+                    convertTo<Clause>();
+                } else if (termBound == CoeffBound::one && degreeBound == CoeffBound::int32) {
+                    convertTo<Cardinality>();
+                } else {
+                    // use the smallest type in which propagation can
+                    // not overflow
+                    CoeffBound sumBound = handle->getBoundSum();
+                    if (sumBound <= CoeffBound::int32) {
+                        convertTo<IneqLarge>();
+                    } else if (sumBound == CoeffBound::int64) {
+                        convertTo<IneqInt64>();
+                    } else {
+                        convertTo<FixedSizeInequality<T>>();
+                    }
                 }
             }
 
+            handle->setId(&minId);
             frozen = true;
         }
     }
 
+    template<typename TConstraint>
+    void convertTo() {
+        if (handle->typeId != type_id<TConstraint>::value) {
+            ConstraintHandler<TConstraint> manager = unpacked::call(
+                InplaceIneqOps::makeHandler<TConstraint>(), handle.get());
+            HandlePtr newHandle = make_handle(std::move(manager));
+            std::swap(newHandle, handle);
+        }
+    }
+
     void clearWatches(PropagatorGroup<T>& prop) {
         assert(frozen);
         unpacked::call(typename PropagatorGroup<T>::clearWatch(), handle.get(), prop);
@@ -3346,10 +5449,33 @@ public:
         handle->markedForDeletion();
     }
 
+    void unmarkForDeletion() {
+        assert(frozen);
+        handle->unmarkForDeletion();
+    }
+
     bool isPropagatingAt0() {
         return handle->isPropagatingAt0();
     }
 
+    /*
+     * Return the smallest id of the constraint in the proof, i.e.,
+     * ignoring the id 0 of temporarily attached constraints, or 0 if
+     * the constraint is only attached temporarily.
+     */
+    uint64_t minProofId() const {
+        if (minId != 0) {
+            return minId;
+        }
+        uint64_t result = 0;
+        for (uint64_t id: ids) {
+            if (id != 0 && (result == 0 || id < result)) {
+                result = id;
+            }
+        }
+        return result;
+    }
+
     void initWatch(PropagatorGroup<T>& prop) {
         assert(frozen && "Call freeze() first.");
         unpacked::call(typename PropagatorGroup<T>::initWatch(), handle.get(), prop);
@@ -3363,6 +5489,7 @@ public:
     Inequality& saturate(){
         assert(!frozen);
         contract();
+        hasHash = false;
 
         bool isNormalized = unpacked::call(InplaceIneqOps::saturate(), handle.get());
 
@@ -3379,6 +5506,7 @@ public:
     Inequality& divide(T divisor){
         assert(!frozen);
         contract();
+        hasHash = false;
         unpacked::call(InplaceIneqOps::divide(), handle.get(), divisor);
         return *this;
     }
@@ -3401,6 +5529,7 @@ public:
 
     void expand() {
         assert(!frozen);
+        hasHash = false;
         if (!loaded) {
             loaded = true;
             if (pool.size() > 0) {
@@ -3427,6 +5556,15 @@ public:
         }
     }
 
+    std::size_t hash() {
+        if (!hasHash) {
+            contract();
+            hashValue = unpacked::call(InplaceIneqOps::hash(), handle.get());
+            hasHash = true;
+        }
+        return hashValue;
+    }
+
     bool eq(Inequality& other) {
         return *this == other;
     }
@@ -3469,30 +5607,126 @@ public:
         return unpacked::call2(InplaceIneqOps::implies(), handle.get(), other.handle.get());
     }
 
+    bool impliesByMap(Inequality& other) {
+        this->contract();
+        other.contract();
+
+        return unpacked::call2(InplaceIneqOps::impliesByMap(), handle.get(), other.handle.get());
+    }
+
+    /*
+     * Return for every constraint in others if it is implied by this
+     * constraint, which is loaded only once for all checks.
+     */
+    std::vector<bool> impliesMany(const std::vector<Inequality*>& others) {
+        ImplicationChecker<T>& checker = ImplicationChecker<T>::get();
+        loadInto(checker);
+
+        std::vector<bool> result;
+        result.reserve(others.size());
+        for (Inequality* other: others) {
+            result.push_back(other->isImpliedBy(checker));
+        }
+
+        checker.unload();
+        return result;
+    }
+
+    void loadInto(ImplicationChecker<T>& checker) {
+        this->contract();
+        unpacked::call(typename ImplicationChecker<T>::loadIneq(), handle.get(), checker);
+    }
+
+    bool isImpliedBy(ImplicationChecker<T>& checker) {
+        this->contract();
+        return unpacked::call(typename ImplicationChecker<T>::isImplied(), handle.get(), checker);
+    }
+
+    /*
+     * Load the constraint with sub applied into fat, without
+     * modifying this constraint.
+     */
+    void loadSubstituted(FatInequality<T>& fat, const Substitution& sub) {
+        this->contract();
+        unpacked::call(typename FatInequality<T>::callLoadSubstituted(), handle.get(), fat, sub);
+    }
+
     bool isSAT(Assignment& assignment) {
         this->contract();
         return unpacked::call(::isSAT(), handle.get(), assignment);
     }
 
-    bool rupCheck(PropEngine<T>& propEngine, bool onlyCore = false) {
+    /*
+     * If usedIds is not nullptr and the check succeeds, usedIds is
+     * set to the ids of the constraints that participate in the
+     * conflict, in the order in which they propagate and ending with
+     * the conflicting constraint. Hence, they can be used as hints.
+     * An id occurs multiple times if the constraint propagates again
+     * after other constraints propagated.
+     */
+    bool rupCheck(PropEngine<T>& propEngine, bool onlyCore = false, std::vector<uint64_t>* usedIds = nullptr) {
+        this->contract();
+        bool success = unpacked::call(typename PropEngine<T>::rupCheck(), handle.get(), propEngine, onlyCore, usedIds);
+        if (success && usedIds != nullptr) {
+            // the conflict analysis goes backward over the trail
+            std::reverse(usedIds->begin(), usedIds->end());
+            usedIds->erase(std::unique(usedIds->begin(), usedIds->end()), usedIds->end());
+        }
+        return success;
+    }
+
+    bool impliesAssigned(PropEngine<T>& propEngine, const T& goalDegree) {
+        this->contract();
+        return unpacked::call(typename PropEngine<T>::impliesAssigned(), handle.get(), propEngine, goalDegree);
+    }
+
+    bool rupCheckHinted(PropEngine<T>& propEngine, const std::vector<Inequality<T>*>& hints) {
         this->contract();
-        return unpacked::call(typename PropEngine<T>::rupCheck(), handle.get(), propEngine, onlyCore);
+        return unpacked::call(typename PropEngine<T>::hintedRupCheck(), handle.get(), propEngine, hints);
+    }
+
+    void propagateHint(HintPropagator<T>& prop) {
+        assert(frozen);
+        unpacked::call(prop, handle.get());
     }
 
     Inequality& substitute(Substitution& sub) {
         assert(!this->frozen);
         this->contract();
+        hasHash = false;
         unpacked::call(InplaceIneqOps::substitute(), handle.get(), sub);
         // need to normalize, we do so by expanding the constraint
         this->expand();
         return *this;
     }
 
+    /*
+     * Replace every variable var by mapping[var], the mapping needs
+     * to be injective.
+     */
+    Inequality& renameVars(const std::vector<Var>& mapping) {
+        assert(!this->frozen);
+        this->contract();
+        hasHash = false;
+        unpacked::call(InplaceIneqOps::renameVars(), handle.get(), mapping);
+        return *this;
+    }
+
+    /*
+     * Append the terms of the normalized constraint to terms and
+     * return its degree.
+     */
+    T getTerms(std::vector<Term<T>>& terms) {
+        contract();
+        return unpacked::call(InplaceIneqOps::getTerms(), handle.get(), terms);
+    }
+
     Inequality& negated() {
         assert(!frozen);
         // todo this is lazy for making sure we don't have a clause.
         expand();
         contract();
+        hasHash = false;
         unpacked::call(InplaceIneqOps::negate(), handle.get());
         return *this;
     }
@@ -3511,6 +5745,11 @@ public:
         return *this;
     }
 
+    bool isClause() {
+        contract();
+        return handle->typeId == TypeId::Clause;
+    }
+
     bool isContradiction(){
         contract();
         return unpacked::call(InplaceIneqOps::isContradiction(), handle.get());
@@ -3541,6 +5780,9 @@ namespace std {
     template <typename T>
     struct hash<Inequality<T>> {
         std::size_t operator()(const Inequality<T>& ineq) const {
+            if (ineq.hasHash) {
+                return ineq.hashValue;
+            }
             return unpacked::call(InplaceIneqOps::hash(), ineq.handle.get());
         }
     };
@@ -3548,4 +5790,4 @@ namespace std {
 
 // we need to initialzie the static template member manually;
 template<typename T>
-std::vector<FatInequalityPtr<T>> Inequality<T>::pool;
+thread_local std::vector<FatInequalityPtr<T>> Inequality<T>::pool;
@@ -1,4 +1,6 @@
+#include <algorithm>
 #include <fstream>
+#include <functional>
 #include <iostream>
 #include <sstream>
 #include <string>
@@ -6,6 +8,24 @@
 #include <unordered_map>
 #include <vector>
 #include <cctype>
+#include <cstring>
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <mutex>
+#include <optional>
+#include <thread>
+
+#include <fcntl.h>
+#include <poll.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <bzlib.h>
+#include <lzma.h>
+#include <zlib.h>
+#include <zstd.h>
 
 #include "constraints.hpp"
 #include "BigInt.hpp"
@@ -71,7 +91,11 @@ public:
     const char* wordSeperator = " \t";
 
     FileInfo fileInfo;
-    std::string line;
+    // line that is currently tokenized, either points into
+    // lineBuffer or into memory owned by the reader (e.g. a
+    // memory mapped file)
+    string_view line;
+    std::string lineBuffer;
     string_view word;
     size_t start = 0;
     size_t endPos = 0;
@@ -103,15 +127,11 @@ public:
 
     static std::istream& getline(std::istream& stream, WordIter& it) {
         it.fileInfo.line += 1;
-        std::istream& result = std::getline(stream, it.line);
+        std::istream& result = std::getline(stream, it.lineBuffer);
         if (!result.eof() && result.fail()) {
             throw ParseError(it, "Failed to read line (IOError).");
         }
-        if (!it.line.empty() && it.line.back() == '\r') {
-            // remove trailing \r to support windows files opened under linux
-            it.line.pop_back();
-        }
-        it.init();
+        it.setLineView(it.lineBuffer);
         return result;
     }
 
@@ -123,6 +143,45 @@ public:
         : fileInfo(_info)
     {}
 
+    WordIter(const WordIter& other)
+        : fileInfo(other.fileInfo) {
+        *this = other;
+    }
+
+    WordIter& operator=(const WordIter& other) {
+        fileInfo = other.fileInfo;
+        lineBuffer = other.lineBuffer;
+        if (other.line.data() == other.lineBuffer.data()) {
+            line = string_view(lineBuffer.data(), other.line.size());
+        } else {
+            line = other.line;
+        }
+        start = other.start;
+        endPos = other.endPos;
+        nextStart = other.nextStart;
+        isEndIt = other.isEndIt;
+        if (start != std::string::npos) {
+            word = line.substr(start, endPos - start);
+        } else {
+            word = "";
+        }
+        return *this;
+    }
+
+    /*
+     * Tokenize the given text without copying it, the caller has
+     * to ensure that the memory stays valid while this line is in
+     * use.
+     */
+    void setLineView(string_view _line) {
+        if (!_line.empty() && _line.back() == '\r') {
+            // remove trailing \r to support windows files opened under linux
+            _line.remove_suffix(1);
+        }
+        line = _line;
+        init();
+    }
+
     void init() {
         endPos = 0;
         nextStart = line.find_first_not_of(wordSeperator, endPos);
@@ -220,11 +279,12 @@ public:
     }
 
     std::string getLineText() const {
-        return this->line;
+        return std::string(this->line);
     }
 
     void setLineText(std::string _line) {
-        line = _line;
+        lineBuffer = std::move(_line);
+        line = lineBuffer;
         init();
     }
 
@@ -240,817 +300,3205 @@ bool nextLine(std::ifstream* stream, WordIter* it) {
     return !!WordIter::getline(*stream, *it);
 }
 
-WordIter WordIter::end;
-
-ParseError::ParseError(const WordIter& it, const std::string& what_arg)
-    : std::runtime_error(what_arg)
-{
-    fileName = it.getFileName();
-    line = it.getLine();
-    column = it.getColumn();
-}
-
-/**
- * throws std::invalid_argument or std::out_of_range exception on
- * invalid input
+/*
+ * Common interface of all sources of proof lines, so that native
+ * code (see BatchExecutor) can continue reading where Python left
+ * off independent of how the proof is stored.
  */
-template<typename T>
-T parseCoeff(const WordIter& it){
-    // std::cout  << it->size() << std::endl;
-    return parseCoeff<T>(it, 0, it->size());
+class LineReader {
+public:
+    virtual ~LineReader() = default;
+
+    /*
+     * Load the next line into the iterator, returns false if
+     * there are no more lines.
+     */
+    virtual bool getline(WordIter& it) = 0;
+    virtual void close() = 0;
+
+    /*
+     * Size of the input in bytes and how much of it was read so
+     * far, e.g., to show the progress. The size is 0 if it is not
+     * known, e.g., for pipes.
+     */
+    virtual size_t getSize() const {
+        return 0;
+    }
+
+    virtual size_t getPosition() const {
+        return 0;
+    }
 };
 
-template<typename T>
-T parseCoeff(const WordIter& it, size_t start, size_t length);
+// size of a regular file, 0 for everything else
+size_t regularFileSize(int fd) {
+    struct stat info;
+    if (fstat(fd, &info) == 0 && S_ISREG(info.st_mode)) {
+        return info.st_size;
+    }
+    return 0;
+}
 
-int parseInt(const WordIter& word, std::string msg, size_t start, size_t length) {
-    assert(word->size() >= start + length);
-    assert(length > 0);
+class StreamFile: public LineReader {
+    std::ifstream stream;
+    size_t size = 0;
+    size_t pos = 0;
 
-    if (word.isEnd()) {
-        throw ParseError(word, "Expected Number.");
+public:
+    StreamFile(const std::string& fileName)
+        : stream(fileName)
+    {
+        struct stat info;
+        if (stat(fileName.c_str(), &info) == 0 && S_ISREG(info.st_mode)) {
+            size = info.st_size;
+        }
     }
 
-    const char* it = word->data() + start;
-    const char* end = word->data() + start + length;
+    bool getline(WordIter& it) override {
+        bool result = !!WordIter::getline(stream, it);
+        if (result) {
+            pos += it.lineBuffer.size() + 1;
+        }
+        return result;
+    }
 
-    bool negated = false;
-    if (*it == '+') {
-        it += 1;
-    } else if (*it == '-') {
-        negated = true;
-        it += 1;
+    size_t getSize() const override {
+        return size;
     }
 
-    if (it == end) {
-        throw ParseError(word, "Expected Number, only got sign.");
-    } else if (end - it > 9) {
-        throw ParseError(word, "Number too large.");
+    size_t getPosition() const override {
+        return std::min(pos, size);
     }
 
-    int res = 0;
-    for (; it != end; ++it) {
-        uint8_t chr = *it - '0';
-        res *= 10;
-        res += chr;
-        if (chr > 9) {
-            throw ParseError(word, "Expected number.");
+    void close() override {
+        stream.close();
+    }
+};
+
+/*
+ * Bounded buffer that passes the content of a file from a producer
+ * thread (e.g. a decompressor) to the thread reading lines from it.
+ */
+class RingBuffer {
+    std::vector<char> data;
+    size_t head = 0;
+    size_t filled = 0;
+    bool closed = false;
+    bool cancelled = false;
+    std::string error;
+
+    std::mutex mutex;
+    std::condition_variable notEmpty;
+    std::condition_variable notFull;
+
+public:
+    static constexpr size_t defaultCapacity = 4 * 1024 * 1024;
+    static constexpr std::chrono::milliseconds signalCheckInterval{100};
+
+    RingBuffer(size_t capacity = defaultCapacity)
+        : data(std::max(capacity, static_cast<size_t>(1)))
+    {}
+
+    /*
+     * Blocks until everything is written, returns false if the
+     * reader is no longer interested in the data.
+     */
+    bool write(const char* buffer, size_t size) {
+        std::unique_lock<std::mutex> lock(mutex);
+        while (size > 0) {
+            notFull.wait(lock, [this]{return filled < data.size() || cancelled;});
+            if (cancelled) {
+                return false;
+            }
+
+            size_t tail = (head + filled) % data.size();
+            size_t length = std::min(size, std::min(data.size() - filled, data.size() - tail));
+            std::memcpy(data.data() + tail, buffer, length);
+            filled += length;
+            buffer += length;
+            size -= length;
+            notEmpty.notify_one();
         }
+        return true;
     }
-    if (negated) {
-        res = -res;
+
+    // end of data, all further reads return 0
+    void close() {
+        std::lock_guard<std::mutex> lock(mutex);
+        closed = true;
+        notEmpty.notify_one();
     }
 
-    return res;
-    // try {
-    //     return std::stoi(it->substr(start, length));
-    // } catch (const std::invalid_argument& e) {
-    //     throw ParseError(it, "Expected coefficient, did not get an integer.");
-    // } catch (const std::out_of_range& e) {
-    //     throw ParseError(it, "Coefficient too large.");
-    // }
-};
+    // the producer failed, the next read throws
+    void fail(const std::string& what) {
+        std::lock_guard<std::mutex> lock(mutex);
+        error = what;
+        closed = true;
+        notEmpty.notify_one();
+    }
 
-int parseInt(const WordIter& it, std::string msg) {
-    return parseInt(it, msg, 0, it->size());
-};
+    // called by the reader, lets all further writes fail
+    void cancel() {
+        std::lock_guard<std::mutex> lock(mutex);
+        cancelled = true;
+        notFull.notify_one();
+    }
 
-template<>
-int parseCoeff<int>(const WordIter& it, size_t start, size_t length) {
-    return parseInt(it, "Expected coefficient", start, length);
-}
+    bool isCancelled() {
+        std::lock_guard<std::mutex> lock(mutex);
+        return cancelled;
+    }
 
-template<>
-BigInt parseCoeff<BigInt>(const WordIter& word, size_t start, size_t length){
-    assert(word->size() >= start + length);
-    assert(length > 0);
+    /*
+     * Blocks until data is available and returns the number of
+     * copied bytes, 0 only at the end of the data.
+     */
+    size_t read(char* buffer, size_t size) {
+        std::unique_lock<std::mutex> lock(mutex);
+        if (filled == 0 && !closed) {
+            lock.unlock();
+            waitForData();
+            lock.lock();
+        }
 
-    if (word.isEnd()) {
-        throw ParseError(word, "Expected Number.");
+        if (filled == 0 && !error.empty()) {
+            throw std::runtime_error(error);
+        }
+
+        size_t length = std::min(size, std::min(filled, data.size() - head));
+        std::memcpy(buffer, data.data() + head, length);
+        head = (head + length) % data.size();
+        filled -= length;
+        notFull.notify_one();
+        return length;
     }
 
-    const char* it = word->data() + start;
-    if (*it == '+') {
-        it += 1;
+private:
+    void waitForData() {
+        #ifdef PY_BINDINGS
+            bool holdsGil = PyGILState_Check();
+        #endif
+        while (true) {
+            {
+                #ifdef PY_BINDINGS
+                    // the producer might need the GIL to make progress
+                    std::optional<py::gil_scoped_release> release;
+                    if (holdsGil) {
+                        release.emplace();
+                    }
+                #endif
+                std::unique_lock<std::mutex> lock(mutex);
+                if (notEmpty.wait_for(lock, signalCheckInterval,
+                        [this]{return filled > 0 || closed;})) {
+                    return;
+                }
+            }
+            #ifdef PY_BINDINGS
+                // the producer might be a solver that is still
+                // running, so waiting must stay interruptible
+                if (holdsGil && PyErr_CheckSignals() != 0) {
+                    throw py::error_already_set();
+                }
+            #endif
+        }
     }
-    // copy to string to get \0 terminated string
-    std::string subString(it, length);
-    try {
-        return BigInt(subString);
-    } catch (...) {
-        throw ParseError(word, "Error while parsing number.");
+};
+
+/*
+ * Reads lines from the content produced into a RingBuffer,
+ * including lines that are split between multiple writes.
+ */
+class BufferedFile: public LineReader {
+protected:
+    std::shared_ptr<RingBuffer> buffer;
+
+private:
+    std::vector<char> chunk;
+    size_t pos = 0;
+    size_t end = 0;
+    bool eof = false;
+
+    // read more data, keeping the unprocessed part of the chunk
+    bool fill(WordIter& it) {
+        if (pos > 0) {
+            std::memmove(chunk.data(), chunk.data() + pos, end - pos);
+            end -= pos;
+            pos = 0;
+        }
+        if (end == chunk.size()) {
+            chunk.resize(2 * chunk.size());
+        }
+
+        size_t read;
+        try {
+            read = buffer->read(chunk.data() + end, chunk.size() - end);
+        } catch (const std::runtime_error& e) {
+            throw ParseError(it, e.what());
+        }
+        end += read;
+        return read > 0;
     }
 
+public:
+    static constexpr size_t chunkSize = 64 * 1024;
 
-}
+    BufferedFile(std::shared_ptr<RingBuffer> _buffer)
+        : buffer(_buffer)
+        , chunk(chunkSize)
+    {}
 
-class VariableNameManager {
-    std::unordered_map<std::string, int> name2num;
-    std::vector<std::string> num2name;
-    size_t _maxVar = 0;
+    bool getline(WordIter& it) override {
+        it.fileInfo.line += 1;
+        size_t searchFrom = pos;
+        while (true) {
+            const char* lineEnd = static_cast<const char*>(
+                std::memchr(chunk.data() + searchFrom, '\n', end - searchFrom));
+            if (lineEnd != nullptr) {
+                size_t length = lineEnd - (chunk.data() + pos);
+                it.lineBuffer.assign(chunk.data() + pos, length);
+                pos += length + 1;
+                break;
+            }
 
-    bool allowArbitraryNames = false;
+            searchFrom = end - pos;
+            if (eof || !fill(it)) {
+                eof = true;
+                if (pos == end) {
+                    it.lineBuffer.clear();
+                    it.setLineView(it.lineBuffer);
+                    return false;
+                }
+                it.lineBuffer.assign(chunk.data() + pos, end - pos);
+                pos = end;
+                break;
+            }
+        }
+
+        it.setLineView(it.lineBuffer);
+        return true;
+    }
+
+    void close() override {
+        buffer->cancel();
+        eof = true;
+        pos = end;
+    }
+};
+
+/*
+ * Unbuffered input from a file descriptor, e.g., stdin or a named
+ * pipe, that takes ownership of the descriptor. Reads block until
+ * data is available or the writer closes its end, but can be
+ * cancelled from another thread.
+ */
+class InputStream {
+    int fd;
+    int cancelPipe[2] = {-1, -1};
+    std::atomic<bool> cancelled{false};
+    std::atomic<size_t> numRead{0};
+    // data that was peeked at but not read yet
+    std::string peeked;
 
 public:
-    VariableNameManager(bool _allowArbitraryNames)
-        : allowArbitraryNames(_allowArbitraryNames)
-    {}
+    InputStream(int _fd)
+        : fd(_fd)
+    {
+        if (pipe(cancelPipe) != 0) {
+            ::close(fd);
+            throw std::runtime_error("Could not create pipe.");
+        }
+    }
 
-    size_t maxVar() {
-        return std::max(_maxVar, num2name.size());
+    InputStream(const InputStream&) = delete;
+    InputStream& operator=(const InputStream&) = delete;
+
+    ~InputStream() {
+        close();
     }
 
-    std::string getName(Var num) {
-        if (!allowArbitraryNames) {
-            return "x" + std::to_string(num);
-        } else {
-            return num2name[num - 1];
+    // must not be called while another thread is reading
+    void close() {
+        for (int* handle: {&fd, &cancelPipe[0], &cancelPipe[1]}) {
+            if (*handle >= 0) {
+                ::close(*handle);
+                *handle = -1;
+            }
         }
     }
 
-    Var getVar(const std::string_view& name) {
-        if (name.size() < 2) {
-            throw std::invalid_argument("Expected variable, but name is too short.");
+    /*
+     * Returns the number of read bytes, which is only less than the
+     * requested size if not more data is available yet, and 0 at
+     * the end of the input or if the stream was cancelled.
+     */
+    size_t read(char* buffer, size_t size) {
+        if (!peeked.empty()) {
+            size_t length = std::min(size, peeked.size());
+            std::memcpy(buffer, peeked.data(), length);
+            peeked.erase(0, length);
+            return length;
         }
 
-        if (!allowArbitraryNames) {
-            if (name[0] != 'x') {
-                throw std::invalid_argument("Expected variable, but did not start with 'x'.");
-            }
-            std::string var(name.substr(1));
-            unsigned long varVal = std::stoul(var);
-            if (varVal > Var::LIMIT) {
-                throw std::invalid_argument("Variable too large, can not be represented.");
-            }
-            _maxVar = std::max(_maxVar, varVal);
-            return Var(varVal);
-        } else {
-            if (!std::isalpha(name[0])) {
-                throw std::invalid_argument("Expected variable, but did not start with letter.");
+        while (!cancelled) {
+            pollfd fds[2] = {{fd, POLLIN, 0}, {cancelPipe[0], POLLIN, 0}};
+            if (poll(fds, 2, -1) < 0) {
+                if (errno == EINTR) {
+                    continue;
+                }
+                throw std::runtime_error("Failed to read file (IOError).");
             }
-            auto result = name2num.insert(std::make_pair(name, num2name.size()));
-            bool newName = result.second;
-            if (newName) {
-                num2name.emplace_back(name);
+            if (fds[1].revents != 0) {
+                break;
             }
-            size_t varVal = result.first->second + 1;
-            if (varVal > Var::LIMIT) {
-                throw std::invalid_argument("Too many variables, can not be represented.");
+
+            ssize_t length = ::read(fd, buffer, size);
+            if (length >= 0) {
+                numRead += length;
+                return length;
+            } else if (errno != EINTR && errno != EAGAIN && errno != EWOULDBLOCK) {
+                throw std::runtime_error("Failed to read file (IOError).");
             }
-            return Var(varVal);
         }
+        return 0;
     }
 
-    Lit getLit(const std::string_view& name) {
-        if (name.size() < 1) {
-            throw std::invalid_argument("Expected literal.");
+    // reads until size bytes or the end of the input are available
+    std::string peek(size_t size) {
+        std::string result;
+        result.swap(peeked);
+        while (result.size() < size) {
+            std::vector<char> buffer(size - result.size());
+            size_t length = read(buffer.data(), buffer.size());
+            if (length == 0) {
+                break;
+            }
+            result.append(buffer.data(), length);
         }
+        peeked = result;
+        return result;
+    }
 
-        bool isNegated = (name[0] == '~');
-        int offset = isNegated?1:0;
-        const std::string_view var = name.substr(offset);
-        return Lit(this->getVar(var), isNegated);
+    // let the current and all further reads return 0
+    void cancel() {
+        cancelled = true;
+        char signal = 0;
+        ssize_t written = write(cancelPipe[1], &signal, 1);
+        (void) written;
     }
-};
 
-Lit parseLit(const WordIter& it, VariableNameManager& mngr, const std::string_view* value = nullptr) {
-    if (it == WordIter::end) {
-        throw ParseError(it, "Expected literal.");
+    bool isCancelled() {
+        return cancelled;
     }
 
-    try {
-        if (value) {
-            return mngr.getLit(*value);
+    // number of bytes read from the file descriptor
+    size_t getPosition() const {
+        return numRead;
+    }
+};
+
+/*
+ * Transparent decompression of gzip, xz, bzip2 and zstd files, selected by
+ * the magic bytes at the start of the file. Decompression runs in a
+ * separate thread, so that it overlaps with checking.
+ */
+namespace compression {
+    enum class Format {
+        None, Gzip, Xz, Bzip2, Zstd
+    };
+
+    const size_t headerSize = 6;
+
+    Format detect(const std::string& headerData) {
+        const unsigned char* header =
+            reinterpret_cast<const unsigned char*>(headerData.data());
+        size_t size = headerData.size();
+
+        const unsigned char gzip[] = {0x1f, 0x8b};
+        const unsigned char xz[] = {0xfd, '7', 'z', 'X', 'Z', 0x00};
+        const unsigned char bzip2[] = {'B', 'Z', 'h'};
+        const unsigned char zstd[] = {0x28, 0xb5, 0x2f, 0xfd};
+
+        auto matches = [&](const unsigned char* magic, size_t length) {
+            return size >= length && std::memcmp(header, magic, length) == 0;
+        };
+
+        if (matches(gzip, sizeof(gzip))) {
+            return Format::Gzip;
+        } else if (matches(xz, sizeof(xz))) {
+            return Format::Xz;
+        } else if (matches(bzip2, sizeof(bzip2))) {
+            return Format::Bzip2;
+        } else if (matches(zstd, sizeof(zstd))) {
+            return Format::Zstd;
         } else {
-            return mngr.getLit(*it);
+            return Format::None;
         }
-    } catch (const std::invalid_argument& e) {
-        throw ParseError(it, e.what());
-    } catch (const std::out_of_range& e) {
-        throw ParseError(it, e.what());
     }
-}
-
 
+    Format detectFile(const std::string& fileName) {
+        std::ifstream f(fileName, std::ios::binary);
+        std::string header(headerSize, '\0');
+        f.read(&header[0], header.size());
+        header.resize(f.gcount());
+        return detect(header);
+    }
 
-class VarDouplicateDetection {
-    std::vector<bool> contained;
-    std::vector<Var> used;
+    std::string name(Format format) {
+        switch (format) {
+            case Format::Gzip: return "gzip";
+            case Format::Xz: return "xz";
+            case Format::Bzip2: return "bzip2";
+            case Format::Zstd: return "zstd";
+            default: return "";
+        }
+    }
 
-public:
-    bool add(Var var) {
-        used.push_back(var);
-        size_t idx = static_cast<size_t>(var);
-        if (idx >= contained.size()) {
-            contained.resize(idx + 1);
+    const size_t inputSize = 1024 * 1024;
+    const size_t outputSize = 1024 * 1024;
+
+    /*
+     * Reads the input in chunks and passes them to the decoder, the
+     * decoder is called with an empty chunk at the end of the input.
+     */
+    template<typename Decoder>
+    void decode(InputStream& in, Decoder&& decoder) {
+        std::vector<char> input(inputSize);
+        while (true) {
+            size_t size = in.read(input.data(), input.size());
+            if (in.isCancelled()) {
+                return;
+            }
+            if (!decoder(input.data(), size) || size == 0) {
+                return;
+            }
         }
-        bool result = contained[idx];
-        contained[idx] = true;
-        return result;
     }
 
-    void clear() {
-        for (Var var: used) {
-            contained[var] = false;
+    void copy(InputStream& in, RingBuffer& out) {
+        decode(in, [&](char* input, size_t size) {
+            return out.write(input, size);
+        });
+    }
+
+    void gunzip(InputStream& in, RingBuffer& out) {
+        z_stream stream{};
+        if (inflateInit2(&stream, 15 + 32) != Z_OK) {
+            throw std::runtime_error("Failed to initialize gzip decompression.");
         }
-        used.clear();
+        std::vector<char> output(outputSize);
+        bool finished = false;
+        try {
+            decode(in, [&](char* input, size_t size) {
+                if (size == 0) {
+                    if (!finished) {
+                        throw std::runtime_error("Unexpected end of gzip compressed file.");
+                    }
+                    return false;
+                }
+                stream.next_in = reinterpret_cast<Bytef*>(input);
+                stream.avail_in = size;
+                while (true) {
+                    if (finished && stream.avail_in > 0) {
+                        // concatenated gzip members
+                        inflateReset(&stream);
+                        finished = false;
+                    }
+                    stream.next_out = reinterpret_cast<Bytef*>(output.data());
+                    stream.avail_out = output.size();
+                    int result = inflate(&stream, Z_NO_FLUSH);
+                    if (result == Z_STREAM_END) {
+                        finished = true;
+                    } else if (result != Z_OK && result != Z_BUF_ERROR) {
+                        throw std::runtime_error("Corrupted gzip compressed file.");
+                    }
+                    if (!out.write(output.data(), output.size() - stream.avail_out)) {
+                        return false;
+                    }
+                    if (stream.avail_in == 0 && (finished || stream.avail_out != 0)) {
+                        return true;
+                    }
+                }
+            });
+        } catch (...) {
+            inflateEnd(&stream);
+            throw;
+        }
+        inflateEnd(&stream);
     }
-};
 
+    void unxz(InputStream& in, RingBuffer& out) {
+        lzma_stream stream = LZMA_STREAM_INIT;
+        if (lzma_stream_decoder(&stream, UINT64_MAX, LZMA_CONCATENATED) != LZMA_OK) {
+            throw std::runtime_error("Failed to initialize xz decompression.");
+        }
+        std::vector<char> output(outputSize);
+        try {
+            decode(in, [&](char* input, size_t size) {
+                lzma_action action = (size == 0) ? LZMA_FINISH : LZMA_RUN;
+                stream.next_in = reinterpret_cast<uint8_t*>(input);
+                stream.avail_in = size;
+                while (true) {
+                    stream.next_out = reinterpret_cast<uint8_t*>(output.data());
+                    stream.avail_out = output.size();
+                    lzma_ret result = lzma_code(&stream, action);
+                    if (result != LZMA_OK && result != LZMA_STREAM_END) {
+                        throw std::runtime_error("Corrupted xz compressed file.");
+                    }
+                    if (!out.write(output.data(), output.size() - stream.avail_out)) {
+                        return false;
+                    }
+                    if (result == LZMA_STREAM_END) {
+                        return false;
+                    }
+                    if (stream.avail_in == 0 && stream.avail_out != 0) {
+                        if (action == LZMA_FINISH) {
+                            throw std::runtime_error("Unexpected end of xz compressed file.");
+                        }
+                        return true;
+                    }
+                }
+            });
+        } catch (...) {
+            lzma_end(&stream);
+            throw;
+        }
+        lzma_end(&stream);
+    }
 
-template<typename T>
-class Formula {
-private:
-    std::vector<std::unique_ptr<Inequality<T>>> constraints;
-    bool needToSetCore = true;
+    void bunzip2(InputStream& in, RingBuffer& out) {
+        bz_stream stream{};
+        if (BZ2_bzDecompressInit(&stream, 0, 0) != BZ_OK) {
+            throw std::runtime_error("Failed to initialize bzip2 decompression.");
+        }
+        std::vector<char> output(outputSize);
+        bool finished = false;
+        try {
+            decode(in, [&](char* input, size_t size) {
+                if (size == 0) {
+                    if (!finished) {
+                        throw std::runtime_error("Unexpected end of bzip2 compressed file.");
+                    }
+                    return false;
+                }
+                stream.next_in = input;
+                stream.avail_in = size;
+                while (true) {
+                    if (finished && stream.avail_in > 0) {
+                        // concatenated streams, e.g. from pbzip2
+                        char* rest = stream.next_in;
+                        unsigned int restSize = stream.avail_in;
+                        BZ2_bzDecompressEnd(&stream);
+                        stream = bz_stream{};
+                        if (BZ2_bzDecompressInit(&stream, 0, 0) != BZ_OK) {
+                            throw std::runtime_error("Failed to initialize bzip2 decompression.");
+                        }
+                        stream.next_in = rest;
+                        stream.avail_in = restSize;
+                        finished = false;
+                    }
+                    stream.next_out = output.data();
+                    stream.avail_out = output.size();
+                    int result = BZ2_bzDecompress(&stream);
+                    if (result == BZ_STREAM_END) {
+                        finished = true;
+                    } else if (result != BZ_OK) {
+                        throw std::runtime_error("Corrupted bzip2 compressed file.");
+                    }
+                    if (!out.write(output.data(), output.size() - stream.avail_out)) {
+                        return false;
+                    }
+                    if (stream.avail_in == 0 && (finished || stream.avail_out != 0)) {
+                        return true;
+                    }
+                }
+            });
+        } catch (...) {
+            BZ2_bzDecompressEnd(&stream);
+            throw;
+        }
+        BZ2_bzDecompressEnd(&stream);
+    }
 
-public:
-    bool hasObjective = false;
-    std::vector<size_t> objectiveVars;
-    std::vector<T> objectiveCoeffs;
+    void unzstd(InputStream& in, RingBuffer& out) {
+        ZSTD_DStream* stream = ZSTD_createDStream();
+        if (stream == nullptr || ZSTD_isError(ZSTD_initDStream(stream))) {
+            ZSTD_freeDStream(stream);
+            throw std::runtime_error("Failed to initialize zstd decompression.");
+        }
+        std::vector<char> output(outputSize);
+        // a new frame is started automatically after the end of a
+        // frame, i.e., concatenated frames are decompressed as well
+        bool finished = false;
+        try {
+            decode(in, [&](char* input, size_t size) {
+                if (size == 0) {
+                    if (!finished) {
+                        throw std::runtime_error("Unexpected end of zstd compressed file.");
+                    }
+                    return false;
+                }
+                ZSTD_inBuffer inBuffer = {input, size, 0};
+                while (true) {
+                    ZSTD_outBuffer outBuffer = {output.data(), output.size(), 0};
+                    size_t result = ZSTD_decompressStream(stream, &outBuffer, &inBuffer);
+                    if (ZSTD_isError(result)) {
+                        throw std::runtime_error("Corrupted zstd compressed file.");
+                    }
+                    // 0 if the frame is completely decoded and flushed
+                    finished = (result == 0);
+                    if (!out.write(output.data(), outBuffer.pos)) {
+                        return false;
+                    }
+                    if (inBuffer.pos == inBuffer.size && outBuffer.pos != outBuffer.size) {
+                        return true;
+                    }
+                }
+            });
+        } catch (...) {
+            ZSTD_freeDStream(stream);
+            throw;
+        }
+        ZSTD_freeDStream(stream);
+    }
+}
 
-    size_t maxVar;
-    size_t claimedNumC;
-    size_t claimedNumVar;
+/*
+ * Reads lines from a file descriptor, e.g., stdin or a named pipe,
+ * while the writer is still producing it. A separate thread moves
+ * the (decompressed) input into a bounded buffer, reading lines
+ * blocks until the line is complete or the writer closes its end.
+ */
+class StreamedFile: public BufferedFile {
+    std::shared_ptr<InputStream> input;
+    std::thread producer;
+    size_t size;
 
-    std::vector<Inequality<T>*> getConstraints() {
-        std::vector<Inequality<T>*> result;
-        result.reserve(constraints.size());
-        for (auto& ptr: constraints) {
-            if (needToSetCore) {
-                ptr->isCoreConstraint = true;
+public:
+    StreamedFile(int fd, size_t capacity = RingBuffer::defaultCapacity)
+        : BufferedFile(std::make_shared<RingBuffer>(capacity))
+        , input(std::make_shared<InputStream>(fd))
+        , size(regularFileSize(fd))
+    {
+        producer = std::thread([input = this->input, buffer = this->buffer]() {
+            try {
+                compression::Format format =
+                    compression::detect(input->peek(compression::headerSize));
+                switch (format) {
+                    case compression::Format::Gzip:
+                        compression::gunzip(*input, *buffer);
+                        break;
+                    case compression::Format::Xz:
+                        compression::unxz(*input, *buffer);
+                        break;
+                    case compression::Format::Bzip2:
+                        compression::bunzip2(*input, *buffer);
+                        break;
+                    case compression::Format::Zstd:
+                        compression::unzstd(*input, *buffer);
+                        break;
+                    default:
+                        compression::copy(*input, *buffer);
+                        break;
+                }
+                buffer->close();
+            } catch (const std::exception& e) {
+                buffer->fail(std::string("Failed to read file: ") + e.what());
             }
-            result.push_back(ptr.get());
+        });
+    }
+
+    StreamedFile(const StreamedFile&) = delete;
+    StreamedFile& operator=(const StreamedFile&) = delete;
+
+    ~StreamedFile() {
+        close();
+    }
+
+    void close() override {
+        BufferedFile::close();
+        input->cancel();
+        if (producer.joinable()) {
+            #ifdef PY_BINDINGS
+                std::optional<py::gil_scoped_release> release;
+                if (PyGILState_Check()) {
+                    release.emplace();
+                }
+            #endif
+            producer.join();
         }
-        needToSetCore = false;
-        return result;
+        // let the writer know that we are no longer reading
+        input->close();
     }
 
-    void add(std::unique_ptr<Inequality<T>>&& constraint) {
-        constraints.emplace_back(std::move(constraint));
+    // the position is ahead by what is buffered but not read yet
+    size_t getSize() const override {
+        return size;
     }
-};
 
-template<typename CoeffType, typename DegreeType>
-struct CoeffNormalizer {
-    CoeffType coeff;
-    Lit lit;
+    size_t getPosition() const override {
+        return input->getPosition();
+    }
+};
 
-    DegreeType normalize() {
-        if (coeff < 0) {
-            coeff = -coeff;
-            lit = ~lit;
-            return coeff;
-        } else {
-            return 0;
+/*
+ * Decompression of gzip, xz, bzip2 and zstd files in a separate thread, so
+ * that it overlaps with checking.
+ */
+class DecompressedFile: public StreamedFile {
+    static int openCompressed(const std::string& fileName) {
+        compression::Format format = compression::detectFile(fileName);
+        if (format == compression::Format::None) {
+            throw std::runtime_error("Can not decompress '" + fileName
+                + "', it is not compressed.");
+        }
+        int fd = open(fileName.c_str(), O_RDONLY);
+        if (fd < 0) {
+            throw std::runtime_error("Could not open file '" + fileName + "'.");
         }
+        return fd;
     }
 
-    template<typename T>
-    void emplaceInto(T& vec) {
-        vec.emplace_back(coeff, lit);
-    }
+public:
+    DecompressedFile(const std::string& fileName, size_t capacity = RingBuffer::defaultCapacity)
+        : StreamedFile(openCompressed(fileName), capacity)
+    {}
 };
 
-template<typename T>
-class ParsedTerms {
+/*
+ * Opens a file for reading lines, compressed files are decompressed
+ * on the fly.
+ */
+std::unique_ptr<LineReader> openLineReader(const std::string& fileName) {
+    compression::Format format = compression::detectFile(fileName);
+    if (format == compression::Format::None) {
+        return std::make_unique<StreamFile>(fileName);
+    } else {
+        return std::make_unique<DecompressedFile>(fileName);
+    }
+}
+
+/*
+ * Read only memory mapping of a file that hands out lines as views
+ * into the mapping, i.e., lines are tokenized directly in the page
+ * cache without copying them into a line buffer first.
+ */
+class MappedFile: public LineReader {
+    int fd = -1;
+    const char* data = nullptr;
+    size_t size = 0;
+    size_t pos = 0;
+
+    // Size of the window that is requested to be read ahead of the
+    // current position, 0 disables explicit read ahead and leaves
+    // it to the kernel.
+    size_t readAhead;
+    size_t advisedUntil = 0;
+
+    void advise() {
+        if (readAhead == 0 || advisedUntil >= size) {
+            return;
+        }
+        if (pos + readAhead / 2 >= advisedUntil) {
+            size_t pageSize = sysconf(_SC_PAGESIZE);
+            size_t from = advisedUntil - advisedUntil % pageSize;
+            size_t length = std::min(readAhead, size - from);
+            madvise(const_cast<char*>(data) + from, length, MADV_WILLNEED);
+            advisedUntil = from + length;
+        }
+    }
 
 public:
-    using SmallInt = int32_t;
-    static const int smallMaxCharCount = 9;
+    static constexpr size_t defaultReadAhead = 16 * 1024 * 1024;
+
+    MappedFile(const std::string& fileName, size_t _readAhead = defaultReadAhead)
+        : readAhead(_readAhead)
+    {
+        fd = ::open(fileName.c_str(), O_RDONLY);
+        if (fd < 0) {
+            throw std::runtime_error("Could not open file '" + fileName + "'.");
+        }
+        struct stat info;
+        if (fstat(fd, &info) != 0 || !S_ISREG(info.st_mode)) {
+            ::close(fd);
+            fd = -1;
+            throw std::runtime_error("Can not map '" + fileName + "', not a regular file.");
+        }
+        size = info.st_size;
+        if (size > 0) {
+            void* mapping = mmap(nullptr, size, PROT_READ, MAP_PRIVATE, fd, 0);
+            if (mapping == MAP_FAILED) {
+                ::close(fd);
+                fd = -1;
+                throw std::runtime_error("Failed to map file '" + fileName + "'.");
+            }
+            data = static_cast<const char*>(mapping);
+            madvise(mapping, size, MADV_SEQUENTIAL);
+            advise();
+        }
+    }
 
-private:
-    CoeffNormalizer<SmallInt, T> small;
-    CoeffNormalizer<T, T> large;
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
 
-    bool isClause;
-    bool isSmall;
-    bool hasDuplicates;
+    ~MappedFile() {
+        close();
+    }
 
-    VarDouplicateDetection duplicateDetection;
+    void close() override {
+        if (data != nullptr) {
+            munmap(const_cast<char*>(data), size);
+            data = nullptr;
+        }
+        if (fd >= 0) {
+            ::close(fd);
+            fd = -1;
+        }
+        pos = size;
+    }
 
-public:
-    T degree;
-    bool isEq;
+    size_t getSize() const override {
+        return size;
+    }
 
-    std::vector<Term<T>> largeTerms;
-    std::vector<Term<int32_t>> smallTerms;
+    size_t getPosition() const override {
+        return pos;
+    }
 
-    ParsedTerms(){
-        reset();
+    void setPosition(size_t newPos) {
+        pos = std::min(newPos, size);
+        advise();
     }
 
-    void reset(){
-        degree = 0;
-        largeTerms.clear();
-        smallTerms.clear();
-        duplicateDetection.clear();
-        isEq = false;
-        isClause = true;
-        isSmall = true;
-        hasDuplicates = false;
+    string_view getContent() const {
+        return string_view(data, size);
     }
 
-    void nextSmallCoeff(SmallInt coeff) {
-        if (this->isSmall) {
-            this->small.coeff = coeff;
-            this->isClause &= (coeff == 1 || coeff == -1);
+    bool getline(WordIter& it) override {
+        it.fileInfo.line += 1;
+        if (pos >= size) {
+            it.setLineView(string_view());
+            return false;
+        }
+
+        const char* start = data + pos;
+        const char* end = static_cast<const char*>(std::memchr(start, '\n', size - pos));
+        if (end == nullptr) {
+            end = data + size;
+            pos = size;
         } else {
-            this->large.coeff = coeff;
+            pos = end - data + 1;
         }
+
+        it.setLineView(string_view(start, end - start));
+        advise();
+        return true;
     }
+};
 
-    void switchToLargeTerms() {
-        this->isClause = false;
-        this->isSmall = false;
-        if (!smallTerms.empty()) {
-            assert(largeTerms.empty());
-            std::copy(smallTerms.begin(), smallTerms.end(), std::back_inserter(largeTerms));
-            smallTerms.clear();
+bool nextLineMapped(MappedFile* file, WordIter* it) {
+    return file->getline(*it);
+}
+
+// lines of content that is already in memory, e.g., part of a MappedFile
+class MemoryFile: public LineReader {
+    string_view content;
+    size_t pos = 0;
+
+public:
+    MemoryFile(string_view _content)
+        : content(_content)
+    {}
+
+    bool getline(WordIter& it) override {
+        it.fileInfo.line += 1;
+        if (pos >= content.size()) {
+            it.setLineView(string_view());
+            return false;
         }
+
+        size_t end = content.find('\n', pos);
+        if (end == string_view::npos) {
+            end = content.size();
+        }
+        it.setLineView(content.substr(pos, end - pos));
+        pos = end + 1;
+        return true;
     }
 
-    void nextLargeCoeff(T&& coeff) {
-        if (this->isSmall) {
-            if (coeff <= std::numeric_limits<SmallInt>::max()) {
-                this->small.coeff = convertInt<SmallInt>(coeff);
+    void close() override {
+        pos = content.size();
+    }
+
+    size_t getSize() const override {
+        return content.size();
+    }
+
+    size_t getPosition() const override {
+        return std::min(pos, content.size());
+    }
+};
+
+/*
+ * Binary proof format
+ * ===================
+ *
+ * The binary format is a lossless encoding of the lines of a text
+ * proof, i.e., decoding a line results in exactly the text a
+ * WordIter would see when reading the text proof. Hence, all rules
+ * are parsed by the same code in both cases.
+ *
+ * File layout:
+ *     magic, varint #opcodes, #opcodes times (varint length, bytes),
+ *     followed by the encoded lines.
+ *
+ * The opcodes (rule identifiers and frequent key words) form the
+ * initial string table. Each line is a sequence of tokens,
+ * terminated by an end of line marker. A token is a varint where the
+ * lowest 3 bits encode the kind of the token and the remaining bits
+ * the value:
+ *
+ *     UInt     value is a non negative integer
+ *     NegInt   value is the absolute value of a negative integer
+ *     Var      'x' followed by the value
+ *     NegVar   '~x' followed by the value
+ *     Table    reference to an entry of the string table
+ *     NewTable value bytes follow, which are added to the string table
+ *     Raw      value bytes follow, which are not added to the table
+ *     Control  0 is end of line, everything else a non standard gap
+ *              of value bytes, which follow
+ *
+ * Numbers are only encoded as integers if the decimal
+ * representation is canonical, too large numbers are stored as
+ * length prefixed raw strings. Consecutive tokens are separated by a
+ * single space unless a gap is given explicitly.
+ */
+namespace binary_proof {
+    const string_view magic("\0VeriPB\x01", 8);
+
+    enum class Kind : uint8_t {
+        UInt = 0, NegInt = 1, Var = 2, NegVar = 3,
+        Table = 4, NewTable = 5, Raw = 6, Control = 7
+    };
+
+    const size_t kindBits = 3;
+    // longest decimal number that is encoded as integer
+    const size_t maxDigits = 18;
+    // longest string and maximal number of strings in the string table
+    const size_t maxTableEntrySize = 64;
+    const size_t maxTableSize = 1 << 20;
+
+    inline void writeVarint(std::string& out, uint64_t value) {
+        while (value >= 0x80) {
+            out.push_back(static_cast<char>((value & 0x7f) | 0x80));
+            value >>= 7;
+        }
+        out.push_back(static_cast<char>(value));
+    }
+
+    inline void writeToken(std::string& out, Kind kind, uint64_t value) {
+        writeVarint(out, (value << kindBits) | static_cast<uint64_t>(kind));
+    }
+
+    inline void writeBytes(std::string& out, Kind kind, string_view bytes) {
+        writeToken(out, kind, bytes.size());
+        out.append(bytes.data(), bytes.size());
+    }
+
+    /*
+     * returns true if the string is the canonical decimal
+     * representation of a number that is encoded as integer
+     */
+    inline bool parseCanonical(string_view digits, uint64_t& value) {
+        if (digits.empty() || digits.size() > maxDigits) {
+            return false;
+        }
+        if (digits[0] == '0' && digits.size() > 1) {
+            return false;
+        }
+        value = 0;
+        for (char c: digits) {
+            uint8_t digit = c - '0';
+            if (digit > 9) {
+                return false;
+            }
+            value = value * 10 + digit;
+        }
+        return true;
+    }
+
+    class Writer {
+        std::ostream& out;
+        std::string buffer;
+        std::unordered_map<std::string, uint64_t> table;
+
+        void writeWord(string_view word) {
+            uint64_t value;
+            if (parseCanonical(word, value)) {
+                writeToken(buffer, Kind::UInt, value);
+            } else if (word[0] == '-' && word.size() > 1 && word[1] != '0'
+                    && parseCanonical(word.substr(1), value)) {
+                writeToken(buffer, Kind::NegInt, value);
+            } else if (word[0] == 'x' && parseCanonical(word.substr(1), value)) {
+                writeToken(buffer, Kind::Var, value);
+            } else if (word.size() > 2 && word[0] == '~' && word[1] == 'x'
+                    && parseCanonical(word.substr(2), value)) {
+                writeToken(buffer, Kind::NegVar, value);
             } else {
-                switchToLargeTerms();
-                this->large.coeff = std::move(coeff);
+                auto it = table.find(std::string(word));
+                if (it != table.end()) {
+                    writeToken(buffer, Kind::Table, it->second);
+                } else if (word.size() <= maxTableEntrySize && table.size() < maxTableSize) {
+                    table.emplace(word, table.size());
+                    writeBytes(buffer, Kind::NewTable, word);
+                } else {
+                    writeBytes(buffer, Kind::Raw, word);
+                }
             }
-        } else {
-            this->large.coeff = std::move(coeff);
         }
-    }
 
-    void nextLit(Lit lit){
-        if (duplicateDetection.add(lit.var())) {
-            this->hasDuplicates = true;
-            // throw ParseError(it, "Douplicated variables are not supported in constraints.");
+    public:
+        Writer(std::ostream& _out, const std::vector<std::string>& opcodes)
+            : out(_out)
+        {
+            buffer.append(magic.data(), magic.size());
+            writeVarint(buffer, opcodes.size());
+            for (const std::string& opcode: opcodes) {
+                writeVarint(buffer, opcode.size());
+                buffer.append(opcode);
+                table.emplace(opcode, table.size());
+            }
+        }
+
+        ~Writer() {
+            flush();
+        }
+
+        void writeLine(string_view line) {
+            const char* separators = " \t";
+            size_t pos = 0;
+            bool first = true;
+            while (pos < line.size()) {
+                size_t start = line.find_first_not_of(separators, pos);
+                if (start == string_view::npos) {
+                    start = line.size();
+                }
+                string_view gap = line.substr(pos, start - pos);
+                bool isEnd = (start == line.size());
+                if ((first && !gap.empty()) || (!first && !isEnd && gap != " ") || (isEnd && !gap.empty())) {
+                    writeBytes(buffer, Kind::Control, gap);
+                }
+                if (isEnd) {
+                    break;
+                }
+
+                size_t end = line.find_first_of(separators, start);
+                if (end == string_view::npos) {
+                    end = line.size();
+                }
+                writeWord(line.substr(start, end - start));
+                pos = end;
+                first = false;
+            }
+            writeToken(buffer, Kind::Control, 0);
+
+            if (buffer.size() > (1 << 16)) {
+                flush();
+            }
+        }
+
+        void flush() {
+            out.write(buffer.data(), buffer.size());
+            buffer.clear();
+        }
+    };
+
+    class Reader: public LineReader {
+        MappedFile file;
+        const char* pos;
+        const char* end;
+        std::vector<std::string> table;
+
+        uint64_t readVarint(WordIter& it) {
+            uint64_t value = 0;
+            size_t shift = 0;
+            while (true) {
+                if (pos == end || shift > 63) {
+                    throw ParseError(it, "Corrupted binary proof.");
+                }
+                uint8_t byte = *pos;
+                ++pos;
+                value |= static_cast<uint64_t>(byte & 0x7f) << shift;
+                if (byte < 0x80) {
+                    return value;
+                }
+                shift += 7;
+            }
+        }
+
+        string_view readBytes(WordIter& it, uint64_t length) {
+            if (static_cast<uint64_t>(end - pos) < length) {
+                throw ParseError(it, "Corrupted binary proof.");
+            }
+            string_view result(pos, length);
+            pos += length;
+            return result;
+        }
+
+        static void appendNumber(std::string& out, uint64_t value) {
+            char digits[20];
+            char* first = digits + sizeof(digits);
+            do {
+                --first;
+                *first = '0' + value % 10;
+                value /= 10;
+            } while (value != 0);
+            out.append(first, digits + sizeof(digits));
+        }
+
+    public:
+        Reader(const std::string& fileName)
+            : file(fileName)
+        {
+            string_view content = file.getContent();
+            pos = content.data();
+            end = content.data() + content.size();
+
+            WordIter it(fileName);
+            if (content.substr(0, magic.size()) != magic) {
+                throw ParseError(it, "Not a binary proof.");
+            }
+            pos += magic.size();
+            uint64_t numOpcodes = readVarint(it);
+            for (uint64_t i = 0; i < numOpcodes; i++) {
+                uint64_t length = readVarint(it);
+                table.emplace_back(readBytes(it, length));
+            }
+            file.setPosition(pos - content.data());
+        }
+
+        static bool isBinary(const std::string& fileName) {
+            std::ifstream f(fileName, std::ios::binary);
+            char header[8];
+            f.read(header, magic.size());
+            return f && string_view(header, magic.size()) == magic;
+        }
+
+        void close() override {
+            file.close();
+            pos = end;
+        }
+
+        size_t getSize() const override {
+            return file.getSize();
+        }
+
+        size_t getPosition() const override {
+            return file.getPosition();
+        }
+
+        bool getline(WordIter& it) override {
+            it.fileInfo.line += 1;
+            std::string& line = it.lineBuffer;
+            line.clear();
+            if (pos == end) {
+                it.setLineView(line);
+                return false;
+            }
+
+            bool first = true;
+            bool hasGap = false;
+            while (true) {
+                uint64_t token = readVarint(it);
+                Kind kind = static_cast<Kind>(token & ((1 << kindBits) - 1));
+                uint64_t value = token >> kindBits;
+
+                if (kind == Kind::Control) {
+                    if (value == 0) {
+                        break;
+                    }
+                    line.append(readBytes(it, value));
+                    hasGap = true;
+                    continue;
+                }
+
+                if (!first && !hasGap) {
+                    line.push_back(' ');
+                }
+                first = false;
+                hasGap = false;
+
+                switch (kind) {
+                    case Kind::UInt:
+                        appendNumber(line, value);
+                        break;
+                    case Kind::NegInt:
+                        line.push_back('-');
+                        appendNumber(line, value);
+                        break;
+                    case Kind::Var:
+                        line.push_back('x');
+                        appendNumber(line, value);
+                        break;
+                    case Kind::NegVar:
+                        line.append("~x");
+                        appendNumber(line, value);
+                        break;
+                    case Kind::Table:
+                        if (value >= table.size()) {
+                            throw ParseError(it, "Corrupted binary proof.");
+                        }
+                        line.append(table[value]);
+                        break;
+                    case Kind::NewTable:
+                        table.emplace_back(readBytes(it, value));
+                        line.append(table.back());
+                        break;
+                    case Kind::Raw:
+                        line.append(readBytes(it, value));
+                        break;
+                    default:
+                        break;
+                }
+            }
+
+            it.setLineView(line);
+            file.setPosition(pos - file.getContent().data());
+            return true;
+        }
+    };
+
+    void toBinary(const std::string& inFileName, const std::string& outFileName,
+            const std::vector<std::string>& opcodes) {
+        std::ofstream out(outFileName, std::ios::binary);
+        if (!out) {
+            throw std::runtime_error("Could not open '" + outFileName + "' for writing.");
+        }
+        Writer writer(out, opcodes);
+        WordIter it(inFileName);
+        if (Reader::isBinary(inFileName)) {
+            throw ParseError(it, "Proof is already binary.");
+        }
+        std::ifstream in(inFileName);
+        while (WordIter::getline(in, it)) {
+            writer.writeLine(it.line);
+        }
+        writer.flush();
+        if (!out) {
+            throw std::runtime_error("Failed to write '" + outFileName + "'.");
+        }
+    }
+
+    void toText(const std::string& inFileName, const std::string& outFileName) {
+        Reader reader(inFileName);
+        std::ofstream out(outFileName, std::ios::binary);
+        if (!out) {
+            throw std::runtime_error("Could not open '" + outFileName + "' for writing.");
+        }
+        WordIter it(inFileName);
+        while (reader.getline(it)) {
+            out << it.line << "\n";
+        }
+        if (!out) {
+            throw std::runtime_error("Failed to write '" + outFileName + "'.");
+        }
+    }
+}
+
+bool nextLineBinary(binary_proof::Reader* reader, WordIter* it) {
+    return reader->getline(*it);
+}
+
+WordIter WordIter::end;
+
+ParseError::ParseError(const WordIter& it, const std::string& what_arg)
+    : std::runtime_error(what_arg)
+{
+    fileName = it.getFileName();
+    line = it.getLine();
+    column = it.getColumn();
+}
+
+/**
+ * throws std::invalid_argument or std::out_of_range exception on
+ * invalid input
+ */
+template<typename T>
+T parseCoeff(const WordIter& it){
+    // std::cout  << it->size() << std::endl;
+    return parseCoeff<T>(it, 0, it->size());
+};
+
+template<typename T>
+T parseCoeff(const WordIter& it, size_t start, size_t length);
+
+int parseInt(const WordIter& word, std::string msg, size_t start, size_t length) {
+    assert(word->size() >= start + length);
+    assert(length > 0);
+
+    if (word.isEnd()) {
+        throw ParseError(word, "Expected Number.");
+    }
+
+    const char* it = word->data() + start;
+    const char* end = word->data() + start + length;
+
+    bool negated = false;
+    if (*it == '+') {
+        it += 1;
+    } else if (*it == '-') {
+        negated = true;
+        it += 1;
+    }
+
+    if (it == end) {
+        throw ParseError(word, "Expected Number, only got sign.");
+    } else if (end - it > 9) {
+        throw ParseError(word, "Number too large.");
+    }
+
+    int res = 0;
+    for (; it != end; ++it) {
+        uint8_t chr = *it - '0';
+        res *= 10;
+        res += chr;
+        if (chr > 9) {
+            throw ParseError(word, "Expected number.");
+        }
+    }
+    if (negated) {
+        res = -res;
+    }
+
+    return res;
+    // try {
+    //     return std::stoi(it->substr(start, length));
+    // } catch (const std::invalid_argument& e) {
+    //     throw ParseError(it, "Expected coefficient, did not get an integer.");
+    // } catch (const std::out_of_range& e) {
+    //     throw ParseError(it, "Coefficient too large.");
+    // }
+};
+
+int parseInt(const WordIter& it, std::string msg) {
+    return parseInt(it, msg, 0, it->size());
+};
+
+template<>
+int parseCoeff<int>(const WordIter& it, size_t start, size_t length) {
+    return parseInt(it, "Expected coefficient", start, length);
+}
+
+template<>
+BigInt parseCoeff<BigInt>(const WordIter& word, size_t start, size_t length){
+    assert(word->size() >= start + length);
+    assert(length > 0);
+
+    if (word.isEnd()) {
+        throw ParseError(word, "Expected Number.");
+    }
+
+    const char* it = word->data() + start;
+    if (*it == '+') {
+        it += 1;
+    }
+    // copy to string to get \0 terminated string
+    std::string subString(it, length);
+    try {
+        return BigInt(subString);
+    } catch (...) {
+        throw ParseError(word, "Error while parsing number.");
+    }
+
+
+}
+
+template<>
+HybridInt parseCoeff<HybridInt>(const WordIter& word, size_t start, size_t length){
+    assert(word->size() >= start + length);
+    assert(length > 0);
+
+    if (word.isEnd()) {
+        throw ParseError(word, "Expected Number.");
+    }
+
+    const char* it = word->data() + start;
+    const char* end = it + length;
+    if (*it == '+') {
+        it += 1;
+    }
+    const char* digits = (it != end && *it == '-') ? it + 1 : it;
+
+    // numbers with up to 18 digits fit into 64 bit and are parsed
+    // directly, everything else, including numbers with leading
+    // zeros, is left to GMP
+    if (digits != end && end - digits <= 18
+            && (*digits != '0' || end - digits == 1)) {
+        int64_t res = 0;
+        for (; digits != end; ++digits) {
+            uint8_t chr = *digits - '0';
+            if (chr > 9) {
+                break;
+            }
+            res *= 10;
+            res += chr;
+        }
+        if (digits == end) {
+            return (*it == '-') ? -res : res;
+        }
+    }
+
+    return parseCoeff<BigInt>(word, start, length);
+}
+
+class VariableNameManager {
+    std::unordered_map<std::string, int> name2num;
+    std::vector<std::string> num2name;
+    size_t _maxVar = 0;
+
+    bool allowArbitraryNames = false;
+
+public:
+    VariableNameManager(bool _allowArbitraryNames)
+        : allowArbitraryNames(_allowArbitraryNames)
+    {}
+
+    size_t maxVar() const {
+        return std::max(_maxVar, num2name.size());
+    }
+
+    bool allowsArbitraryNames() const {
+        return allowArbitraryNames;
+    }
+
+    // names of the variables in the order of their numbers, only
+    // used if arbitrary names are allowed
+    const std::vector<std::string>& getNames() const {
+        return num2name;
+    }
+
+    std::string getName(Var num) {
+        if (!allowArbitraryNames) {
+            return "x" + std::to_string(num);
+        } else {
+            return num2name[num - 1];
+        }
+    }
+
+    Var getVar(const std::string_view& name) {
+        if (name.size() < 2) {
+            throw std::invalid_argument("Expected variable, but name is too short.");
+        }
+
+        if (!allowArbitraryNames) {
+            if (name[0] != 'x') {
+                throw std::invalid_argument("Expected variable, but did not start with 'x'.");
+            }
+            std::string var(name.substr(1));
+            unsigned long varVal = std::stoul(var);
+            if (varVal > Var::LIMIT) {
+                throw std::invalid_argument("Variable too large, can not be represented.");
+            }
+            _maxVar = std::max(_maxVar, varVal);
+            return Var(varVal);
+        } else {
+            if (!std::isalpha(name[0])) {
+                throw std::invalid_argument("Expected variable, but did not start with letter.");
+            }
+            auto result = name2num.insert(std::make_pair(name, num2name.size()));
+            bool newName = result.second;
+            if (newName) {
+                num2name.emplace_back(name);
+            }
+            size_t varVal = result.first->second + 1;
+            if (varVal > Var::LIMIT) {
+                throw std::invalid_argument("Too many variables, can not be represented.");
+            }
+            return Var(varVal);
+        }
+    }
+
+    Lit getLit(const std::string_view& name) {
+        if (name.size() < 1) {
+            throw std::invalid_argument("Expected literal.");
+        }
+
+        bool isNegated = (name[0] == '~');
+        int offset = isNegated?1:0;
+        const std::string_view var = name.substr(offset);
+        return Lit(this->getVar(var), isNegated);
+    }
+
+    /*
+     * Add the variables of other, e.g., of a part of a formula that
+     * was parsed separately, in the order in which other has seen
+     * them first. Returns the variable of this manager for every
+     * variable of other or an empty vector if they are the same.
+     * The optional renumber allows to change the number of
+     * variables named x[number].
+     */
+    std::vector<Var> merge(const VariableNameManager& other,
+            const std::function<size_t(size_t)>& renumber = nullptr) {
+        std::vector<Var> mapping(other.maxVar() + 1, Var(0));
+        bool isIdentity = true;
+        if (!allowArbitraryNames) {
+            for (size_t var = 1; var < mapping.size(); var++) {
+                size_t value = renumber ? renumber(var) : var;
+                if (value > Var::LIMIT) {
+                    throw std::invalid_argument("Variable too large, can not be represented.");
+                }
+                mapping[var] = Var(value);
+                isIdentity &= (value == var);
+            }
+            _maxVar = std::max(_maxVar, static_cast<size_t>(mapping.back()));
+        } else {
+            for (size_t i = 0; i < other.num2name.size(); i++) {
+                const std::string& name = other.num2name[i];
+                Var var = (renumber) ? getVar(renumbered(name, renumber)) : getVar(name);
+                mapping[i + 1] = var;
+                isIdentity &= (var == i + 1);
+            }
+        }
+
+        if (isIdentity) {
+            mapping.clear();
+        }
+        return mapping;
+    }
+
+private:
+    static std::string renumbered(const std::string& name,
+            const std::function<size_t(size_t)>& renumber) {
+        if (name.size() < 2 || name[0] != 'x' || name[1] == '0'
+                || name.size() > 20
+                || !std::all_of(name.begin() + 1, name.end(), ::isdigit)) {
+            return name;
+        }
+        size_t number = std::stoull(name.substr(1));
+        size_t value = renumber(number);
+        if (value == number) {
+            return name;
+        }
+        return "x" + std::to_string(value);
+    }
+};
+
+Lit parseLit(const WordIter& it, VariableNameManager& mngr, const std::string_view* value = nullptr) {
+    if (it == WordIter::end) {
+        throw ParseError(it, "Expected literal.");
+    }
+
+    try {
+        if (value) {
+            return mngr.getLit(*value);
+        } else {
+            return mngr.getLit(*it);
+        }
+    } catch (const std::invalid_argument& e) {
+        throw ParseError(it, e.what());
+    } catch (const std::out_of_range& e) {
+        throw ParseError(it, e.what());
+    }
+}
+
+
+
+class VarDouplicateDetection {
+    std::vector<bool> contained;
+    std::vector<Var> used;
+
+public:
+    bool add(Var var) {
+        used.push_back(var);
+        size_t idx = static_cast<size_t>(var);
+        if (idx >= contained.size()) {
+            contained.resize(idx + 1);
+        }
+        bool result = contained[idx];
+        contained[idx] = true;
+        return result;
+    }
+
+    void clear() {
+        for (Var var: used) {
+            contained[var] = false;
+        }
+        used.clear();
+    }
+};
+
+
+template<typename T>
+class Formula {
+private:
+    std::vector<std::unique_ptr<Inequality<T>>> constraints;
+    bool needToSetCore = true;
+
+public:
+    bool hasObjective = false;
+    std::vector<size_t> objectiveVars;
+    std::vector<T> objectiveCoeffs;
+
+    size_t maxVar;
+    size_t claimedNumC;
+    size_t claimedNumVar;
+
+    std::vector<Inequality<T>*> getConstraints() {
+        std::vector<Inequality<T>*> result;
+        result.reserve(constraints.size());
+        for (auto& ptr: constraints) {
+            if (needToSetCore) {
+                ptr->isCoreConstraint = true;
+            }
+            result.push_back(ptr.get());
+        }
+        needToSetCore = false;
+        return result;
+    }
+
+    void add(std::unique_ptr<Inequality<T>>&& constraint) {
+        constraints.emplace_back(std::move(constraint));
+    }
+
+    // see VariableNameManager::merge
+    void renameVars(const std::vector<Var>& mapping) {
+        if (mapping.empty()) {
+            return;
+        }
+        for (auto& constraint: constraints) {
+            constraint->renameVars(mapping);
+        }
+        for (size_t& var: objectiveVars) {
+            var = mapping[var];
+        }
+        size_t newMaxVar = 0;
+        for (size_t var = 1; var <= maxVar; var++) {
+            newMaxVar = std::max(newMaxVar, static_cast<size_t>(mapping[var]));
+        }
+        maxVar = newMaxVar;
+    }
+
+    // append the constraints and objective of a part of the formula
+    void append(Formula<T>&& part) {
+        constraints.reserve(constraints.size() + part.constraints.size());
+        std::move(part.constraints.begin(), part.constraints.end(),
+            std::back_inserter(constraints));
+        part.constraints.clear();
+        objectiveVars.insert(objectiveVars.end(),
+            part.objectiveVars.begin(), part.objectiveVars.end());
+        objectiveCoeffs.insert(objectiveCoeffs.end(),
+            part.objectiveCoeffs.begin(), part.objectiveCoeffs.end());
+        maxVar = std::max(maxVar, part.maxVar);
+    }
+};
+
+template<typename CoeffType, typename DegreeType>
+struct CoeffNormalizer {
+    CoeffType coeff;
+    Lit lit;
+
+    DegreeType normalize() {
+        if (coeff < 0) {
+            coeff = -coeff;
+            lit = ~lit;
+            return coeff;
+        } else {
+            return 0;
+        }
+    }
+
+    template<typename T>
+    void emplaceInto(T& vec) {
+        vec.emplace_back(coeff, lit);
+    }
+};
+
+template<typename T>
+class ParsedTerms {
+
+public:
+    using SmallInt = int32_t;
+    static const int smallMaxCharCount = 9;
+
+private:
+    CoeffNormalizer<SmallInt, T> small;
+    CoeffNormalizer<T, T> large;
+
+    bool isClause;
+    bool isSmall;
+    bool hasDuplicates;
+
+    VarDouplicateDetection duplicateDetection;
+
+public:
+    T degree;
+    bool isEq;
+
+    std::vector<Term<T>> largeTerms;
+    std::vector<Term<int32_t>> smallTerms;
+
+    ParsedTerms(){
+        reset();
+    }
+
+    void reset(){
+        degree = 0;
+        largeTerms.clear();
+        smallTerms.clear();
+        duplicateDetection.clear();
+        isEq = false;
+        isClause = true;
+        isSmall = true;
+        hasDuplicates = false;
+    }
+
+    void nextSmallCoeff(SmallInt coeff) {
+        if (this->isSmall) {
+            this->small.coeff = coeff;
+            this->isClause &= (coeff == 1 || coeff == -1);
+        } else {
+            this->large.coeff = coeff;
+        }
+    }
+
+    void switchToLargeTerms() {
+        this->isClause = false;
+        this->isSmall = false;
+        if (!smallTerms.empty()) {
+            assert(largeTerms.empty());
+            std::copy(smallTerms.begin(), smallTerms.end(), std::back_inserter(largeTerms));
+            smallTerms.clear();
+        }
+    }
+
+    void nextLargeCoeff(T&& coeff) {
+        if (this->isSmall) {
+            if (coeff <= std::numeric_limits<SmallInt>::max()) {
+                this->small.coeff = convertInt<SmallInt>(coeff);
+            } else {
+                switchToLargeTerms();
+                this->large.coeff = std::move(coeff);
+            }
+        } else {
+            this->large.coeff = std::move(coeff);
+        }
+    }
+
+    void nextLit(Lit lit){
+        if (duplicateDetection.add(lit.var())) {
+            this->hasDuplicates = true;
+            // throw ParseError(it, "Douplicated variables are not supported in constraints.");
+        }
+
+        if (this->isSmall) {
+            small.lit = lit;
+            degree += small.normalize();
+            small.emplaceInto(smallTerms);
+        } else {
+            large.lit = lit;
+            degree += large.normalize();
+            large.emplaceInto(largeTerms);
+        }
+    };
+
+    void setDegree(T _degree) {
+        this->degree += _degree;
+
+        if (this->isSmall) {
+            if (this->hasDuplicates || this->isEq || this->degree > std::numeric_limits<SmallInt>::max()) {
+                switchToLargeTerms();
+            }
+        }
+
+        this->isClause &= this->degree == 1;
+    }
+
+    void setEq() {
+        isEq = true;
+    }
+
+    void setGeq() {
+        isEq = false;
+    }
+
+    void flip() {
+        degree = -degree;
+        if (isSmall) {
+            for (auto& term: smallTerms) {
+                degree += term.coeff;
+                term.lit = ~term.lit;
+            }
+        } else {
+            for (auto& term: largeTerms) {
+                degree += term.coeff;
+                term.lit = ~term.lit;
+            }
+        }
+
+    }
+
+    void negate() {
+        flip();
+        degree += 1;
+    }
+
+    std::array<std::unique_ptr<Inequality<T>>, 2> getInequalities() {
+
+        std::unique_ptr<Inequality<T>> geq;
+        if (isClause) {
+            geq = std::make_unique<Inequality<T>>(
+                ClauseHandler(smallTerms.size(), smallTerms.size(), smallTerms.begin(), smallTerms.end()));
+        } else if (isSmall) {
+            SmallInt smallDegree = convertInt<SmallInt>(degree);
+            geq = std::make_unique<Inequality<T>>(
+                FixedSizeInequalityHandler<SmallInt>(smallTerms.size(), smallTerms, smallDegree));
+        } else {
+            switchToLargeTerms();
+            geq = std::make_unique<Inequality<T>>(largeTerms, degree);
+        }
+        std::unique_ptr<Inequality<T>> leq = nullptr;
+        if (isEq) {
+            flip();
+
+            leq = std::make_unique<Inequality<T>>(largeTerms, degree);
+        }
+
+        return {std::move(geq), std::move(leq)};
+    }
+};
+
+
+template<typename T>
+class OPBParser {
+    VariableNameManager& variableNameManager;
+    ParsedTerms<T> parsedTerms;
+    VarDouplicateDetection duplicateDetection;
+
+    std::unique_ptr<Formula<T>> formula;
+    bool checkedObjective = false;
+
+public:
+    OPBParser(VariableNameManager& mngr):
+        variableNameManager(mngr)
+    {}
+
+
+    std::unique_ptr<Formula<T>> parse(LineReader& f, const std::string& fileName) {
+        start();
+        WordIter it(fileName);
+
+        // We currently do not make use of the claimed number of
+        // variables (not even for checking if the numbers match),
+        // hence let us not parse the header. In general it would be
+        // nice to not force the header to be there.
+        // if (!WordIter::getline(f, it)) {
+        //     throw ParseError(it, "Expected OPB header.");
+        // }
+        // parseHeader(it);
+
+        while (f.getline(it)) {
+            parseLine(it);
+        }
+
+        return finish(it);
+    }
+
+    void start() {
+        formula = std::make_unique<Formula<T>>();
+        checkedObjective = false;
+    }
+
+    // the objective is only allowed on the first line
+    bool inHeader() const {
+        return !checkedObjective;
+    }
+
+    void parseLine(WordIter& it) {
+        if (it != WordIter::end && ((*it)[0] != '*')) {
+            if (!checkedObjective) {
+                checkedObjective = true;
+                if (*it == "min:") {
+                    ++it;
+                    parseObjective(it);
+                    return;
+                }
+            }
+
+            auto res = parseConstraint(it);
+            if (it != WordIter::end) {
+                throw ParseError(it, "Expected end line after constraint.");
+            }
+            formula->add(std::move(res[0]));
+            if (res[1] != nullptr) {
+                formula->add(std::move(res[1]));
+            }
+        }
+    }
+
+    std::unique_ptr<Formula<T>> finish(WordIter&) {
+        return std::move(formula);
+    }
+
+    // parser for a part of the file after the header
+    std::unique_ptr<OPBParser<T>> partParser(VariableNameManager& mngr) const {
+        auto result = std::make_unique<OPBParser<T>>(mngr);
+        result->start();
+        result->checkedObjective = true;
+        return result;
+    }
+
+    void appendPart(OPBParser<T>& part, VariableNameManager& mngr) {
+        part.formula->renameVars(variableNameManager.merge(mngr));
+        formula->append(std::move(*part.formula));
+    }
+
+    void parseHeader(WordIter& it) {
+        it.expect("*");
+        ++it;
+        it.expect("#variable=");
+        ++it;
+        formula->claimedNumVar = parseInt(it, "Expected number of variables.");
+        ++it;
+        it.expect("#constraint=");
+        ++it;
+        formula->claimedNumC = parseInt(it, "Expected number of constraints.");
+        ++it;
+        if (it != WordIter::end) {
+            throw ParseError(it, "Expected end of header line.");
+        }
+    }
+
+    void parseObjective(WordIter& it) {
+        formula->hasObjective = true;
+        while (it != WordIter::end && *it != ";") {
+            T coeff = parseCoeff<T>(it, 0, it->size());
+            ++it;
+            Lit lit = this->parseLit(it);
+
+            if (lit.isNegated()) {
+                coeff = -coeff;
+                lit = ~lit;
+            }
+
+            formula->objectiveCoeffs.push_back(coeff);
+            formula->objectiveVars.push_back(lit.var());
+
+            ++it;
+        }
+    }
+
+    Lit parseLit(WordIter& it) {
+        Lit lit = ::parseLit(it, variableNameManager);
+        if (formula) {
+            formula->maxVar = std::max(formula->maxVar, static_cast<size_t>(lit.var()));
+        }
+        return lit;
+    }
+
+    std::array<std::unique_ptr<Inequality<T>>, 2> parseConstraint(WordIter& it, bool geqOnly = false) {
+        parsedTerms.reset();
+
+        while (it != WordIter::end) {
+            const string_view& word = *it;
+            if (word == ">=" || word == "=") {
+                break;
+            }
+
+            if (word.size() > parsedTerms.smallMaxCharCount) {
+                parsedTerms.nextLargeCoeff(parseCoeff<T>(it, 0, it->size()));
+            } else {
+                parsedTerms.nextSmallCoeff(parseCoeff<typename ParsedTerms<T>::SmallInt>(it, 0, it->size()));
+            }
+            ++it;
+
+            parsedTerms.nextLit(this->parseLit(it));
+            ++it;
+        }
+
+        std::vector<std::string> ops = {">=", "="};
+        it.expectOneOf(ops);
+        bool isEq = (*it == "=");
+        if (isEq && geqOnly) {
+            throw ParseError(it, "Equality not allowed, only >= is allowed here.");
+        }
+
+        if (isEq) parsedTerms.setEq(); else parsedTerms.setGeq();
+        ++it;
+
+        if (it == WordIter::end) {
+            throw ParseError(it, "Expected degree.");
+        }
+
+        bool hasSemicolon = false;
+        size_t length = it->size();
+        if ((*it)[length - 1] == ';') {
+            hasSemicolon = true;
+            length -= 1;
+        }
+
+        parsedTerms.setDegree(parseCoeff<T>(it, 0, length));
+        ++it;
+
+        if (!hasSemicolon) {
+            if (*it == "==>") {
+                if (parsedTerms.isEq) {
+                    throw ParseError(it, "Can not use implication on equalities.");
+                }
+                ++it;
+
+                parsedTerms.negate();
+                parsedTerms.nextLargeCoeff(T(parsedTerms.degree));
+                parsedTerms.nextLit(this->parseLit(it));
+                ++it;
+            } else if (*it == "<==") {
+                if (parsedTerms.isEq) {
+                    throw ParseError(it, "Can not use implication on equalities.");
+                }
+                ++it;
+
+                parsedTerms.nextLargeCoeff(T(parsedTerms.degree));
+                parsedTerms.nextLit(~this->parseLit(it));
+                ++it;
+            }
+
+            it.expect(";");
+            ++it;
+        }
+
+        return parsedTerms.getInequalities();
+    }
+};
+
+template<typename T>
+class CNFParser {
+    VariableNameManager& variableNameManager;
+    std::vector<Term<T>> terms;
+    VarDouplicateDetection duplicateDetection;
+
+    std::unique_ptr<Formula<T>> formula;
+    bool weighted;
+    T weighted_partial_top; // Max weight of clause, which generates hard clause
+    int vars_claimed_header;
+    bool foundHeader = false;
+public:
+    CNFParser(VariableNameManager& mngr, bool weighted = false):
+        variableNameManager(mngr),
+        weighted(weighted)
+    {}
+
+
+    std::unique_ptr<Formula<T>> parse(LineReader& f, const std::string& fileName) {
+        start();
+        WordIter it(fileName);
+
+        while (f.getline(it)) {
+            parseLine(it);
+        }
+
+        return finish(it);
+    }
+
+    void start() {
+        formula = std::make_unique<Formula<T>>();
+
+        if(weighted){
+            formula->hasObjective = true;
+        }
+
+        foundHeader = false;
+    }
+
+    bool inHeader() const {
+        return !foundHeader;
+    }
+
+    void parseLine(WordIter& it) {
+        if (it != WordIter::end && ((*it)[0] != 'c')) {
+            if (!foundHeader) {
+                parseHeader(it);
+                foundHeader = true;
+            } else {
+                auto res = parseConstraint(it);
+                formula->add(std::move(res));
+            }
+        }
+    }
+
+    std::unique_ptr<Formula<T>> finish(WordIter& it) {
+        if (!foundHeader) {
+            if(weighted){
+                throw ParseError(it, "Expected WCNF header.");
+            } else{
+                throw ParseError(it, "Expected CNF header.");
+            }
+        }
+
+        return std::move(formula);
+    }
+
+    // parser for a part of the file after the header
+    std::unique_ptr<CNFParser<T>> partParser(VariableNameManager& mngr) const {
+        auto result = std::make_unique<CNFParser<T>>(mngr, weighted);
+        result->start();
+        result->foundHeader = true;
+        result->weighted_partial_top = weighted_partial_top;
+        result->vars_claimed_header = vars_claimed_header;
+        result->formula->claimedNumVar = vars_claimed_header;
+        return result;
+    }
+
+    void appendPart(CNFParser<T>& part, VariableNameManager& mngr) {
+        // the relaxation variables of soft clauses are numbered
+        // consecutively after the variables claimed by the header,
+        // shift them by the number of soft clauses in earlier parts
+        size_t header = vars_claimed_header;
+        size_t offset = formula->claimedNumVar - header;
+        std::function<size_t(size_t)> renumber;
+        if (offset > 0) {
+            renumber = [header, offset](size_t var) {
+                return (var > header) ? var + offset : var;
+            };
+        }
+        part.formula->renameVars(variableNameManager.merge(mngr, renumber));
+        formula->claimedNumVar += part.formula->claimedNumVar - header;
+        formula->append(std::move(*part.formula));
+    }
+
+    void parseHeader(WordIter& it) {
+        it.expect("p");
+        ++it;
+
+        if(weighted){
+            it.expect("wcnf");
+        } else{
+            it.expect("cnf");
+        }
+        ++it;
+        formula->claimedNumVar = parseInt(it, "Expected number of variables.");
+        vars_claimed_header = formula->claimedNumVar;
+        ++it;
+        formula->claimedNumC = parseInt(it, "Expected number of constraints.");
+        ++it;
+
+        if(weighted){
+            if(it != WordIter::end){
+                weighted_partial_top = parseCoeff<T>(it);
+            }
+            else{
+                weighted_partial_top = std::numeric_limits<T>::max(); // TODO: check for the weights
+            }
+
+            ++it;
+        }
+
+        if (it != WordIter::end) {
+            throw ParseError(it, "Expected end of header line.");
+        }
+    }
+
+    std::unique_ptr<Inequality<T>> parseConstraint(WordIter& it) {
+        terms.clear();
+        duplicateDetection.clear();
+
+        char buffer[12];
+        char* bufferEnd = buffer + 12;
+        char* bufferStart;
+
+        bool hasDuplicates = false;
+
+        T weight = 0;
+        
+        while (it != WordIter::end && *it != "0") {
+            // If no weight has been parsed yet, this means that the first value will be the weight of the clause. 
+            // Assumption: add a relaxation variable with name "xi" with i a number in the range [nbvar+1, nbvar+nbclauses].
+            if(weighted && weight==0){
+                weight = parseCoeff<T>(it);
+                
+                if(weight < weighted_partial_top){
+                    formula->claimedNumVar++; // Claim another variable as relaxation variable.
+
+                    std::string name = "x"+ std::to_string(formula->claimedNumVar);
+                    string_view relaxVarName(name);
+                    
+                    Lit lit = variableNameManager.getLit(relaxVarName); // getLit also calls getVar, which adds the variable name to the variable name manager if not exists.
+
+                    terms.emplace_back(1, lit);
+                    
+                    formula->objectiveCoeffs.push_back(weight);
+                    formula->objectiveVars.push_back(lit.var());
+                    formula->maxVar = std::max(formula->maxVar, static_cast<size_t>(lit.var()));
+                }
+                ++it;
+                continue;
+            }
+
+            // parse int to give nice error messages if input is not
+            // an integer, out put is not used because we construct
+            // string to be consistent with arbitrary variable names
+            int parsed_lit = parseInt(it, "Expected literal.");
+            if (it->size() > 11) {
+                throw ParseError(it, "Literal too large.");
+            }
+
+            // Check to see that no variables higher than the claimed variables in the header are parsed
+            if(abs(parsed_lit) > vars_claimed_header){
+                throw ParseError(it, "More variables in the formula than claimed by the header.");
+            }
+
+            bufferStart = bufferEnd - it->size();
+            std::copy(it->begin(), it->end(), bufferStart);
+            if (bufferStart[0] == '-') {
+                bufferStart -= 1;
+                bufferStart[0] = '~';
+                bufferStart[1] = 'x';
+            } else {
+                bufferStart -= 1;
+                bufferStart[0] = 'x';
+            }
+
+            std::string_view litString(bufferStart, bufferEnd - bufferStart);
+            Lit lit = parseLit(it, variableNameManager, &litString);
+            if (formula) {
+                formula->maxVar = std::max(formula->maxVar, static_cast<size_t>(lit.var()));
+            }
+
+            terms.emplace_back(1, lit);
+
+            if (duplicateDetection.add(lit.var())) {
+                hasDuplicates = true;
+            }
+
+            // Note that douplicate variables will be handled during
+            // construction of the Inequality that is if a literal
+            // appears twice it will get coefficient 2, if a variable
+            // appears with positive as well as negative polarity then
+            // a cancelation will be triggered reducing the degree to
+            // 0 and thereby trivializing the constraint.
+
+            // todo: maybe add warning if douplicate variables occur?
+
+            ++it;
+        }
+        if (*it != "0") {
+            throw ParseError(it, "Expected '0' at end of clause.");
+        }
+        ++it;
+
+        if (it != WordIter::end) {
+            throw ParseError(it, "Expected end line after constraint.");
         }
 
-        if (this->isSmall) {
-            small.lit = lit;
-            degree += small.normalize();
-            small.emplaceInto(smallTerms);
+        if (hasDuplicates) {
+            return std::make_unique<Inequality<T>>(terms, 1);
         } else {
-            large.lit = lit;
-            degree += large.normalize();
-            large.emplaceInto(largeTerms);
+            return std::make_unique<Inequality<T>>(
+                ClauseHandler(terms.size(), terms.size(), terms.begin(), terms.end()));
         }
-    };
-
-    void setDegree(T _degree) {
-        this->degree += _degree;
+    }
+};
 
-        if (this->isSmall) {
-            if (this->hasDuplicates || this->isEq || this->degree > std::numeric_limits<SmallInt>::max()) {
-                switchToLargeTerms();
-            }
-        }
 
-        this->isClause &= this->degree == 1;
+/*
+ * Parse a memory mapped file in parallel: the lines after the header
+ * are split into one part per thread and every part is parsed with
+ * its own VariableNameManager. The parts are merged in order, adding
+ * the variables in the order in which they were seen first, so that
+ * the result is identical to parsing sequentially. If a part fails
+ * to parse, the file is parsed again sequentially to report the
+ * error at the right place. Small files and files that are not
+ * memory mapped are parsed sequentially.
+ */
+template<typename T, typename Parser>
+std::unique_ptr<Formula<T>> parseInParallel(Parser& parser, LineReader& file,
+        const std::string& fileName, VariableNameManager& varMgr, size_t numThreads) {
+    static constexpr size_t minPartSize = 1024 * 1024;
+
+    MappedFile* mapped = dynamic_cast<MappedFile*>(&file);
+    if (numThreads == 0) {
+        numThreads = std::max(1u, std::thread::hardware_concurrency());
     }
-
-    void setEq() {
-        isEq = true;
+    if (numThreads == 1 || mapped == nullptr || mapped->getPosition() != 0) {
+        return parser.parse(file, fileName);
     }
 
-    void setGeq() {
-        isEq = false;
+    parser.start();
+    WordIter it(fileName);
+    while (parser.inHeader() && file.getline(it)) {
+        parser.parseLine(it);
     }
 
-    void flip() {
-        degree = -degree;
-        if (isSmall) {
-            for (auto& term: smallTerms) {
-                degree += term.coeff;
-                term.lit = ~term.lit;
-            }
-        } else {
-            for (auto& term: largeTerms) {
-                degree += term.coeff;
-                term.lit = ~term.lit;
-            }
+    string_view content = mapped->getContent();
+    content.remove_prefix(mapped->getPosition());
+    size_t numParts = std::min(numThreads, content.size() / minPartSize);
+    if (numParts <= 1) {
+        while (file.getline(it)) {
+            parser.parseLine(it);
         }
-
+        return parser.finish(it);
     }
 
-    void negate() {
-        flip();
-        degree += 1;
+    std::vector<string_view> partContent;
+    size_t begin = 0;
+    for (size_t i = 1; i <= numParts && begin < content.size(); i++) {
+        size_t end = content.size();
+        if (i < numParts) {
+            end = content.find('\n', std::max(begin, i * content.size() / numParts));
+            end = (end == string_view::npos) ? content.size() : end + 1;
+        }
+        partContent.push_back(content.substr(begin, end - begin));
+        begin = end;
     }
 
-    std::array<std::unique_ptr<Inequality<T>>, 2> getInequalities() {
+    std::vector<std::unique_ptr<VariableNameManager>> partMgrs;
+    std::vector<std::unique_ptr<Parser>> parts;
+    std::vector<std::exception_ptr> errors(partContent.size());
+    for (size_t i = 0; i < partContent.size(); i++) {
+        partMgrs.emplace_back(std::make_unique<VariableNameManager>(varMgr.allowsArbitraryNames()));
+        parts.emplace_back(parser.partParser(*partMgrs.back()));
+    }
 
-        std::unique_ptr<Inequality<T>> geq;
-        if (isClause) {
-            geq = std::make_unique<Inequality<T>>(
-                ClauseHandler(smallTerms.size(), smallTerms.size(), smallTerms.begin(), smallTerms.end()));
-        } else if (isSmall) {
-            SmallInt smallDegree = convertInt<SmallInt>(degree);
-            geq = std::make_unique<Inequality<T>>(
-                FixedSizeInequalityHandler<SmallInt>(smallTerms.size(), smallTerms, smallDegree));
-        } else {
-            switchToLargeTerms();
-            geq = std::make_unique<Inequality<T>>(largeTerms, degree);
+    {
+        #ifdef PY_BINDINGS
+            std::optional<py::gil_scoped_release> release;
+            if (PyGILState_Check()) {
+                release.emplace();
+            }
+        #endif
+        std::vector<std::thread> threads;
+        for (size_t i = 0; i < partContent.size(); i++) {
+            threads.emplace_back([&, i]() {
+                try {
+                    MemoryFile part(partContent[i]);
+                    WordIter partIt(fileName);
+                    while (part.getline(partIt)) {
+                        parts[i]->parseLine(partIt);
+                    }
+                } catch (...) {
+                    errors[i] = std::current_exception();
+                }
+            });
         }
-        std::unique_ptr<Inequality<T>> leq = nullptr;
-        if (isEq) {
-            flip();
+        for (std::thread& thread: threads) {
+            thread.join();
+        }
+    }
 
-            leq = std::make_unique<Inequality<T>>(largeTerms, degree);
+    for (std::exception_ptr& error: errors) {
+        if (error) {
+            parts.clear();
+            mapped->setPosition(0);
+            return parser.parse(file, fileName);
         }
+    }
 
-        return {std::move(geq), std::move(leq)};
+    for (size_t i = 0; i < parts.size(); i++) {
+        parser.appendPart(*parts[i], *partMgrs[i]);
     }
-};
+    mapped->setPosition(mapped->getSize());
+    return parser.finish(it);
+}
 
+template<typename T>
+std::unique_ptr<Formula<T>> parseOpbFrom(LineReader& file, std::string fileName, VariableNameManager& varMgr, size_t numThreads = 1) {
+    OPBParser<T> parser(varMgr);
+    std::unique_ptr<Formula<T>> result = parseInParallel<T>(parser, file, fileName, varMgr, numThreads);
+    return result;
+}
 
 template<typename T>
-class OPBParser {
-    VariableNameManager& variableNameManager;
-    ParsedTerms<T> parsedTerms;
-    VarDouplicateDetection duplicateDetection;
+std::unique_ptr<Formula<T>> parseOpb(std::string fileName, VariableNameManager& varMgr) {
+    std::unique_ptr<LineReader> file = openLineReader(fileName);
+    return parseOpbFrom<T>(*file, fileName, varMgr);
+}
 
-    std::unique_ptr<Formula<T>> formula;
+template<typename T>
+std::array<std::unique_ptr<Inequality<T>>, 2> parseOpbConstraint(VariableNameManager& varMgr, WordIter& it) {
+    OPBParser<T> parser(varMgr);
+    return parser.parseConstraint(it);
+}
 
-public:
-    OPBParser(VariableNameManager& mngr):
-        variableNameManager(mngr)
-    {}
 
+template<typename T>
+std::unique_ptr<Formula<T>> parseCnfFrom(LineReader& file, std::string fileName, VariableNameManager& varMgr, size_t numThreads = 1) {
+    CNFParser<T> parser(varMgr);
+    std::unique_ptr<Formula<T>> result = parseInParallel<T>(parser, file, fileName, varMgr, numThreads);
+    return result;
+}
 
-    std::unique_ptr<Formula<T>> parse(std::ifstream& f, const std::string& fileName) {
-        formula = std::make_unique<Formula<T>>();
-        WordIter it(fileName);
+template<typename T>
+std::unique_ptr<Formula<T>> parseCnf(std::string fileName, VariableNameManager& varMgr) {
+    std::unique_ptr<LineReader> file = openLineReader(fileName);
+    return parseCnfFrom<T>(*file, fileName, varMgr);
+}
 
-        // We currently do not make use of the claimed number of
-        // variables (not even for checking if the numbers match),
-        // hence let us not parse the header. In general it would be
-        // nice to not force the header to be there.
-        // if (!WordIter::getline(f, it)) {
-        //     throw ParseError(it, "Expected OPB header.");
-        // }
-        // parseHeader(it);
+template<typename T>
+std::unique_ptr<Formula<T>> parseWcnfFrom(LineReader& file, std::string fileName, VariableNameManager& varMgr, size_t numThreads = 1) {
+    CNFParser<T> parser(varMgr, true);
+    std::unique_ptr<Formula<T>> result = parseInParallel<T>(parser, file, fileName, varMgr, numThreads);
+    return result;
+}
 
-        bool checkedObjective = false;
-        while (WordIter::getline(f, it)) {
-            if (it != WordIter::end && ((*it)[0] != '*')) {
-                if (!checkedObjective) {
-                    checkedObjective = true;
-                    if (*it == "min:") {
-                        ++it;
-                        parseObjective(it);
-                        continue;
-                    }
-                }
+template<typename T>
+std::unique_ptr<Formula<T>> parseWcnf(std::string fileName, VariableNameManager& varMgr) {
+    std::unique_ptr<LineReader> file = openLineReader(fileName);
+    return parseWcnfFrom<T>(*file, fileName, varMgr);
+}
 
-                auto res = parseConstraint(it);
-                if (it != WordIter::end) {
-                    throw ParseError(it, "Expected end line after constraint.");
-                }
-                formula->add(std::move(res[0]));
-                if (res[1] != nullptr) {
-                    formula->add(std::move(res[1]));
-                }
-            }
-        }
+/*
+ * Snapshots of parsed formulas, which allow to construct the formula
+ * again without tokenizing and normalizing it. A snapshot stores the
+ * normalized constraints, the variable names and the objective. All
+ * numbers are stored as varints, coefficients that do not fit into 62
+ * bits are stored with their magnitude in bytes. Snapshots are
+ * only read by the same version of VeriPB that wrote them, keeping
+ * track of stale snapshots is up to the caller (see
+ * veripb/formula_cache.py).
+ */
+namespace formula_cache {
+    const string_view magic("\0VeriPBf", 8);
+    const string_view endMagic("\0VeriPBe", 8);
+    const uint64_t version = 1;
 
-        return std::move(formula);
-    }
+    using binary_proof::writeVarint;
 
-    void parseHeader(WordIter& it) {
-        it.expect("*");
-        ++it;
-        it.expect("#variable=");
-        ++it;
-        formula->claimedNumVar = parseInt(it, "Expected number of variables.");
-        ++it;
-        it.expect("#constraint=");
-        ++it;
-        formula->claimedNumC = parseInt(it, "Expected number of constraints.");
-        ++it;
-        if (it != WordIter::end) {
-            throw ParseError(it, "Expected end of header line.");
+    template<typename T>
+    void writeInt(std::string& out, const T& value) {
+        bool isNegative = (value < 0);
+        T magnitude = isNegative ? T(-value) : value;
+        if (magnitude < (uint64_t(1) << 62)) {
+            writeVarint(out, (convertInt<uint64_t>(magnitude) << 2) | (isNegative << 1));
+        } else {
+            mpz_class bigMagnitude = toMpz(magnitude);
+            size_t numBytes = (mpz_sizeinbase(bigMagnitude.get_mpz_t(), 2) + 7) / 8;
+            writeVarint(out, (numBytes << 2) | (isNegative << 1) | 1);
+            size_t start = out.size();
+            out.resize(start + numBytes);
+            mpz_export(&out[start], nullptr, -1, 1, 0, 0, bigMagnitude.get_mpz_t());
         }
     }
 
-    void parseObjective(WordIter& it) {
-        formula->hasObjective = true;
-        while (it != WordIter::end && *it != ";") {
-            T coeff = parseCoeff<T>(it, 0, it->size());
-            ++it;
-            Lit lit = this->parseLit(it);
+    inline void writeString(std::string& out, const std::string& value) {
+        writeVarint(out, value.size());
+        out.append(value);
+    }
 
-            if (lit.isNegated()) {
-                coeff = -coeff;
-                lit = ~lit;
+    class Reader {
+        MappedFile file;
+        const char* pos;
+        const char* end;
+
+    public:
+        Reader(const std::string& fileName)
+            : file(fileName, 0)
+        {
+            string_view content = file.getContent();
+            pos = content.data();
+            end = content.data() + content.size();
+            if (content.substr(0, magic.size()) != magic
+                    || content.substr(std::max(content.size(), endMagic.size()) - endMagic.size()) != endMagic) {
+                corrupted();
             }
+            pos += magic.size();
+            end -= endMagic.size();
+            if (readVarint() != version) {
+                corrupted();
+            }
+        }
 
-            formula->objectiveCoeffs.push_back(coeff);
-            formula->objectiveVars.push_back(lit.var());
-
-            ++it;
+        [[noreturn]] void corrupted() {
+            throw std::runtime_error("Corrupted formula snapshot.");
         }
-    }
 
-    Lit parseLit(WordIter& it) {
-        Lit lit = ::parseLit(it, variableNameManager);
-        if (formula) {
-            formula->maxVar = std::max(formula->maxVar, static_cast<size_t>(lit.var()));
+        bool atEnd() const {
+            return pos == end;
         }
-        return lit;
-    }
 
-    std::array<std::unique_ptr<Inequality<T>>, 2> parseConstraint(WordIter& it, bool geqOnly = false) {
-        parsedTerms.reset();
+        uint64_t readVarint() {
+            uint64_t value = 0;
+            size_t shift = 0;
+            while (true) {
+                if (pos == end || shift > 63) {
+                    corrupted();
+                }
+                uint8_t byte = *pos;
+                ++pos;
+                value |= static_cast<uint64_t>(byte & 0x7f) << shift;
+                if (byte < 0x80) {
+                    return value;
+                }
+                shift += 7;
+            }
+        }
 
-        while (it != WordIter::end) {
-            const string_view& word = *it;
-            if (word == ">=" || word == "=") {
-                break;
+        string_view readBytes(uint64_t length) {
+            if (static_cast<uint64_t>(end - pos) < length) {
+                corrupted();
             }
+            string_view result(pos, length);
+            pos += length;
+            return result;
+        }
 
-            if (word.size() > parsedTerms.smallMaxCharCount) {
-                parsedTerms.nextLargeCoeff(parseCoeff<T>(it, 0, it->size()));
+        template<typename T>
+        void readInt(T& result) {
+            uint64_t value = readVarint();
+            if ((value & 1) == 0) {
+                result = convertInt<T>(value >> 2);
             } else {
-                parsedTerms.nextSmallCoeff(parseCoeff<typename ParsedTerms<T>::SmallInt>(it, 0, it->size()));
+                string_view bytes = readBytes(value >> 2);
+                mpz_class magnitude;
+                mpz_import(magnitude.get_mpz_t(), bytes.size(), -1, 1, 0, 0, bytes.data());
+                result = std::move(magnitude);
             }
-            ++it;
+            if (value & 2) {
+                result = -result;
+            }
+        }
 
-            parsedTerms.nextLit(this->parseLit(it));
-            ++it;
+        Lit readLit(size_t maxVar) {
+            uint64_t value = readVarint();
+            uint64_t var = value >> 1;
+            if (var == 0 || var > maxVar) {
+                corrupted();
+            }
+            return Lit(Var(var), value & 1);
         }
+    };
 
-        std::vector<std::string> ops = {">=", "="};
-        it.expectOneOf(ops);
-        bool isEq = (*it == "=");
-        if (isEq && geqOnly) {
-            throw ParseError(it, "Equality not allowed, only >= is allowed here.");
+    template<typename T>
+    void write(Formula<T>& formula, const VariableNameManager& varMgr, const std::string& fileName) {
+        std::ofstream out(fileName, std::ios::binary);
+        if (!out) {
+            throw std::runtime_error("Could not open '" + fileName + "' for writing.");
         }
 
-        if (isEq) parsedTerms.setEq(); else parsedTerms.setGeq();
-        ++it;
+        std::string buffer(magic);
+        writeVarint(buffer, version);
+        writeVarint(buffer, varMgr.allowsArbitraryNames());
+        writeVarint(buffer, varMgr.maxVar());
+        if (varMgr.allowsArbitraryNames()) {
+            for (const std::string& name: varMgr.getNames()) {
+                writeString(buffer, name);
+            }
+        }
 
-        if (it == WordIter::end) {
-            throw ParseError(it, "Expected degree.");
+        writeVarint(buffer, formula.maxVar);
+        writeVarint(buffer, formula.claimedNumC);
+        writeVarint(buffer, formula.claimedNumVar);
+        writeVarint(buffer, formula.hasObjective);
+        writeVarint(buffer, formula.objectiveVars.size());
+        for (size_t i = 0; i < formula.objectiveVars.size(); i++) {
+            writeVarint(buffer, formula.objectiveVars[i]);
+            writeInt(buffer, formula.objectiveCoeffs[i]);
         }
 
-        bool hasSemicolon = false;
-        size_t length = it->size();
-        if ((*it)[length - 1] == ';') {
-            hasSemicolon = true;
-            length -= 1;
+        std::vector<Inequality<T>*> constraints = formula.getConstraints();
+        writeVarint(buffer, constraints.size());
+        std::vector<Term<T>> terms;
+        for (Inequality<T>* constraint: constraints) {
+            terms.clear();
+            T degree = constraint->getTerms(terms);
+            bool isClause = constraint->isClause();
+            writeVarint(buffer, (terms.size() << 1) | isClause);
+            for (Term<T>& term: terms) {
+                writeVarint(buffer, (static_cast<uint64_t>(term.lit.var()) << 1) | term.lit.isNegated());
+                if (!isClause) {
+                    writeInt(buffer, term.coeff);
+                }
+            }
+            if (!isClause) {
+                writeInt(buffer, degree);
+            }
+
+            if (buffer.size() > (1 << 16)) {
+                out.write(buffer.data(), buffer.size());
+                buffer.clear();
+            }
         }
 
-        parsedTerms.setDegree(parseCoeff<T>(it, 0, length));
-        ++it;
+        buffer.append(endMagic);
+        out.write(buffer.data(), buffer.size());
+        out.close();
+        if (!out) {
+            throw std::runtime_error("Failed to write '" + fileName + "'.");
+        }
+    }
 
-        if (!hasSemicolon) {
-            if (*it == "==>") {
-                if (parsedTerms.isEq) {
-                    throw ParseError(it, "Can not use implication on equalities.");
-                }
-                ++it;
+    /*
+     * Construct the formula of the snapshot, the variables of the
+     * snapshot are added to varMgr as if the formula was parsed.
+     */
+    template<typename T>
+    std::unique_ptr<Formula<T>> read(const std::string& fileName, VariableNameManager& varMgr) {
+        Reader in(fileName);
 
-                parsedTerms.negate();
-                parsedTerms.nextLargeCoeff(T(parsedTerms.degree));
-                parsedTerms.nextLit(this->parseLit(it));
-                ++it;
-            } else if (*it == "<==") {
-                if (parsedTerms.isEq) {
-                    throw ParseError(it, "Can not use implication on equalities.");
+        bool allowArbitraryNames = in.readVarint();
+        if (allowArbitraryNames != varMgr.allowsArbitraryNames()) {
+            throw std::runtime_error("Formula snapshot uses different variable names.");
+        }
+        size_t maxVar = in.readVarint();
+        if (maxVar > Var::LIMIT) {
+            in.corrupted();
+        }
+        VariableNameManager stored(allowArbitraryNames);
+        if (allowArbitraryNames) {
+            for (size_t var = 1; var <= maxVar; var++) {
+                if (stored.getVar(in.readBytes(in.readVarint())) != var) {
+                    in.corrupted();
                 }
-                ++it;
+            }
+        } else if (maxVar > 0) {
+            stored.getVar("x" + std::to_string(maxVar));
+        }
 
-                parsedTerms.nextLargeCoeff(T(parsedTerms.degree));
-                parsedTerms.nextLit(~this->parseLit(it));
-                ++it;
+        std::unique_ptr<Formula<T>> formula = std::make_unique<Formula<T>>();
+        formula->maxVar = in.readVarint();
+        formula->claimedNumC = in.readVarint();
+        formula->claimedNumVar = in.readVarint();
+        formula->hasObjective = in.readVarint();
+        size_t objectiveSize = in.readVarint();
+        for (size_t i = 0; i < objectiveSize; i++) {
+            size_t var = in.readVarint();
+            if (var == 0 || var > maxVar) {
+                in.corrupted();
+            }
+            formula->objectiveVars.push_back(var);
+            formula->objectiveCoeffs.emplace_back();
+            in.readInt(formula->objectiveCoeffs.back());
+        }
+
+        // the constraints are constructed in place, they are already
+        // normalized
+        size_t numConstraints = in.readVarint();
+        for (size_t i = 0; i < numConstraints; i++) {
+            uint64_t header = in.readVarint();
+            size_t size = header >> 1;
+            bool isClause = header & 1;
+            if (isClause) {
+                ClauseHandler clause(size);
+                for (auto& term: clause->terms) {
+                    term.lit = in.readLit(maxVar);
+                }
+                formula->add(std::make_unique<Inequality<T>>(std::move(clause)));
+            } else {
+                FixedSizeInequalityHandler<T> ineq(size);
+                for (auto& term: ineq->terms) {
+                    term.lit = in.readLit(maxVar);
+                    in.readInt(term.coeff);
+                }
+                in.readInt(ineq->degree);
+                formula->add(std::make_unique<Inequality<T>>(std::move(ineq)));
             }
+        }
+        if (!in.atEnd()) {
+            in.corrupted();
+        }
+
+        formula->renameVars(varMgr.merge(stored));
+        return formula;
+    }
+}
+
+#ifdef PY_BINDINGS
+/*
+ * Checks consecutive lines of the most frequent rules (reverse unit
+ * propagation, reverse polish notation and deletion by id) natively,
+ * without parsing and computing every single line in Python.
+ *
+ * The constraint database is the Python list of the verifier, so
+ * that all other rules can keep working on it as before. Whenever a
+ * line can not be handled natively, because it is a different rule
+ * or because it would fail or produce a warning, the executor stops
+ * before changing any state and leaves the line to the Python
+ * implementation of the rule, which then produces exactly the same
+ * result and error message (including the line number) as if the
+ * executor was not used.
+ */
+class BatchExecutor {
+public:
+    enum class Kind {
+        Rup, Pol, DeleteId, Delete
+    };
 
-            it.expect(";");
-            ++it;
-        }
+private:
+    using Ineq = Inequality<CoefType>;
 
-        return parsedTerms.getInequalities();
-    }
-};
+    struct PolInstruction {
+        enum class Type {
+            Lit, Number, Add, Multiply, Divide, Saturate, Weaken, Skip
+        };
 
-template<typename T>
-class CNFParser {
-    VariableNameManager& variableNameManager;
-    std::vector<Term<T>> terms;
-    VarDouplicateDetection duplicateDetection;
+        Type type;
+        int64_t id = 0;
+        Lit lit;
+        CoefType value;
 
-    std::unique_ptr<Formula<T>> formula;
-    bool weighted;
-    T weighted_partial_top; // Max weight of clause, which generates hard clause
-    int vars_claimed_header;
-public:
-    CNFParser(VariableNameManager& mngr, bool weighted = false):
-        variableNameManager(mngr),
-        weighted(weighted)
-    {}
+        PolInstruction(Type _type)
+            : type(_type)
+        {}
+    };
 
+    char commentChar;
+    std::vector<std::pair<std::string, Kind>> rules;
 
-    std::unique_ptr<Formula<T>> parse(std::ifstream& f, const std::string& fileName) {
-        formula = std::make_unique<Formula<T>>();
+    // scratch space, reused for all lines
+    std::vector<PolInstruction> instructions;
+    std::vector<Ineq*> antecedents;
+    std::vector<InequalityPtr<CoefType>> stack;
+    std::vector<int64_t> ids;
+    std::vector<uint64_t> toDelete;
 
-        if(weighted){
-            formula->hasObjective = true;
-        }
+    // number of lines after which we check for KeyboardInterrupt
+    static constexpr size_t signalCheckInterval = 1024;
 
-        WordIter it(fileName);
+    enum class Result {
+        Done, Defer
+    };
 
-        bool foundHeader = false;
-        while (WordIter::getline(f, it)) {
-            if (it != WordIter::end && ((*it)[0] != 'c')) {
-                if (!foundHeader) {
-                    parseHeader(it);
-                    foundHeader = true;
-                } else {
-                    auto res = parseConstraint(it);
-                    formula->add(std::move(res));
-                }
+    const Kind* getKind(string_view ruleId) const {
+        for (const auto& rule: rules) {
+            if (rule.first == ruleId) {
+                return &rule.second;
             }
         }
+        return nullptr;
+    }
 
-        if (!foundHeader) {
-            if(weighted){
-                throw ParseError(it, "Expected WCNF header.");
-            } else{
-                throw ParseError(it, "Expected CNF header.");
+    /*
+     * Accepts integers in the form Python's int() would accept them
+     * and that fit into 64 bits, everything else is left to Python.
+     */
+    static bool parseId(string_view word, int64_t& result) {
+        bool negated = false;
+        if (!word.empty() && word[0] == '-') {
+            negated = true;
+            word.remove_prefix(1);
+        }
+        if (word.empty() || word.size() > 18) {
+            return false;
+        }
+        result = 0;
+        for (char c: word) {
+            if (c < '0' || c > '9') {
+                return false;
             }
+            result = result * 10 + (c - '0');
         }
-
-        return std::move(formula);
+        if (negated) {
+            result = -result;
+        }
+        return true;
     }
 
-    void parseHeader(WordIter& it) {
-        it.expect("p");
-        ++it;
+    static bool isNumber(string_view word) {
+        if (!word.empty() && word[0] == '-') {
+            word.remove_prefix(1);
+        }
+        return !word.empty() && word.find_first_not_of("0123456789") == string_view::npos;
+    }
 
-        if(weighted){
-            it.expect("wcnf");
-        } else{
-            it.expect("cnf");
+    // same as IneqFactory.isVarName in Python
+    static bool isVarName(VariableNameManager& mngr, string_view name) {
+        if (name.empty()) {
+            return false;
         }
-        ++it;
-        formula->claimedNumVar = parseInt(it, "Expected number of variables.");
-        vars_claimed_header = formula->claimedNumVar;
-        ++it;
-        formula->claimedNumC = parseInt(it, "Expected number of constraints.");
-        ++it;
+        if (!mngr.allowsArbitraryNames()) {
+            return name[0] == 'x';
+        }
+        bool isLetter = ('a' <= name[0] && name[0] <= 'z') || ('A' <= name[0] && name[0] <= 'Z');
+        return name.size() >= 2 && isLetter && name.find_first_of(";=") == string_view::npos;
+    }
 
-        if(weighted){
-            if(it != WordIter::end){
-                weighted_partial_top = parseCoeff<T>(it);
-            }
-            else{
-                weighted_partial_top = std::numeric_limits<T>::max(); // TODO: check for the weights
-            }
+    static bool isLit(VariableNameManager& mngr, string_view word) {
+        return (word[0] == '~' && isVarName(mngr, word.substr(1))) || isVarName(mngr, word);
+    }
 
-            ++it;
+    /*
+     * Returns the constraint with the given id or nullptr if the
+     * access would be rejected by Verifier.antecedents.
+     */
+    static Ineq* getConstraint(py::list& db, int64_t id) {
+        int64_t size = db.size();
+        if (id >= size || id <= -size) {
+            return nullptr;
         }
-
-        if (it != WordIter::end) {
-            throw ParseError(it, "Expected end of header line.");
+        if (id < 0) {
+            id += size;
         }
+        py::object constraint = db[id];
+        if (constraint.is_none()) {
+            return nullptr;
+        }
+        return constraint.cast<Ineq*>();
     }
 
-    std::unique_ptr<Inequality<T>> parseConstraint(WordIter& it) {
-        terms.clear();
-        duplicateDetection.clear();
+    static void addConstraint(py::list& db, PropEngine<CoefType>& engine, InequalityPtr<CoefType>&& ineq) {
+        Ineq* attached = engine.attach(ineq.get(), db.size());
+        if (attached == ineq.get()) {
+            db.append(py::cast(std::move(ineq)));
+        } else {
+            db.append(py::cast(attached));
+        }
+    }
 
-        char buffer[12];
-        char* bufferEnd = buffer + 12;
-        char* bufferStart;
+    Result rup(WordIter& it, py::list& db, PropEngine<CoefType>& engine, VariableNameManager& mngr) {
+        InequalityPtr<CoefType> ineq;
+        try {
+            ineq = std::move(parseOpbConstraint<CoefType>(mngr, it)[0]);
+        } catch (const ParseError&) {
+            return Result::Defer;
+        } catch (const std::invalid_argument&) {
+            return Result::Defer;
+        } catch (const std::out_of_range&) {
+            return Result::Defer;
+        }
 
-        bool hasDuplicates = false;
+        // optional hints, same as ReverseUnitPropagation.parse
+        antecedents.clear();
+        for (; !it.isEnd(); ++it) {
+            int64_t id;
+            if (!parseId(it.get(), id)) {
+                return Result::Defer;
+            }
+            if (id == 0) {
+                ++it;
+                if (!it.isEnd()) {
+                    return Result::Defer;
+                }
+                break;
+            }
+            Ineq* hint = getConstraint(db, id);
+            if (hint == nullptr) {
+                return Result::Defer;
+            }
+            antecedents.push_back(hint);
+        }
 
-        T weight = 0;
-        
-        while (it != WordIter::end && *it != "0") {
-            // If no weight has been parsed yet, this means that the first value will be the weight of the clause. 
-            // Assumption: add a relaxation variable with name "xi" with i a number in the range [nbvar+1, nbvar+nbclauses].
-            if(weighted && weight==0){
-                weight = parseCoeff<T>(it);
-                
-                if(weight < weighted_partial_top){
-                    formula->claimedNumVar++; // Claim another variable as relaxation variable.
+        engine.increaseNumVarsTo(mngr.maxVar());
+        bool success;
+        if (antecedents.empty()) {
+            success = ineq->rupCheck(engine, false);
+        } else {
+            success = ineq->rupCheckHinted(engine, antecedents);
+        }
+        if (!success) {
+            return Result::Defer;
+        }
 
-                    std::string name = "x"+ std::to_string(formula->claimedNumVar);
-                    string_view relaxVarName(name);
-                    
-                    Lit lit = variableNameManager.getLit(relaxVarName); // getLit also calls getVar, which adds the variable name to the variable name manager if not exists.
+        addConstraint(db, engine, std::move(ineq));
+        return Result::Done;
+    }
 
-                    terms.emplace_back(1, lit);
-                    
-                    formula->objectiveCoeffs.push_back(weight);
-                    formula->objectiveVars.push_back(lit.var());
-                    formula->maxVar = std::max(formula->maxVar, static_cast<size_t>(lit.var()));
+    /*
+     * Parse polish notation in the same way as
+     * ReversePolishNotation.parse, including swapping the operand
+     * of multiplication, division and weakening with the operator.
+     */
+    Result parsePol(WordIter& it, VariableNameManager& mngr) {
+        using Type = PolInstruction::Type;
+        instructions.clear();
+
+        int64_t stackSize = 0;
+        for (; !it.isEnd(); ++it) {
+            string_view word = it.get();
+            if (word == "+") {
+                instructions.emplace_back(Type::Add);
+                stackSize -= 1;
+            } else if (word == "*") {
+                instructions.emplace_back(Type::Multiply);
+                stackSize -= 1;
+            } else if (word == "d") {
+                instructions.emplace_back(Type::Divide);
+                stackSize -= 1;
+            } else if (word == "w") {
+                instructions.emplace_back(Type::Weaken);
+                stackSize -= 1;
+            } else if (word == "s") {
+                instructions.emplace_back(Type::Saturate);
+            } else if (word == ";") {
+                instructions.emplace_back(Type::Skip);
+            } else if (word == "r") {
+                return Result::Defer;
+            } else if (isLit(mngr, word)) {
+                instructions.emplace_back(Type::Lit);
+                try {
+                    instructions.back().lit = mngr.getLit(word);
+                } catch (const std::invalid_argument&) {
+                    return Result::Defer;
+                } catch (const std::out_of_range&) {
+                    return Result::Defer;
                 }
-                ++it;
-                continue;
+                stackSize += 1;
+            } else if (isNumber(word)) {
+                instructions.emplace_back(Type::Number);
+                PolInstruction& ins = instructions.back();
+                if (parseId(word, ins.id)) {
+                    ins.value = ins.id;
+                } else {
+                    try {
+                        ins.value = parseCoeff<CoefType>(it);
+                    } catch (const ParseError&) {
+                        return Result::Defer;
+                    }
+                    // too large to be a valid constraint id
+                    ins.id = std::numeric_limits<int64_t>::max();
+                }
+                stackSize += 1;
+            } else {
+                return Result::Defer;
             }
 
-            // parse int to give nice error messages if input is not
-            // an integer, out put is not used because we construct
-            // string to be consistent with arbitrary variable names
-            int parsed_lit = parseInt(it, "Expected literal.");
-            if (it->size() > 11) {
-                throw ParseError(it, "Literal too large.");
+            if (stackSize <= 0) {
+                return Result::Defer;
             }
+        }
 
-            // Check to see that no variables higher than the claimed variables in the header are parsed
-            if(abs(parsed_lit) > vars_claimed_header){
-                throw ParseError(it, "More variables in the formula than claimed by the header.");
-            }
+        if (!instructions.empty()
+                && instructions.back().type == Type::Number
+                && instructions.back().value == 0) {
+            instructions.pop_back();
+            stackSize -= 1;
+        }
+        if (!instructions.empty() && instructions.back().type == Type::Skip) {
+            instructions.pop_back();
+        }
+        if (stackSize != 1) {
+            return Result::Defer;
+        }
 
-            bufferStart = bufferEnd - it->size();
-            std::copy(it->begin(), it->end(), bufferStart);
-            if (bufferStart[0] == '-') {
-                bufferStart -= 1;
-                bufferStart[0] = '~';
-                bufferStart[1] = 'x';
-            } else {
-                bufferStart -= 1;
-                bufferStart[0] = 'x';
+        for (size_t i = 1; i < instructions.size(); i++) {
+            Type type = instructions[i].type;
+            if (type == Type::Multiply || type == Type::Divide || type == Type::Weaken) {
+                std::swap(instructions[i - 1], instructions[i]);
             }
+        }
 
-            std::string_view litString(bufferStart, bufferEnd - bufferStart);
-            Lit lit = parseLit(it, variableNameManager, &litString);
-            if (formula) {
-                formula->maxVar = std::max(formula->maxVar, static_cast<size_t>(lit.var()));
-            }
+        return Result::Done;
+    }
 
-            terms.emplace_back(1, lit);
+    Result pol(WordIter& it, py::list& db, PropEngine<CoefType>& engine, VariableNameManager& mngr) {
+        using Type = PolInstruction::Type;
+        if (parsePol(it, mngr) == Result::Defer) {
+            return Result::Defer;
+        }
 
-            if (duplicateDetection.add(lit.var())) {
-                hasDuplicates = true;
+        // all antecedents are checked before anything is computed
+        antecedents.clear();
+        for (size_t i = 0; i < instructions.size(); i++) {
+            Type type = instructions[i].type;
+            if (type == Type::Number) {
+                Ineq* ineq = getConstraint(db, instructions[i].id);
+                if (ineq == nullptr) {
+                    return Result::Defer;
+                }
+                antecedents.push_back(ineq);
+            } else if (type == Type::Multiply || type == Type::Divide || type == Type::Weaken) {
+                i += 1;
             }
+        }
 
-            // Note that douplicate variables will be handled during
-            // construction of the Inequality that is if a literal
-            // appears twice it will get coefficient 2, if a variable
-            // appears with positive as well as negative polarity then
-            // a cancelation will be triggered reducing the degree to
-            // 0 and thereby trivializing the constraint.
+        stack.clear();
+        auto antecedent = antecedents.begin();
+        for (size_t i = 0; i < instructions.size(); i++) {
+            PolInstruction& ins = instructions[i];
+            switch (ins.type) {
+                case Type::Number:
+                    stack.emplace_back((*antecedent)->copy());
+                    ++antecedent;
+                    break;
+                case Type::Lit:
+                    stack.emplace_back(std::make_unique<Ineq>(
+                        std::vector<CoefType>{1},
+                        std::vector<int>{static_cast<int>(static_cast<int64_t>(ins.lit))},
+                        0));
+                    break;
+                case Type::Add: {
+                    InequalityPtr<CoefType> second = std::move(stack.back());
+                    stack.pop_back();
+                    stack.back()->add(*second);
+                    break;
+                }
+                case Type::Multiply:
+                case Type::Divide:
+                case Type::Weaken: {
+                    i += 1;
+                    PolInstruction& operand = instructions[i];
+                    if (ins.type == Type::Weaken) {
+                        if (operand.type != Type::Lit || operand.lit.isNegated()) {
+                            return Result::Defer;
+                        }
+                        stack.back()->weaken(operand.lit.var());
+                    } else if (operand.type != Type::Number) {
+                        return Result::Defer;
+                    } else if (ins.type == Type::Multiply) {
+                        if (operand.value < 0) {
+                            return Result::Defer;
+                        }
+                        stack.back()->multiply(operand.value);
+                    } else {
+                        if (operand.value <= 0) {
+                            return Result::Defer;
+                        }
+                        stack.back()->divide(operand.value);
+                    }
+                    break;
+                }
+                case Type::Saturate:
+                    stack.back()->saturate();
+                    break;
+                case Type::Skip:
+                    break;
+            }
+        }
 
-            // todo: maybe add warning if douplicate variables occur?
+        assert(stack.size() == 1);
+        InequalityPtr<CoefType> result = std::move(stack.back());
+        stack.clear();
+        result->contract();
+        addConstraint(db, engine, std::move(result));
+        return Result::Done;
+    }
 
-            ++it;
+    /*
+     * Deletion as in DeleteConstraints2.compute and
+     * Verifier.handleRule, the only difference is that deletions of
+     * core constraints are always left to Python if they need to be
+     * checked.
+     */
+    Result deleteIds(WordIter& it, py::list& db, PropEngine<CoefType>& engine, bool checkCoreDeletion) {
+        ids.clear();
+        for (; !it.isEnd(); ++it) {
+            int64_t id;
+            if (!parseId(it.get(), id) || id < 0) {
+                return Result::Defer;
+            }
+            ids.push_back(id);
         }
-        if (*it != "0") {
-            throw ParseError(it, "Expected '0' at end of clause.");
+        if (!ids.empty() && ids.back() == 0) {
+            ids.pop_back();
+        }
+        if (ids.empty()) {
+            return Result::Defer;
         }
-        ++it;
 
-        if (it != WordIter::end) {
-            throw ParseError(it, "Expected end line after constraint.");
+        antecedents.clear();
+        for (int64_t id: ids) {
+            Ineq* ineq = (id == 0) ? nullptr : getConstraint(db, id);
+            if (ineq == nullptr) {
+                return Result::Defer;
+            }
+            if (checkCoreDeletion && ineq->isCoreConstraint) {
+                return Result::Defer;
+            }
+            antecedents.push_back(ineq);
         }
 
-        if (hasDuplicates) {
-            return std::make_unique<Inequality<T>>(terms, 1);
-        } else {
-            return std::make_unique<Inequality<T>>(
-                ClauseHandler(terms.size(), terms.size(), terms.begin(), terms.end()));
+        toDelete.clear();
+        for (size_t i = 0; i < ids.size(); i++) {
+            std::vector<uint64_t> deletions = engine.getDeletions(antecedents[i]);
+            if (deletions.empty()) {
+                toDelete.push_back(ids[i]);
+            } else {
+                toDelete.insert(toDelete.end(), deletions.begin(), deletions.end());
+            }
+        }
+        std::sort(toDelete.begin(), toDelete.end());
+        toDelete.erase(std::unique(toDelete.begin(), toDelete.end()), toDelete.end());
+
+        for (uint64_t id: toDelete) {
+            // keep the constraint alive until it is detached
+            py::object constraint = db[id];
+            if (constraint.is_none()) {
+                continue;
+            }
+            db[id] = py::none();
+            engine.detach(constraint.cast<Ineq*>(), id);
         }
+        return Result::Done;
     }
-};
 
+public:
+    BatchExecutor(char _commentChar)
+        : commentChar(_commentChar)
+    {}
 
-template<typename T>
-std::unique_ptr<Formula<T>> parseOpb(std::string fileName, VariableNameManager& varMgr) {
-    std::ifstream f(fileName);
-    OPBParser<T> parser(varMgr);
-    std::unique_ptr<Formula<T>> result = parser.parse(f, fileName);
-    return result;
-}
+    void clearRules() {
+        rules.clear();
+    }
 
-template<typename T>
-std::array<std::unique_ptr<Inequality<T>>, 2> parseOpbConstraint(VariableNameManager& varMgr, WordIter& it) {
-    OPBParser<T> parser(varMgr);
-    return parser.parseConstraint(it);
-}
+    void addRule(const std::string& ruleId, Kind kind) {
+        rules.emplace_back(ruleId, kind);
+    }
 
+    /*
+     * Check the current line of the iterator and all following lines
+     * until a line is found that needs to be handled by Python.
+     *
+     * Returns the number of checked rules, the number of added
+     * constraints and whether the end of the proof was reached. If
+     * the end was not reached, the iterator is reset to the start
+     * of the line that needs to be handled next.
+     */
+    std::tuple<size_t, size_t, bool> run(
+            LineReader& reader, WordIter& it, py::list db,
+            PropEngine<CoefType>& engine, VariableNameManager& mngr,
+            bool checkCoreDeletion)
+    {
+        size_t numRules = 0;
+        size_t numConstraints = 0;
 
-template<typename T>
-std::unique_ptr<Formula<T>> parseCnf(std::string fileName, VariableNameManager& varMgr) {
-    std::ifstream f(fileName);
-    CNFParser<T> parser(varMgr);
-    std::unique_ptr<Formula<T>> result = parser.parse(f, fileName);
-    return result;
-}
+        it.init();
+        while (true) {
+            if (!it.isEnd() && it.get()[0] != commentChar) {
+                const Kind* kind = getKind(it.get());
+                if (kind == nullptr) {
+                    break;
+                }
 
-template<typename T>
-std::unique_ptr<Formula<T>> parseWcnf(std::string fileName, VariableNameManager& varMgr) {
-    std::ifstream f(fileName);
-    CNFParser<T> parser(varMgr, true);
-    std::unique_ptr<Formula<T>> result = parser.parse(f, fileName);
-    return result;
-}
+                ++it;
+                Result result;
+                switch (*kind) {
+                    case Kind::Rup:
+                        result = rup(it, db, engine, mngr);
+                        break;
+                    case Kind::Pol:
+                        result = pol(it, db, engine, mngr);
+                        break;
+                    case Kind::DeleteId:
+                        if (it.isEnd() || it.get() != "id") {
+                            result = Result::Defer;
+                        } else {
+                            ++it;
+                            result = deleteIds(it, db, engine, checkCoreDeletion);
+                        }
+                        break;
+                    case Kind::Delete:
+                        result = deleteIds(it, db, engine, checkCoreDeletion);
+                        break;
+                }
+
+                if (result == Result::Defer) {
+                    break;
+                }
+
+                numRules += 1;
+                if (*kind == Kind::Rup || *kind == Kind::Pol) {
+                    numConstraints += 1;
+                }
+                if (numRules % signalCheckInterval == 0 && PyErr_CheckSignals() != 0) {
+                    throw py::error_already_set();
+                }
+            }
+
+            if (!reader.getline(it)) {
+                return std::make_tuple(numRules, numConstraints, true);
+            }
+        }
+
+        it.init();
+        return std::make_tuple(numRules, numConstraints, false);
+    }
+};
+#endif
 
 int main(int argc, char const *argv[])
 {
@@ -1181,10 +3629,23 @@ int main(int argc, char const *argv[])
 void init_parsing(py::module &m){
     m.doc() = "Efficient implementation for parsing opb and pbp files.";
     m.def("parseOpb", &parseOpb<CoefType>, "Parse opb file with fixed precision.");
+    m.def("parseOpb", &parseOpbFrom<CoefType>, "Parse opb file with fixed precision.",
+        py::arg("file"), py::arg("fileName"), py::arg("varMgr"), py::arg("numThreads") = 1);
     // m.def("parseOpbBigInt", &parseOpb<BigInt>, "Parse opb file with arbitrary precision.");
     m.def("parseCnf", &parseCnf<CoefType>, "Parse cnf file with fixed precision.");
+    m.def("parseCnf", &parseCnfFrom<CoefType>, "Parse cnf file with fixed precision.",
+        py::arg("file"), py::arg("fileName"), py::arg("varMgr"), py::arg("numThreads") = 1);
     // m.def("parseCnfBigInt", &parseCnf<BigInt>, "Parse cnf file with arbitrary precision.");
     m.def("parseWcnf", &parseWcnf<CoefType>, "Parse wcnf file with fixed precision.");
+    m.def("parseWcnf", &parseWcnfFrom<CoefType>, "Parse wcnf file with fixed precision.",
+        py::arg("file"), py::arg("fileName"), py::arg("varMgr"), py::arg("numThreads") = 1);
+
+    m.def("saveFormulaSnapshot", &formula_cache::write<CoefType>,
+        "Write a snapshot of the parsed formula and the variable names.",
+        py::arg("formula"), py::arg("varMgr"), py::arg("fileName"));
+    m.def("loadFormulaSnapshot", &formula_cache::read<CoefType>,
+        "Construct the formula of a snapshot, adding its variables to varMgr.",
+        py::arg("fileName"), py::arg("varMgr"));
 
     m.def("parseConstraintOpb", &parseOpbConstraint<CoefType>, "Parse opb consraint with fixed precision.");
     // m.def("parseConstraintOpbBigInt", &parseOpbConstraint<BigInt>, "Parse opb constraint with arbitrary precision.");
@@ -1201,6 +3662,7 @@ void init_parsing(py::module &m){
     py::class_<VariableNameManager>(m, "VariableNameManager")
         .def(py::init<bool>())
         .def("maxVar", &VariableNameManager::maxVar)
+        .def("allowsArbitraryNames", &VariableNameManager::allowsArbitraryNames)
         .def("getVar", [](VariableNameManager &mngr, std::string name) {
             return static_cast<uint64_t>(mngr.getVar(name));
         })
@@ -1211,12 +3673,70 @@ void init_parsing(py::module &m){
             return mngr.getName(Var(value));
         });
 
+    py::class_<LineReader>(m, "LineReader")
+        .def("close", &LineReader::close)
+        .def("nextLine", &LineReader::getline)
+        .def("getSize", &LineReader::getSize,
+            "Size of the input in bytes, 0 if it is not known.")
+        .def("getPosition", &LineReader::getPosition,
+            "Number of bytes of the input that were read so far.");
+
+    py::class_<StreamFile, LineReader>(m, "StreamFile")
+        .def(py::init<std::string>());
+
+    py::class_<BufferedFile, LineReader>(m, "BufferedFile");
+
+    py::class_<StreamedFile, BufferedFile>(m, "StreamedFile")
+        .def(py::init<int>(),
+            "Read lines from the file descriptor, which is closed "
+            "together with the StreamedFile.")
+        .def(py::init<int, size_t>());
+
+    py::class_<DecompressedFile, StreamedFile>(m, "DecompressedFile")
+        .def(py::init<std::string>())
+        .def(py::init<std::string, size_t>());
+
+    m.def("compression", [](const std::string& fileName) {
+            return compression::name(compression::detectFile(fileName));
+        }, "Name of the compression format of the file, empty if it is not compressed.");
+
     py::class_<std::ifstream>(m, "ifstream")
         .def(py::init<std::string>())
-        .def("close", &std::ifstream::close);
+        .def("close", &std::ifstream::close)
+        .def("nextLine", &nextLine);
 
     m.def("nextLine", &nextLine);
 
+    py::class_<MappedFile, LineReader>(m, "MappedFile")
+        .def(py::init<std::string>())
+        .def(py::init<std::string, size_t>());
+
+    m.def("nextLine", &nextLineMapped);
+
+    py::class_<binary_proof::Reader, LineReader>(m, "BinaryProofReader")
+        .def(py::init<std::string>())
+        .def_static("isBinary", &binary_proof::Reader::isBinary);
+
+    m.def("nextLine", &nextLineBinary);
+
+    m.def("proofToBinary", &binary_proof::toBinary,
+        "Convert a text proof to the binary proof format.");
+    m.def("proofToText", &binary_proof::toText,
+        "Convert a binary proof to the text proof format.");
+
+    py::class_<BatchExecutor> batchExecutor(m, "BatchExecutor");
+    batchExecutor
+        .def(py::init<char>())
+        .def("clearRules", &BatchExecutor::clearRules)
+        .def("addRule", &BatchExecutor::addRule)
+        .def("run", &BatchExecutor::run);
+
+    py::enum_<BatchExecutor::Kind>(batchExecutor, "Kind")
+        .value("Rup", BatchExecutor::Kind::Rup)
+        .value("Pol", BatchExecutor::Kind::Pol)
+        .value("DeleteId", BatchExecutor::Kind::DeleteId)
+        .value("Delete", BatchExecutor::Kind::Delete);
+
     py::class_<WordIter>(m, "WordIter")
         .def(py::init<std::string>())
         .def("next", &WordIter::operator++)
@@ -3,6 +3,8 @@ import veripb.constraints
 import mmap
 import re
 import itertools
+import os
+import stat
 
 from veripb.constraints import Term
 from collections import defaultdict
@@ -12,9 +14,10 @@ from veripb.exceptions import ParseError
 
 from veripb.timed_function import TimedFunction
 
-from veripb.rules_register import rules_to_dict
+from veripb.rules_register import rules_to_dict, get_native_rules
 
-from veripb.optimized.parsing import WordIter, ifstream, nextLine
+from veripb.optimized.parsing import WordIter, StreamFile, MappedFile, BinaryProofReader, BatchExecutor
+from veripb.optimized.parsing import StreamedFile, DecompressedFile, compression
 
 class ParseContext():
     def __init__(self, context):
@@ -47,22 +50,80 @@ class ParseContext():
 
 
 
+class NativeBatch():
+    """
+    Placeholder for consecutive proof lines that are checked by the
+    native BatchExecutor instead of being parsed and computed one by
+    one in Python. The verifier runs the batch on its database, which
+    consumes lines up to the first line that has to be handled in
+    Python.
+    """
+
+    def __init__(self, lines, executor):
+        self.lines = lines
+        self.executor = executor
+        self.lineInFile = lines.iter.getLine()
+        self.numRules = 0
+        self.numConstraints = 0
+
+    def run(self, db, context, checkCoreDeletion):
+        self.numRules, self.numConstraints, eof = self.executor.run(
+            self.lines.file,
+            self.lines.iter,
+            db,
+            context.propEngine,
+            context.ineqFactory.varNameMgr,
+            checkCoreDeletion)
+
+        self.lineInFile = self.lines.iter.getLine()
+        if eof:
+            self.lines.exhausted = True
+        else:
+            self.lines.pending = True
+
 class RuleParserBase():
     commentChar = None
 
     def __init__(self, context):
         self.parseContext = ParseContext(context)
-
-    def numRules(self, file):
-        num = 0
-        with LineParser(file) as lines:
-            for line in lines:
-                for word in line:
-                    if word[0] != self.commentChar:
-                        num += 1
-                    break
-        # don't count the proof header line
-        return num - 1
+        self.executor = None
+        self.nativeRulesFor = None
+        self.nativeRuleIds = set()
+
+    def useNativeBatch(self, dumpLine):
+        settings = getattr(self.parseContext.context, "verifierSettings", None)
+        return settings is not None \
+            and settings.useNativeBatch \
+            and not settings.trace \
+            and settings.proofGraph is None \
+            and not settings.isBackward() \
+            and settings.elaboratedProof is None \
+            and self.commentChar is not None \
+            and not dumpLine
+
+    def getNativeRuleIds(self):
+        rules = self.parseContext.rules
+        if rules is not self.nativeRulesFor:
+            self.nativeRulesFor = rules
+            self.nativeRuleIds = set()
+            self.executor.clearRules()
+
+            nativeRules = get_native_rules()
+            for Id, rule in rules.items():
+                kind = nativeRules.get(rule, None)
+                if kind is not None:
+                    self.nativeRuleIds.add(Id)
+                    self.executor.addRule(Id, kind)
+
+        return self.nativeRuleIds
+
+    def addConstraints(self, numConstraints):
+        if numConstraints > 0:
+            oldFree = self.parseContext.firstFreeId
+            newFree = oldFree + numConstraints
+            self.parseContext.firstFreeId = newFree
+            for listener in self.parseContext.addIneqListener:
+                listener(range(oldFree, newFree), self.parseContext.context)
 
     def getRuleId(self, words):
         try:
@@ -75,10 +136,16 @@ class RuleParserBase():
         return None
 
     @TimedFunction.timeIter("RuleParserBase.parse")
-    def parse(self, rules, file, dumpLine = False, defaultRule = None):
+    def parse(self, rules, file, dumpLine = False, defaultRule = None, keepLineText = False):
         self.parseContext.rules = rules_to_dict(rules, defaultRule)
 
+        useNativeBatch = self.useNativeBatch(dumpLine)
+        if useNativeBatch:
+            self.executor = BatchExecutor(self.commentChar)
+
         with LineParser(file) as lines:
+            # for showing the progress
+            self.parseContext.context.proofFile = lines.file
             defaultIdSize = 1
             # the first line is not allowed to be comment line or empty but must be the header
             if hasattr(self, "parseHeader"):
@@ -90,12 +157,25 @@ class RuleParserBase():
                 except StopIteration:
                     raise ParseError("Expected Header.")
 
+            # the line a batch stopped at needs to be handled in
+            # Python, even if it is a natively supported rule
+            afterBatch = False
             for words in lines:
                 if dumpLine:
                     print("line %03d: %s"% (lines.iter.getLine(), lines.iter.getLineText().rstrip()))
 
                 ruleId = self.getRuleId(words)
                 if ruleId is not None:
+                    if useNativeBatch and not afterBatch \
+                            and ruleId in self.getNativeRuleIds():
+                        batch = NativeBatch(lines, self.executor)
+                        yield batch
+
+                        afterBatch = True
+                        self.addConstraints(batch.numConstraints)
+                        continue
+
+                    afterBatch = False
                     try:
                         rule = self.parseContext.rules[ruleId]
                     except KeyError as e:
@@ -105,18 +185,16 @@ class RuleParserBase():
                         else:
                             raise ValueError("Unsupported rule '%s'"%(ruleId))
 
+                    if keepLineText:
+                        lineText = lines.iter.getLineText().rstrip()
                     step = rule.parse(words, self.parseContext.context)
                     step.lineInFile = lines.iter.getLine()
+                    if keepLineText:
+                        step.lineText = lineText
                     yield step
 
                     self.parseContext = step.newParseContext(self.parseContext)
-                    numConstraints = step.numConstraints()
-                    if numConstraints > 0:
-                        oldFree = self.parseContext.firstFreeId
-                        newFree = oldFree + numConstraints
-                        self.parseContext.firstFreeId = newFree
-                        for listener in self.parseContext.addIneqListener:
-                            listener(range(oldFree, newFree), self.parseContext.context)
+                    self.addConstraints(step.numConstraints())
 
 class RuleParser(RuleParserBase):
     commentChar = "*"
@@ -396,22 +474,70 @@ class CNFParser():
 
         return [self.ineqFactory.fromTerms([Term(1,self.ineqFactory.intlit2int(l)) for l in lits], 1)]
 
+def isRegularFile(fileName):
+    try:
+        return stat.S_ISREG(os.stat(fileName).st_mode)
+    except OSError:
+        return False
+
+def openFile(fileName):
+    """
+    Open file for reading lines natively. Compressed files (gzip, xz,
+    bzip2, zstd) are decompressed on the fly, other regular files are
+    memory mapped so that lines are tokenized in place, everything
+    else (pipes, devices) is read through a stream.
+    """
+    if isRegularFile(fileName):
+        if compression(fileName) != "":
+            return DecompressedFile(fileName)
+
+        try:
+            return MappedFile(fileName)
+        except RuntimeError:
+            pass
+
+    return StreamFile(fileName)
+
+def openStream(file):
+    """
+    Open a Python file object that is not a regular file, e.g., stdin
+    or a named pipe, for reading lines natively while the writer is
+    still producing it. Reading blocks until more data is available
+    or the writer closes its end.
+    """
+    return StreamedFile(os.dup(file.fileno()))
+
 class LineParser():
     def __init__(self, file):
-        self.file = ifstream(file.name)
-        self.iter = WordIter(file.name)
+        if isRegularFile(file.name):
+            self.file = self.openNative(file.name)
+        else:
+            self.file = openStream(file)
+        self.nextLine = self.file.nextLine
+        self.iter = WordIter(str(file.name))
         self.pyiter = PyWordIter(self.iter)
+        # set by NativeBatch, which reads lines on its own
+        self.pending = False
+        self.exhausted = False
+
+    @staticmethod
+    def openNative(fileName):
+        if isRegularFile(fileName) and BinaryProofReader.isBinary(fileName):
+            return BinaryProofReader(fileName)
+        return openFile(fileName)
 
     def __iter__(self):
         return self
 
     def __next__(self):
         self.pyiter.reset()
-        ok = nextLine(self.file, self.iter)
-        if not ok:
+        if self.pending:
+            # the current line was not consumed yet
+            self.pending = False
+        elif self.exhausted or not self.nextLine(self.iter):
             raise StopIteration()
-        else:
-            return WordParser(line = "", wordIter = self.pyiter)
+
+        return WordParser(line = "", wordIter = self.pyiter)
 
     def __enter__(self):
         return self
@@ -0,0 +1,29 @@
+import os
+
+class ProofWriter():
+    """
+    Base for writing a new proof, e.g., a trimmed or an elaborated
+    proof. The header is written on construction. The file is either
+    a path, which is opened and closed by the writer, or an open file,
+    which is only flushed by finish.
+    """
+
+    header = "pseudo-Boolean proof version 1.1"
+
+    def __init__(self, file):
+        self.ownsFile = isinstance(file, (str, os.PathLike))
+        if self.ownsFile:
+            self.file = open(file, "w")
+        else:
+            self.file = file
+        self.print(self.header)
+
+    def print(self, line):
+        print(line, file = self.file)
+
+    def finish(self):
+        if self.ownsFile:
+            self.file.close()
+        else:
+            # the file might not be closed before the interpreter exits
+            self.file.flush()
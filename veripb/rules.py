@@ -221,19 +221,37 @@ class ReverseUnitPropagation(Rule):
     def parse(cls, words, context):
         cppWordIter = words.wordIter.getNative()
         ineq = context.ineqFactory.parse(cppWordIter, allowMultiple = False)
-        return cls(ineq)
 
-    def __init__(self, constraint):
+        # optional ids of the constraints to propagate, in the order
+        # in which they propagate, e.g., u 1 x1 >= 1 ; 3 -1 7. For
+        # compatibility, anything else after the constraint is
+        # ignored, which is safe as hints only restrict propagation.
+        try:
+            hints = list(map(int, words))
+        except ValueError:
+            hints = None
+        if hints and hints[-1] == 0:
+            hints = hints[:-1]
+        if hints and 0 in hints:
+            raise ValueError("Can not access constraint with index 0.")
+
+        return cls(ineq, hints)
+
+    def __init__(self, constraint, hints = None):
         self.constraint = constraint
+        self.hints = hints if hints else None
 
     def numConstraints(self):
         return 1
 
     def antecedentIDs(self):
+        if self.hints is not None:
+            return self.hints
         return "all"
 
     def __eq__(self, other):
-        return self.constraint == other.constraint
+        return self.constraint == other.constraint \
+            and self.hints == other.hints
 
     def isGoal(self):
         return False
@@ -241,14 +259,21 @@ class ReverseUnitPropagation(Rule):
     @TimedFunction.time("ReverseUnitPropagation.compute")
     def compute(self, antecedents, context):
         context.propEngine.increaseNumVarsTo(context.ineqFactory.numVars())
-        success = self.constraint.rupCheck(context.propEngine, False)
+        if self.hints is not None:
+            success = self.constraint.rupCheckHinted(context.propEngine, list(antecedents))
+        else:
+            success = self.constraint.rupCheck(context.propEngine, False)
 
         if success:
             return [self.constraint]
         else:
-            raise ReverseUnitPropagationFailed(
-                "Failed to show '%s' by reverse unit propagation."%(
-                    context.ineqFactory.toString(self.constraint)))
+            raise self.failed(context)
+
+    def failed(self, context):
+        using = " using the hints" if self.hints is not None else ""
+        return ReverseUnitPropagationFailed(
+            "Failed to show '%s' by reverse unit propagation%s."%(
+                context.ineqFactory.toString(self.constraint), using))
 
 class CompareToConstraint(Rule):
     @classmethod
@@ -401,10 +426,11 @@ class OriginalSolution(Rule):
         with MaybeWordParser(line) as words:
             result = parse_assignment(context, words)
 
-        return cls(Assignment(result))
+        return cls(result)
 
     def __init__(self, assignment):
-        self.assignment = assignment
+        self.lits = assignment
+        self.assignment = Assignment(assignment)
 
     @TimedFunction.time("Solution.compute")
     def compute(self, antecedents, context):
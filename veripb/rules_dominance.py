@@ -24,6 +24,9 @@ from collections import defaultdict
 def computeEffected(context, substitution, onlyCore = False):
     return context.propEngine.computeEffected(substitution, onlyCore)
 
+def computeSubgoals(context, substitution, negated, onlyCore = False):
+    return context.propEngine.computeSubgoals(substitution, negated, onlyCore)
+
 class TransitivityInfo:
     def __init__(self):
         self.fresh_right = []
@@ -538,7 +541,8 @@ class SubVerifier(EmptyRule):
         svContext.ineqFactory = svContext.newIneqFactory()
         svContext.newPropEngine = context.newPropEngine
         svContext.propEngine = svContext.newPropEngine()
-        svContext.ruleCount = getattr(context, "ruleCount", 0)
+        svContext.progress = getattr(context, "progress", None)
+        svContext.elaboration = getattr(context, "elaboration", None)
 
         self._newParseContext = ParseContext(svContext)
 
@@ -713,11 +717,21 @@ class AddRedundant(MultiGoalRule):
         if context.verifierSettings.trace:
             print("  ** proofgoals from formula **")
 
-        effected = computeEffected(context, witness)
-        for ineq in effected:
+        if self.autoProveAll and not self.displayGoals:
+            # goals implied by the negated constraint can neither be
+            # displayed nor be referenced by a subproof, so they are
+            # dropped before they are created
+            effected, numImplied = computeSubgoals(context, witness, negated)
+            implied = [False] * len(effected)
+            stats.numGoalCandidates += numImplied
+        else:
+            effected = computeEffected(context, witness)
+            implied = negated.impliesMany(effected)
+
+        for ineq, isImplied in zip(effected, implied):
             stats.numGoalCandidates += 1
             goal = SubGoal(ineq)
-            if negated.implies(ineq):
+            if isImplied:
                 goal.isProven = True
             else:
                 stats.numSubgoals += 1
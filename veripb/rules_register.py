@@ -37,6 +37,63 @@ def dom_friendly_rules():
     return dom_rules
 
 
+native_rules = None
+
+def get_native_rules():
+    """
+    Rules that can be checked by the native batch executor, mapped to
+    the kind of rule the executor implements for them. Only exact
+    matches are executed natively, derived rules are not.
+    """
+    global native_rules
+    if native_rules is None:
+        import veripb.rules
+        from veripb.optimized.parsing import BatchExecutor
+
+        native_rules = {
+            veripb.rules.ReverseUnitPropagation: BatchExecutor.Kind.Rup,
+            veripb.rules.ReversePolishNotation: BatchExecutor.Kind.Pol,
+            veripb.rules.DeleteConstraints2: BatchExecutor.Kind.DeleteId,
+            veripb.rules.DeleteConstraints: BatchExecutor.Kind.Delete
+        }
+    return native_rules
+
+backward_rules = None
+
+def get_backward_rules():
+    """
+    Rules that can be checked backward, i.e., rules that derive
+    constraints by reverse unit propagation or from explicitly given
+    antecedents, rules that only delete constraints and solutions,
+    which are checked when they are recorded. Only exact matches are
+    supported, derived rules are not.
+    """
+    global backward_rules
+    if backward_rules is None:
+        import veripb.rules
+        from veripb.rules import DummyRule
+
+        backward_rules = {
+            DummyRule,
+            veripb.rules.LoadFormula,
+            veripb.rules.LoadAxiom,
+            veripb.rules.Assumption,
+            veripb.rules.ReverseUnitPropagation,
+            veripb.rules.ReversePolishNotation,
+            veripb.rules.ConstraintEquals,
+            veripb.rules.ConstraintImplies,
+            veripb.rules.ConstraintImpliesGetImplied,
+            veripb.rules.IsContradiction,
+            veripb.rules.Solution,
+            veripb.rules.OriginalSolution,
+            veripb.rules.ObjectiveBound,
+            veripb.rules.DeleteConstraints2,
+            veripb.rules.DeleteConstraints,
+            veripb.rules.SetLevel,
+            veripb.rules.WipeLevel
+        }
+    return backward_rules
+
 def rules_to_dict(rules, default = None):
     res = dict()
     for rule in rules:
@@ -0,0 +1,125 @@
+from collections import defaultdict
+
+from veripb.rules import DummyRule, LoadFormula, LoadAxiom, Assumption, \
+    ReverseUnitPropagation, ReversePolishNotation, CompareToConstraint, \
+    IsContradiction, Solution, OriginalSolution, ObjectiveBound
+from veripb.proof_writer import ProofWriter
+
+class TrimmedProofWriter(ProofWriter):
+    """
+    Writes the rules that were needed when checking backward as a new
+    proof. Constraints are renumbered, derived constraints are deleted
+    right after their last use, unless it is the contradiction that
+    concludes the proof, and core constraints, e.g. the ones from the
+    formula, are deleted at the same place as in the original proof.
+    """
+
+    def __init__(self, context, file):
+        super().__init__(file)
+        self.context = context
+        # maps constraintIds of the original proof to the new ones
+        self.newIds = dict()
+
+    def isKept(self, step):
+        return step.isNeeded \
+            or type(step.rule) in [DummyRule, LoadFormula, LoadAxiom]
+
+    def write(self, steps):
+        lastUse = dict()
+        isCore = set()
+        for pos, step in enumerate(steps):
+            # the constraint of the DummyRule is never deleted
+            if self.isKept(step) and type(step.rule) is not DummyRule:
+                for i, ineq in step.constraints:
+                    lastUse[i] = pos
+                    if ineq.isCoreConstraint:
+                        isCore.add(i)
+                for i in step.usedIds:
+                    lastUse[i] = pos
+
+        deleteAfter = defaultdict(list)
+        for i, pos in lastUse.items():
+            if i not in isCore and type(steps[pos].rule) is not IsContradiction:
+                deleteAfter[pos].append(i)
+
+        nextId = 0
+        for pos, step in enumerate(steps):
+            if self.isKept(step):
+                if type(step.rule) is not DummyRule:
+                    self.print(self.format(step))
+                for i, ineq in step.constraints:
+                    self.newIds[i] = nextId
+                    nextId += 1
+
+            deleted = [i for i, ineq, isDeletionChecked in step.deleted
+                if i in isCore]
+            deleted.extend(sorted(deleteAfter[pos]))
+            if deleted:
+                self.print("del id %s" % self.ids(deleted))
+
+    def ids(self, ids):
+        return " ".join(str(self.newIds[i]) for i in ids)
+
+    def lits(self, lits):
+        return " ".join(self.context.ineqFactory.int2lit(lit) for lit in lits)
+
+    def format(self, step):
+        rule = step.rule
+        ruleId = type(rule).Ids[0]
+        toString = self.context.ineqFactory.toString
+
+        if type(rule) is LoadFormula:
+            return "%s %i" % (ruleId, rule.numConstraints())
+        elif type(rule) is LoadAxiom:
+            return "%s %i" % (ruleId, rule._axiomId)
+        elif type(rule) is Assumption:
+            return "%s %s ;" % (ruleId, toString(rule.constraint))
+        elif type(rule) is ReverseUnitPropagation:
+            result = "%s %s ;" % (ruleId, toString(rule.constraint))
+            if rule.hints is not None:
+                result += " " + self.ids(step.usedIds)
+            return result
+        elif type(rule) is ReversePolishNotation:
+            return "%s %s" % (ruleId, self.formatPolish(rule.instructions, step.usedIds))
+        elif isinstance(rule, CompareToConstraint):
+            return "%s %s %s ;" % (ruleId, self.ids(step.usedIds), toString(rule.constraint))
+        elif type(rule) is IsContradiction:
+            return "%s %s" % (ruleId, self.ids(step.usedIds))
+        elif type(rule) is Solution:
+            return "%s %s" % (ruleId, self.lits(rule.partialAssignment))
+        elif type(rule) is ObjectiveBound:
+            # the full assignment does not depend on propagation,
+            # which might be weaker in the trimmed proof
+            return "%s %s" % (ruleId, self.lits(step.assignment))
+        elif type(rule) is OriginalSolution:
+            return "%s %s" % (ruleId, self.lits(rule.lits))
+        else:
+            raise NotImplementedError(
+                "Rule %s can not be written to a trimmed proof."%(rule))
+
+    def formatPolish(self, instructions, antecedentIds):
+        """
+        Inverse of the parsing of ReversePolishNotation, i.e., the
+        operands of *, d and w are moved back in front of the operator.
+        """
+        result = list()
+        antecedentIds = iter(antecedentIds)
+        it = iter(instructions)
+        for ins in it:
+            if ins in ["*", "d"]:
+                result.append(str(next(it)))
+                result.append(ins)
+            elif ins == "w":
+                result.append(self.formatOperand(next(it), antecedentIds))
+                result.append(ins)
+            else:
+                result.append(self.formatOperand(ins, antecedentIds))
+        return " ".join(result)
+
+    def formatOperand(self, ins, antecedentIds):
+        if isinstance(ins, tuple):
+            return self.context.ineqFactory.int2lit(ins[1])
+        elif isinstance(ins, int):
+            return str(self.newIds[next(antecedentIds)])
+        else:
+            return ins
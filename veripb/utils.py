@@ -14,10 +14,11 @@ from veripb.parser import OPBParser, CNFParser
 from veripb.drat import DRATParser
 from veripb.rules_register import get_registered_rules
 from veripb.timed_function import TimedFunction
-from veripb.parser import RuleParser
+from veripb.parser import RuleParser, openFile, openStream, isRegularFile
 from veripb.exceptions import ParseError
 from veripb.optimized.constraints import PropEngine as CppPropEngine
 from veripb.optimized.parsing import parseOpb,parseCnf,parseWcnf
+from veripb.formula_cache import FormulaCache
 from veripb.constraints import PropEngine,CppIneqFactory
 from time import perf_counter
 
@@ -31,8 +32,26 @@ if profile:
     from guppy import hpy
 
 @TimedFunction.time("LoadFormula")
-def loadFormula(file, parser, varMgr):
-    formula = parser(file, varMgr)
+def loadFormula(file, parser, varMgr, numThreads = 1, cache = None):
+    formula = None
+    if cache is not None and isRegularFile(file.name):
+        key = cache.key(file.name, parser.__name__, varMgr.allowsArbitraryNames())
+        formula = cache.load(key, varMgr)
+    else:
+        cache = None
+
+    if formula is None:
+        if isRegularFile(file.name):
+            reader = openFile(file.name)
+        else:
+            reader = openStream(file)
+        try:
+            formula = parser(reader, file.name, varMgr, numThreads)
+        finally:
+            reader.close()
+        if cache is not None:
+            cache.store(key, formula, varMgr)
+
     return {
         "numVariables": formula.maxVar,
         "constraints": formula.getConstraints(),
@@ -69,7 +88,10 @@ class Settings():
             "wcnf": False,
             "arbitraryPrecision": False,
             "enableFreeNames": True,
-            "printStats": False
+            "printStats": False,
+            "formulaThreads": 1,
+            "formulaCache": None,
+            "formulaCacheSize": 1024
         }
 
     def computeNumUse(self):
@@ -118,6 +140,24 @@ class Settings():
             help="Disable use of arbitrary variable names.",
             dest=name+".enableFreeNames")
 
+        group.add_argument("--formulaThreads",
+            type=int,
+            default=defaults["formulaThreads"],
+            help="Number of threads for parsing the formula, 0 to use all cores. Default is a single thread.",
+            dest=name+".formulaThreads")
+
+        group.add_argument("--formulaCache",
+            default=defaults["formulaCache"],
+            help="Directory for caching parsed formulas, so that formulas "
+                "that are checked repeatedly are parsed only once.",
+            dest=name+".formulaCache")
+        group.add_argument("--formulaCacheSize",
+            type=int,
+            default=defaults["formulaCacheSize"],
+            help="Maximal size of the formula cache in MB, least recently "
+                "used formulas are removed first.",
+            dest=name+".formulaCacheSize")
+
         group.add_argument("--stats",
             action="store_true",
             default=defaults["printStats"],
@@ -168,8 +208,15 @@ def run(formulaFile, rulesFile, verifierSettings = None, miscSettings = Settings
     else:
         parser = parseOpb
 
+    formulaCache = None
+    if miscSettings.formulaCache is not None:
+        formulaCache = FormulaCache(miscSettings.formulaCache,
+            miscSettings.formulaCacheSize * 1024 * 1024)
+
     try:
-        formula = loadFormula(formulaFile.name, parser, context.ineqFactory.varNameMgr)
+        formula = loadFormula(formulaFile, parser,
+            context.ineqFactory.varNameMgr, miscSettings.formulaThreads,
+            formulaCache)
     except ParseError as e:
         e.fileName = formulaFile.name
         raise e
@@ -194,10 +241,9 @@ def run(formulaFile, rulesFile, verifierSettings = None, miscSettings = Settings
     try:
         if not miscSettings.drat:
             ruleParser = RuleParser(context)
-            if verifierSettings.progressBar:
-                context.ruleCount = ruleParser.numRules(rulesFile)
-
-            rules = ruleParser.parse(rules, rulesFile, dumpLine = verifierSettings.trace)
+            rules = ruleParser.parse(rules, rulesFile,
+                dumpLine = verifierSettings.trace,
+                keepLineText = verifierSettings.elaboratedProof is not None)
         else:
             ruleParser = DRATParser(context)
             rules = ruleParser.parse(rulesFile)
@@ -279,8 +325,8 @@ def run_cmd_main():
         description = """Command line tool to verify derivation
             graphs. See Readme.md for a description of the file
             format.""")
-    p.add_argument("formula", help="Formula containing axioms.", type=argparse.FileType('r'))
-    p.add_argument("derivation", help="Refutation / Proof Log.", type=argparse.FileType('r'))
+    p.add_argument("formula", help="Formula containing axioms, - for stdin.", type=argparse.FileType('r'))
+    p.add_argument("derivation", help="Refutation / Proof Log, - for stdin.", type=argparse.FileType('r'))
     p.add_argument(
         '-d', '--debug',
         help="Print lots of debugging statements.",
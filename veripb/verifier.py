@@ -1,6 +1,11 @@
 import itertools
 
-from veripb.rules import DummyRule, IsContradiction
+from veripb.rules import DummyRule, IsContradiction, ReverseUnitPropagation, DeleteConstraints2, \
+    Solution, ObjectiveBound
+from veripb.rules_register import get_backward_rules
+from veripb.trimmed_proof import TrimmedProofWriter
+from veripb.proof_writer import ProofWriter
+from veripb.parser import NativeBatch
 from veripb import InvalidProof
 from veripb.timed_function import TimedFunction
 
@@ -29,7 +34,7 @@ class DummyPropEngine():
         raise RuntimeError()
 
 # Print iterations progress
-def printProgressBar (iteration, total, start_time, prefix = '', suffix = '', decimals = 1, length = 100, fill = '█', printEnd = "\r", stream = sys.stderr):
+def printProgressBar (iteration, total, start_time, prefix = '', suffix = '', decimals = 1, length = 100, fill = '█', printEnd = "\r", stream = None):
     """
     Call in a loop to create terminal progress bar
     @params:
@@ -41,16 +46,156 @@ def printProgressBar (iteration, total, start_time, prefix = '', suffix = '', de
         length      - Optional  : character length of bar (Int)
         fill        - Optional  : bar fill character (Str)
         printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
-        stream      - Optional  : output stream (File object)
+        stream      - Optional  : output stream (File object), defaults to stderr
     """
+    if stream is None:
+        stream = sys.stderr
+
+    iteration = min(iteration, total)
     percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
     time_left = 0 if iteration==0 else int(round((time.time() - start_time)*(float(total)/iteration-1)))
     filledLength = int(length * iteration // total)
     bar = fill * filledLength + '-' * (length - filledLength)
     print('\r%s |%s| %s%% %ds remaining %s' % (prefix, bar, percent, time_left, suffix), end = printEnd,file=stream)
-    # Print New Line on Complete
-    if iteration == total:
-        print(file=stream)
+
+class Progress():
+    """
+    Shows the progress of checking the proof. The progress is measured
+    by the position of the reader in the proof file, so that the
+    proof does not need to be read twice just to count the rules, and
+    printed at most once per interval seconds.
+
+    Reading the clock for every rule is noticeable for proofs with
+    millions of rules, so it is only read every checkEvery rules. This
+    is adapted to the measured rate, such that the clock is read
+    about checksPerInterval times per interval.
+    """
+
+    checksPerInterval = 10
+
+    def __init__(self, context, interval = 0.5, stream = None):
+        self.context = context
+        self.interval = interval
+        self.stream = stream
+        self.numRules = 0
+        self.startTime = time.time()
+        self.nextTime = self.startTime
+        self.checkEvery = 1
+        self.nextCheck = 0
+        self.lastRules = 0
+        self.lastTime = self.startTime
+
+    def update(self, numRules):
+        self.numRules += numRules
+        if self.numRules >= self.nextCheck:
+            self.check()
+
+    def check(self):
+        now = time.time()
+        elapsed = now - self.lastTime
+        if elapsed > 0:
+            rate = (self.numRules - self.lastRules) / elapsed
+            perCheck = int(rate * self.interval / self.checksPerInterval)
+        else:
+            perCheck = 2 * self.checkEvery
+        # grow at most by a factor of two, so that a few fast rules do
+        # not delay the output if the following rules are slow
+        self.checkEvery = max(1, min(2 * self.checkEvery, perCheck))
+        self.lastRules = self.numRules
+        self.lastTime = now
+        self.nextCheck = self.numRules + self.checkEvery
+
+        if now >= self.nextTime:
+            self.print()
+
+    def print(self):
+        now = time.time()
+        self.nextTime = now + self.interval
+
+        proofFile = getattr(self.context, "proofFile", None)
+        position = proofFile.getPosition() if proofFile is not None else 0
+        size = proofFile.getSize() if proofFile is not None else 0
+
+        elapsed = max(now - self.startTime, 1e-9)
+        rates = "%.0f rules/s %.1f MB/s" % (
+            self.numRules / elapsed, position / elapsed / 1e6)
+
+        stream = self.stream if self.stream is not None else sys.stderr
+        if size > 0:
+            printProgressBar(position, size, self.startTime,
+                suffix = rates, length = 50, stream = stream)
+        else:
+            # e.g. when streaming, the size of the proof is unknown
+            print("\r%d rules checked, %s" % (self.numRules, rates),
+                end = "\r", file = stream)
+
+    def finish(self):
+        self.print()
+        print(file = self.stream if self.stream is not None else sys.stderr)
+
+class AllConstraints():
+    """
+    The antecedents of a rule that may use every constraint in the
+    database, e.g. for automatically proving subgoals.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def __iter__(self):
+        for Id, c in enumerate(self.db):
+            if c is not None:
+                # this is inconsitent now as we get (Id, c) for
+                # "all" but the constraint directly if a list of
+                # ids is provided. I don' have time to fix this
+                # now and probably nobody (also not future me)
+                # will notice as you ever only want the Ids if you
+                # don't know them already.
+                yield (Id, c)
+
+class BackwardStep():
+    """
+    A rule that was applied without checking it, together with
+    everything that is needed to undo and check it later on.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.lineInFile = getattr(rule, "lineInFile", None)
+        # (constraintId, constraint) of derived constraints
+        self.constraints = list()
+        # constraints the derived constraints depend on, None if they
+        # are only known after checking reverse unit propagation
+        self.antecedents = None
+        # (constraintId, constraint, isDeletionChecked) of deleted
+        # constraints
+        self.deleted = list()
+        # constraintIds used by the rule and by checked deletions,
+        # complete once the step was undone by checkBackward
+        self.usedIds = list()
+        self.isNeeded = False
+        # full assignment extending the partial assignment of an
+        # objective bound, only recorded for trimmed proofs
+        self.assignment = None
+
+class ElaboratedProof(ProofWriter):
+    """
+    The proof with every reverse unit propagation step replaced by
+    the same step with hints, all other rules are copied.
+    """
+
+    def copy(self, rule):
+        lineText = getattr(rule, "lineText", None)
+        if lineText is None:
+            raise NotImplementedError(
+                "Rule %s can not be written to an elaborated proof."%(rule))
+        self.print(lineText)
+
+    def writeHinted(self, rule, hints, ineqFactory):
+        self.print("%s %s ; %s" % (
+            type(rule).Ids[0],
+            ineqFactory.toString(rule.constraint),
+            " ".join(map(str, hints))))
 
 class VerificationResult():
     def __init__(self):
@@ -102,9 +247,16 @@ class Verifier():
                 "proofGraph": None,
                 "requireUnsat": None,
                 "isCheckDeletionOn": False,
-                "useColor": False
+                "useColor": False,
+                "useNativeBatch": True,
+                "backward": False,
+                "trimmedProof": None,
+                "elaboratedProof": None
             }
 
+        def isBackward(self):
+            return self.backward or self.trimmedProof is not None
+
         def computeNumUse(self):
             return self.lazy or not self.disableDeletion
 
@@ -145,6 +297,32 @@ class Verifier():
                 action="store_false",
                 help="Disable colored trace output.")
 
+            group.add_argument("--nativeBatch", dest=name+".useNativeBatch",
+                action="store_true",
+                default=defaults["useNativeBatch"],
+                help="Check frequent rules (u, p, del id, d) natively in batches. Disabled by --trace and --proofGraph.")
+            group.add_argument("--no-nativeBatch", dest=name+".useNativeBatch",
+                action="store_false",
+                help="Check every rule in Python.")
+
+            group.add_argument("--backward", dest=name+".backward",
+                action="store_true",
+                default=defaults["backward"],
+                help="Only check rules that are needed for the contradiction and other goals, by going through the proof backward.")
+            group.add_argument("--no-backward", dest=name+".backward",
+                action="store_false",
+                help="Check every rule in the order of the proof.")
+
+            group.add_argument("--trimmedProof", dest = name+".trimmedProof",
+                type=argparse.FileType('w'),
+                default=defaults["trimmedProof"],
+                help="Write a proof that only contains the rules needed for the contradiction and other goals to given file. Implies --backward.")
+
+            group.add_argument("--elaboratedProof", dest = name+".elaboratedProof",
+                type=argparse.FileType('w'),
+                default=defaults["elaboratedProof"],
+                help="Write the proof with hints for every reverse unit propagation step to given file.")
+
             group.add_argument("--trace", dest = name+".trace",
                 action="store_true",
                 default=False,
@@ -176,6 +354,8 @@ class Verifier():
 
     def print_stats(self):
         print("c statistic: num rules checked: %i"%(self.checked_rules))
+        if self.settings.isBackward():
+            print("c statistic: num rules skipped: %i"%(self.skipped_rules))
 
     def print(self, *args, **kwargs):
         if not self.settings.useColor:
@@ -195,33 +375,28 @@ class Verifier():
 
     def antecedents(self, ids, ruleNum):
         if ids == "all":
-            for Id, c in enumerate(self.db):
-                if c is not None:
-                    # this is inconsitent now as we get (Id, c) for
-                    # "all" but the constraint directly if a list of
-                    # ids is provided. I don' have time to fix this
-                    # now and probably nobody (also not future me)
-                    # will notice as you ever only want the Ids if you
-                    # don't know them already.
-                    yield (Id, c)
+            return AllConstraints(self.db)
         else:
-            for i in ids:
-                if i >= len(self.db):
-                    raise InvalidProof("Rule %i is trying to access constraint "\
-                        "(constraintId %i), which is not derived, yet."\
-                        %(ruleNum, i))
-                elif i <= -len(self.db):
-                    raise InvalidProof("Rule %i is trying to access invalid id "\
-                        "(constraintId %i)."\
-                        %(ruleNum, len(self.db) + i))
-
-                constraint = self.db[i]
-                if constraint is None:
-                    raise InvalidProof("Rule %i is trying to access constraint "\
-                        "(constraintId %i), that was marked as safe to delete."\
-                        %(ruleNum, i))
-
-                yield constraint
+            return self.selectedAntecedents(ids, ruleNum)
+
+    def selectedAntecedents(self, ids, ruleNum):
+        for i in ids:
+            if i >= len(self.db):
+                raise InvalidProof("Rule %i is trying to access constraint "\
+                    "(constraintId %i), which is not derived, yet."\
+                    %(ruleNum, i))
+            elif i <= -len(self.db):
+                raise InvalidProof("Rule %i is trying to access invalid id "\
+                    "(constraintId %i)."\
+                    %(ruleNum, len(self.db) + i))
+
+            constraint = self.db[i]
+            if constraint is None:
+                raise InvalidProof("Rule %i is trying to access constraint "\
+                    "(constraintId %i), that was marked as safe to delete."\
+                    %(ruleNum, i))
+
+            yield constraint
 
     def __init__(self, context, settings = None):
         if settings is not None:
@@ -236,6 +411,9 @@ class Verifier():
         context.verifierSettings = self.settings
         self.context = context
         self.checked_rules = 0
+        self.skipped_rules = 0
+        self.progress = None
+        self.elaboration = None
 
     @TimedFunction.time("propEngine.attach")
     def attach(self, constraint, constraintId):
@@ -245,15 +423,38 @@ class Verifier():
     def detach(self, constraint, constraintId):
         return self.context.propEngine.detach(constraint, constraintId)
 
+    def isCoreDeletionChecked(self):
+        if self.settings.isCheckDeletionOn:
+            return True
+        orderContext = getattr(self.context, "orderContext", None)
+        return orderContext is not None and len(orderContext.activeOrder.vars) > 0
+
+    @TimedFunction.time("Verifier.handleNativeBatch")
+    def handleNativeBatch(self, ruleNum, batch):
+        batch.run(self.db, self.context, self.isCoreDeletionChecked())
+        self.checked_rules += batch.numRules
+        if self.progress is not None:
+            self.progress.update(batch.numRules)
+
     def handleRule(self, ruleNum, rule):
         self.checked_rules += 1
-        if self.settings.progressBar:
-            printProgressBar(ruleNum,self.context.ruleCount,self.start_time,length=50)
+        # rule 0 is the DummyRule
+        if self.progress is not None and ruleNum > 0:
+            self.progress.update(1)
 
         didPrint = False
 
         antecedents = self.antecedents(rule.antecedentIDs(), ruleNum)
-        constraints = rule.compute(antecedents, self.context)
+        if self.elaboration is not None and ruleNum > 0:
+            if type(rule) is ReverseUnitPropagation and rule.hints is None:
+                constraints = self.elaborateRup(rule)
+            else:
+                # rules with sub proofs read the following rules in
+                # compute
+                self.elaboration.copy(rule)
+                constraints = rule.compute(antecedents, self.context)
+        else:
+            constraints = rule.compute(antecedents, self.context)
 
         for constraint in constraints:
             if constraint is None:
@@ -332,11 +533,152 @@ class Verifier():
         # if not didPrint == True and self.settings.trace and ruleNum > 0:
         #    print("  ConstraintId  - : check passed")
 
+    @TimedFunction.time("Verifier.elaborateRup")
+    def elaborateRup(self, rule):
+        """
+        Check reverse unit propagation and write the rule with the
+        constraints that participate in the conflict as hints.
+        """
+        propEngine = self.context.propEngine
+        propEngine.increaseNumVarsTo(self.context.ineqFactory.numVars())
+        usedIds = rule.constraint.rupCheck(propEngine, False, True)
+        if usedIds is None:
+            raise rule.failed(self.context)
+
+        self.elaboration.writeHinted(rule, usedIds, self.context.ineqFactory)
+        return [rule.constraint]
+
+    def recordRule(self, ruleNum, rule):
+        """
+        Apply the rule without checking reverse unit propagation and
+        record it, so that it can be checked by checkBackward if it is
+        needed.
+        """
+        if type(rule) not in get_backward_rules():
+            raise NotImplementedError(
+                "Rule %s is not supported when checking backward."%(rule))
+
+        # rule 0 is the DummyRule
+        if self.progress is not None and ruleNum > 0:
+            self.progress.update(1)
+
+        def absolute(ids):
+            return [i if i >= 0 else len(self.db) + i for i in ids]
+
+        step = BackwardStep(rule)
+        if type(rule) is ReverseUnitPropagation:
+            if rule.hints is not None:
+                step.antecedents = list(self.antecedents(rule.hints, ruleNum))
+                step.usedIds = absolute(rule.hints)
+            self.context.propEngine.increaseNumVarsTo(self.context.ineqFactory.numVars())
+            constraints = [rule.constraint]
+        else:
+            ids = list(rule.antecedentIDs())
+            antecedents = list(self.antecedents(ids, ruleNum))
+            constraints = rule.compute(antecedents, self.context)
+            if not isinstance(rule, DeleteConstraints2):
+                step.antecedents = antecedents
+                step.usedIds = absolute(ids)
+            if type(rule) is ObjectiveBound \
+                    and self.settings.trimmedProof is not None:
+                step.assignment = self.context.propEngine.propagatedAssignment(
+                    rule.partialAssignment)
+
+        for constraint in constraints:
+            if constraint is None:
+                continue
+
+            constraintId = len(self.db)
+            constraint = self.attach(constraint, constraintId)
+            self.db.append(constraint)
+            self.constraintsById.append(constraint)
+            step.constraints.append((constraintId, constraint))
+
+        for i in absolute(rule.deleteConstraints()):
+            ineq = self.db[i]
+            if ineq is None:
+                continue
+
+            self.db[i] = None
+            wasLastReference = self.detach(ineq, i)
+            isDeletionChecked = wasLastReference and ineq.isCoreConstraint \
+                and self.settings.isCheckDeletionOn
+            step.deleted.append((i, ineq, isDeletionChecked))
+
+        self.steps.append(step)
+
+    @TimedFunction.time("Verifier.checkBackward")
+    def checkBackward(self):
+        """
+        Undo the recorded rules from the last to the first one and
+        check the rules that are goals or that derive a constraint
+        used by a checked rule. The constraints used by reverse unit
+        propagation are the ones that participate in the conflict.
+        """
+        propEngine = self.context.propEngine
+        needed = set()
+
+        def markIds(step, ids):
+            step.usedIds.extend(ids)
+            for i in ids:
+                needed.add(id(self.constraintsById[i]))
+
+        for step in reversed(self.steps):
+            try:
+                for constraintId, ineq, isDeletionChecked in reversed(step.deleted):
+                    if isDeletionChecked:
+                        usedIds = ineq.rupCheck(propEngine, True, True)
+                        if usedIds is None:
+                            raise InvalidProof("Could not verify deletion of core constraint %s",
+                                self.context.ineqFactory.toString(ineq))
+                        markIds(step, usedIds)
+
+                    self.attach(ineq, constraintId)
+                    self.db[constraintId] = ineq
+
+                for constraintId, ineq in reversed(step.constraints):
+                    propEngine.getDeletions(ineq)
+                    self.detach(ineq, constraintId)
+                    self.db.pop()
+
+                rule = step.rule
+                step.isNeeded = rule.isGoal() \
+                    or any(id(ineq) in needed for i, ineq in step.constraints)
+                if not step.isNeeded:
+                    if type(rule) is ReverseUnitPropagation:
+                        self.skipped_rules += 1
+                    continue
+
+                self.checked_rules += 1
+                if type(rule) is ReverseUnitPropagation and rule.hints is None:
+                    usedIds = rule.constraint.rupCheck(propEngine, False, True)
+                    if usedIds is None:
+                        raise rule.failed(self.context)
+                    markIds(step, usedIds)
+                elif type(rule) is Solution:
+                    # the derived clause depends on what the partial
+                    # assignment propagates, so everything is kept
+                    markIds(step, [i for i, ineq in enumerate(self.db)
+                        if ineq is not None and i > 0])
+                else:
+                    if type(rule) is ReverseUnitPropagation:
+                        if not rule.constraint.rupCheckHinted(propEngine, step.antecedents):
+                            raise rule.failed(self.context)
+                    for ineq in step.antecedents:
+                        needed.add(id(ineq))
+            except InvalidProof as e:
+                e.lineInFile = step.lineInFile
+                raise e
+
     def __call__(self, rules):
         rules = iter(rules)
         self.context.rules = rules
 
         self.db = list()
+        if self.settings.isBackward():
+            # unlike db, deleted constraints are kept
+            self.constraintsById = list()
+            self.steps = list()
         self.result = VerificationResult()
         self.result.requireUnsat = self.settings.requireUnsat;
 
@@ -344,16 +686,53 @@ class Verifier():
             print()
             print("=== begin trace ===")
 
-        if self.settings.progressBar:
-            self.start_time = time.time()
-
-        for ruleNum, rule in enumerate(itertools.chain([DummyRule()], rules)):
+        # sub verifiers share the progress with the main verifier
+        self.progress = getattr(self.context, "progress", None)
+        ownsProgress = False
+        if self.settings.progressBar and self.progress is None:
+            self.progress = Progress(self.context)
+            self.context.progress = self.progress
+            ownsProgress = True
+
+        # and the elaborated proof
+        self.elaboration = getattr(self.context, "elaboration", None)
+        ownsElaboration = False
+        if self.settings.elaboratedProof is not None and self.elaboration is None:
+            if self.settings.isBackward():
+                raise ValueError("Elaborating is not supported when checking backward.")
+            self.elaboration = ElaboratedProof(self.settings.elaboratedProof)
+            self.context.elaboration = self.elaboration
+            ownsElaboration = True
+
+        ruleNum = 0
+        for rule in itertools.chain([DummyRule()], rules):
             try:
-                self.handleRule(ruleNum, rule)
+                if isinstance(rule, NativeBatch):
+                    self.handleNativeBatch(ruleNum, rule)
+                    ruleNum += rule.numRules
+                elif self.settings.isBackward():
+                    self.recordRule(ruleNum, rule)
+                    ruleNum += 1
+                else:
+                    self.handleRule(ruleNum, rule)
+                    ruleNum += 1
             except InvalidProof as e:
                 e.lineInFile = rule.lineInFile
                 raise e
 
+        if ownsProgress:
+            self.progress.finish()
+
+        if ownsElaboration:
+            self.elaboration.finish()
+
+        if self.settings.isBackward():
+            self.checkBackward()
+            if self.settings.trimmedProof is not None:
+                writer = TrimmedProofWriter(self.context, self.settings.trimmedProof)
+                writer.write(self.steps)
+                writer.finish()
+
         self.result.usesAssumptions = getattr(self.context, "usesAssumptions", False)
         self.result.containsContradiction = getattr(self.context, "containsContradiction", False)
 